@@ -10,6 +10,8 @@ from celery import Celery
 
 from analysisweb import package_path
 from analysisweb.api.config import Config
+from analysisweb.api.cache import response_cache
+from analysisweb.api.uploads import UploadRequest
 
 
 db = SQLAlchemy()
@@ -27,16 +29,33 @@ swagger = Swagger(template=swagger_template)
 
 def create_app():
     app = Flask(__name__)
+    app.request_class = UploadRequest
     app.config.from_object(Config)
 
     # This will register the API routes
     from . import routes
+    from .files import files
+    from .resources.uploads import reap_upload_sessions
+    from .services import dispatch_held_jobs
+
+    app.register_blueprint(files, url_prefix="/files")
+
+    @app.cli.command("reap-uploads")
+    def reap_uploads():
+        """Remove abandoned chunked upload sessions"""
+        print("Removed {} upload sessions".format(reap_upload_sessions()))
+
+    @app.cli.command("dispatch-jobs")
+    def dispatch_jobs():
+        """Send the held jobs to the workers, e.g. after a broker outage"""
+        print("Sent {} held jobs".format(dispatch_held_jobs()))
 
     db.init_app(app)
     migrate.init_app(app, db, directory=str(package_path / "migrations"))
     api.init_app(app)
     swagger.init_app(app)
     cors.init_app(app)
+    response_cache.init_app(app)
     celery.conf.update(app.config)
 
     return app
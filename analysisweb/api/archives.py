@@ -0,0 +1,137 @@
+"""
+This module contain routines to stream ZIP archives of files without building
+them in memory or on disk
+"""
+import io
+import os
+import struct
+import zipfile
+
+from analysisweb.api.uploads import COMPRESSED_SUFFIX, open_stored
+
+CHUNK_SIZE = 64 * 1024
+
+# File types that are already compressed and therefore stored as they are
+STORED_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".gz", ".zip")
+
+
+class _ZipStream(io.RawIOBase):
+    """
+    A write-only, unseekable stream collecting the output of a ZipFile
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._pos = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._pos
+
+    def pop(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def make_entries(files, compress=True):
+    """
+    Create the entries of an archive
+
+    Parameters
+    ----------
+    files: list of (str, str)
+        the name in the archive and the path of every file, missing files
+        are left out and files saved compressed are added uncompressed
+    compress: bool
+        if False, no file is compressed
+
+    Returns
+    -------
+    list of (zipfile.ZipInfo, str, bool)
+        the entries, the paths of their files and if the files are saved
+        compressed
+    """
+    entries = []
+    for arcname, path in files:
+        if os.path.isfile(path):
+            info = zipfile.ZipInfo.from_file(path, arcname)
+            stored_compressed = False
+        elif os.path.isfile(path + COMPRESSED_SUFFIX):
+            info = zipfile.ZipInfo.from_file(path + COMPRESSED_SUFFIX, arcname)
+            stored_compressed = True
+        else:
+            continue
+        if compress and not arcname.lower().endswith(STORED_EXTENSIONS):
+            info.compress_type = zipfile.ZIP_DEFLATED
+        else:
+            info.compress_type = zipfile.ZIP_STORED
+        entries.append((info, path, stored_compressed))
+    return entries
+
+
+def archive_size(entries):
+    """
+    The size in bytes of the archive of the given entries, if it can be
+    known before it is created, otherwise None
+    """
+    size = 0
+    for info, _, stored_compressed in entries:
+        # The uncompressed size of a compressed file is not known up front
+        if info.compress_type != zipfile.ZIP_STORED or stored_compressed:
+            return None
+        # ZipFile switches to ZIP64 records for large files and offsets
+        if info.file_size * 1.05 > zipfile.ZIP64_LIMIT or size > zipfile.ZIP64_LIMIT:
+            return None
+        name = len(_encoded_filename(info))
+        # Local header, data, data descriptor and central directory entry
+        size += zipfile.sizeFileHeader + name + info.file_size
+        size += struct.calcsize("<LLLL")
+        size += zipfile.sizeCentralDir + name
+    if size > zipfile.ZIP64_LIMIT or len(entries) >= zipfile.ZIP_FILECOUNT_LIMIT:
+        return None
+    return size + zipfile.sizeEndCentDir
+
+
+def _encoded_filename(info):
+    try:
+        return info.filename.encode("ascii")
+    except UnicodeEncodeError:
+        return info.filename.encode("utf-8")
+
+
+def stream_archive(entries):
+    """
+    Generate the archive of the given entries chunk by chunk
+
+    Parameters
+    ----------
+    entries: list of (zipfile.ZipInfo, str, bool)
+        the entries as created by make_entries
+
+    Yields
+    ------
+    bytes
+        the next chunk of the archive
+    """
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, "w") as archive:
+        for info, path, stored_compressed in entries:
+            # The file size of a compressed file is that of the compressed data,
+            # so let the archive be prepared for large uncompressed data
+            dst = archive.open(info, "w", force_zip64=stored_compressed)
+            with open_stored(path) as src, dst:
+                for data in iter(lambda: src.read(CHUNK_SIZE), b""):
+                    dst.write(data)
+                    chunk = stream.pop()
+                    if chunk:
+                        yield chunk
+            yield stream.pop()
+    yield stream.pop()
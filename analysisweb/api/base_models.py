@@ -3,6 +3,7 @@ Module containing models that the user should not extended,
 and that should be considered to be the base of the backend
 """
 from analysisweb.api import db
+from analysisweb.api.mixin_models import JobGroupMixin, VersionMixin
 
 
 class MeasurementFile(db.Model):
@@ -13,6 +14,8 @@ class MeasurementFile(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     label = db.Column(db.String(64))
     path = db.Column(db.String(512))
+    sha256 = db.Column(db.String(64))
+    size = db.Column(db.BigInteger)
     measurement_id = db.Column(db.Integer, db.ForeignKey("measurement.id"))
 
 
@@ -46,7 +49,9 @@ class JobInput(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     label = db.Column(db.String(64))
     value = db.Column(db.String(512))
-    job_id = db.Column(db.Integer, db.ForeignKey("job.id"))
+    is_file = db.Column(db.Boolean, default=False)
+    sha256 = db.Column(db.String(64))
+    job_id = db.Column(db.Integer, db.ForeignKey("job.id"), index=True)
 
 
 class JobTableOutput(db.Model):
@@ -57,7 +62,7 @@ class JobTableOutput(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     label = db.Column(db.String(64))
     path = db.Column(db.String(512))
-    job_id = db.Column(db.Integer, db.ForeignKey("job.id"))
+    job_id = db.Column(db.Integer, db.ForeignKey("job.id"), index=True)
 
 
 class JobFigureOutput(db.Model):
@@ -69,7 +74,7 @@ class JobFigureOutput(db.Model):
     label = db.Column(db.String(64))
     path = db.Column(db.String(512))
     html = db.Column(db.String(512))
-    job_id = db.Column(db.Integer, db.ForeignKey("job.id"))
+    job_id = db.Column(db.Integer, db.ForeignKey("job.id"), index=True)
 
 
 class JobReport(db.Model):
@@ -79,10 +84,81 @@ class JobReport(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     path = db.Column(db.String(512))
-    job_id = db.Column(db.Integer, db.ForeignKey("job.id"))
+    job_id = db.Column(db.Integer, db.ForeignKey("job.id"), index=True)
 
 
-class Job(db.Model):
+class UploadSession(db.Model):
+    """
+    A file that is uploaded in chunks
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(512))
+    size = db.Column(db.BigInteger)
+    sha256 = db.Column(db.String(64))
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, index=True)
+    chunks = db.relationship("UploadChunk", backref="session")
+
+
+class UploadChunk(db.Model):
+    """
+    A received chunk of an upload session
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+    offset = db.Column(db.BigInteger)
+    length = db.Column(db.BigInteger)
+    session_id = db.Column(db.Integer, db.ForeignKey("upload_session.id"), index=True)
+
+
+class Campaign(JobGroupMixin, db.Model):
+    """
+    A run of an analysis over many measurements, as one child job per measurement
+    """
+
+    analysis_id = db.Column(db.Integer, db.ForeignKey("analysis.id"), index=True)
+    analysis = db.relationship("Analysis")
+    jobs = db.relationship("Job", backref="campaign")
+
+
+class Pipeline(JobGroupMixin, db.Model):
+    """
+    Jobs that depend on each other, where the outputs of a job can be the input
+    files of the jobs downstream of it
+    """
+
+    jobs = db.relationship("Job", backref="pipeline")
+
+
+# The jobs that must have succeeded before a job can be queued
+job_dependency = db.Table(
+    "job_dependency",
+    db.Column("job_id", db.Integer, db.ForeignKey("job.id"), primary_key=True),
+    db.Column(
+        "upstream_id", db.Integer, db.ForeignKey("job.id"), primary_key=True, index=True
+    ),
+)
+
+
+# The states of a job and the states that it can move on to
+JOB_TRANSITIONS = {
+    # A job of a pipeline waits for the jobs upstream of it, and is cancelled
+    # if one of them does not succeed
+    "WAITING": ("QUEUED", "FAILED", "CANCELLED"),
+    # A queued job succeeds at once if it reuses the result of an identical job
+    "QUEUED": ("RUNNING", "SUCCEEDED", "FAILED", "CANCELLED"),
+    "RUNNING": ("SUCCEEDED", "FAILED", "TIMED_OUT", "CANCELLED"),
+    "SUCCEEDED": (),
+    "FAILED": (),
+    "TIMED_OUT": (),
+    "CANCELLED": (),
+}
+# The states of a job that has not finished yet
+JOB_ACTIVE_STATES = ("WAITING", "QUEUED", "RUNNING")
+
+
+class Job(VersionMixin, db.Model):
     """
     An execution of an analysis
     """
@@ -91,13 +167,39 @@ class Job(db.Model):
     label = db.Column(db.String(64))
     date = db.Column(db.DateTime, index=True)
     status = db.Column(db.String(16), index=True)
+    priority = db.Column(db.String(16))
+    queued_at = db.Column(db.DateTime)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime, index=True)
+    exit_code = db.Column(db.Integer)
+    # The ID of the Celery task running the job, None while the job is held
+    # back by the concurrency limits
+    task_id = db.Column(db.String(36))
+    # The host and the PID of the worker process running the job, and the
+    # process group of its analysis, which outlives the worker process if it is
+    # lost, e.g. killed at the time limit of the task
+    worker_host = db.Column(db.String(255))
+    worker_pid = db.Column(db.Integer)
+    pgid = db.Column(db.Integer)
+    # Hash of the analysis file, the inputs and the measurement files, which
+    # identifies jobs with the same result
+    fingerprint = db.Column(db.String(64), index=True)
     log = db.Column(db.String(512))
-    analysis_id = db.Column(db.Integer, db.ForeignKey("analysis.id"))
-    measurement_id = db.Column(db.Integer, db.ForeignKey("measurement.id"))
+    analysis_id = db.Column(db.Integer, db.ForeignKey("analysis.id"), index=True)
+    measurement_id = db.Column(db.Integer, db.ForeignKey("measurement.id"), index=True)
+    campaign_id = db.Column(db.Integer, db.ForeignKey("campaign.id"), index=True)
+    pipeline_id = db.Column(db.Integer, db.ForeignKey("pipeline.id"), index=True)
     input = db.relationship("JobInput", backref="job")
     table_output = db.relationship("JobTableOutput", backref="job")
     figure_output = db.relationship("JobFigureOutput", backref="job")
     reports = db.relationship("JobReport", backref="job")
+    upstream = db.relationship(
+        "Job",
+        secondary=job_dependency,
+        primaryjoin=id == job_dependency.c.job_id,
+        secondaryjoin=id == job_dependency.c.upstream_id,
+        backref="downstream",
+    )
 
     def clean_up(self, session):
         for input_ in self.input:
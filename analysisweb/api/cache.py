@@ -0,0 +1,223 @@
+"""
+This module contain the response cache that sits in front of the GET handlers
+of the resources
+
+Cached responses are grouped in namespaces, e.g. "job" for all jobs, "job:1" for
+a single job and "job:list" for the list of jobs. Every namespace has a
+generation counter that is part of the cache key, so invalidating a namespace is
+a matter of bumping its counter and stale entries will never be read again.
+"""
+import collections
+import pickle
+import threading
+import time
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+class LocalBackend(object):
+    """
+    An in-process LRU cache where every entry expires after a fixed time
+
+    Parameters
+    ----------
+    max_size: int
+        the maximum number of entries
+    ttl: float
+        the number of seconds an entry is valid
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = collections.OrderedDict()
+        # Counters are not part of the LRU, an evicted generation would
+        # otherwise make old entries valid again
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                expires, value = self._entries[key]
+            except KeyError:
+                return None
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_counter(self, key):
+        return self._counters.get(key, 0)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class LocalClient(object):
+    """
+    A stand-in for a Redis client keeping the data in process memory,
+    implementing the few commands used by the SharedBackend
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                expires, value = self._data[key]
+            except KeyError:
+                return None
+            if expires is not None and expires < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ex=None):
+        expires = time.monotonic() + ex if ex is not None else None
+        with self._lock:
+            self._data[key] = (expires, value)
+
+    def incr(self, key):
+        with self._lock:
+            _, value = self._data.get(key, (None, 0))
+            self._data[key] = (None, int(value) + 1)
+            return int(value) + 1
+
+
+class SharedBackend(object):
+    """
+    A cache backend shared between processes, e.g. by several web servers
+
+    Parameters
+    ----------
+    client: redis.Redis or LocalClient
+        the client to the shared store
+    ttl: float
+        the number of seconds an entry is valid
+    prefix: str
+        prefix of all keys in the shared store
+    """
+
+    def __init__(self, client, ttl, prefix="analysisweb:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return pickle.loads(value) if value is not None else None
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=int(self.ttl))
+
+    def get_counter(self, key):
+        return int(self.client.get(self.prefix + key) or 0)
+
+    def incr(self, key):
+        self.client.incr(self.prefix + key)
+
+
+class ResponseCache(object):
+    """
+    A cache of responses to GET requests, disabled until configured
+    """
+
+    def __init__(self):
+        self.backend = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def init_app(self, app):
+        cache_type = app.config["RESPONSE_CACHE_TYPE"]
+        ttl = app.config["RESPONSE_CACHE_TTL"]
+        if cache_type is None:
+            self.backend = None
+        elif cache_type == "local":
+            self.backend = LocalBackend(app.config["RESPONSE_CACHE_MAX_SIZE"], ttl)
+        elif cache_type == "shared":
+            url = app.config["RESPONSE_CACHE_URL"]
+            if url is None:
+                client = LocalClient()
+            elif redis is None:
+                raise RuntimeError("The shared response cache requires redis")
+            else:
+                client = redis.Redis.from_url(url)
+            self.backend = SharedBackend(client, ttl)
+        else:
+            raise ValueError("Unknown response cache type '{}'".format(cache_type))
+
+    def get_or_create(self, namespaces, key, make_response):
+        """
+        Return a cached response or create and cache a new one
+
+        Parameters
+        ----------
+        namespaces: list of str
+            the namespaces the response belongs to
+        key: str
+            the key of the response within the namespaces, e.g. the URL
+        make_response: callable
+            creates the response, only responses with status 200 are cached
+
+        Returns
+        -------
+        tuple
+            the response body, status code and headers
+        """
+        if self.backend is None:
+            return make_response()
+
+        generations = ".".join(
+            str(self.backend.get_counter("gen:" + ns)) for ns in namespaces
+        )
+        key = "{}@{}:{}".format("|".join(namespaces), generations, key)
+        response = self.backend.get(key)
+        if response is not None:
+            self.hits += 1
+            return response
+
+        self.misses += 1
+        response = make_response()
+        if response[1] == 200:
+            self.backend.set(key, response)
+        return response
+
+    def invalidate(self, *namespaces):
+        if self.backend is None:
+            return
+        for ns in namespaces:
+            self.backend.incr("gen:" + ns)
+            self.invalidations += 1
+
+    def stats(self):
+        stats = {
+            "enabled": self.backend is not None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+        if isinstance(self.backend, LocalBackend):
+            stats["size"] = len(self.backend)
+        return stats
+
+
+response_cache = ResponseCache()
@@ -8,5 +8,87 @@ class Config(UserConfig):
     MEASUREMENT_FILES_FOLDER = os.path.join(UserConfig.UPLOAD_FOLDER, "measurement")
     ANALYSIS_FILES_FOLDER = os.path.join(UserConfig.UPLOAD_FOLDER, "analysis")
     JOB_FILES_FOLDER = os.path.join(UserConfig.UPLOAD_FOLDER, "job")
+    # Content-addressed store that the uploaded measurement and job files link to
+    BLOB_FOLDER = os.path.join(UserConfig.UPLOAD_FOLDER, "blobs")
+    # Uploads are streamed here first, it must be on the same file system
+    # as the folders above so that they can be moved without copying
+    UPLOAD_TMP_FOLDER = os.path.join(UserConfig.UPLOAD_FOLDER, "tmp")
+
+    # Maximum size in bytes of a single uploaded file and of a whole request
+    UPLOAD_MAX_FILE_SIZE = None
+    MAX_CONTENT_LENGTH = None
+    # Chunked upload sessions without activity for this many seconds are removed
+    UPLOAD_SESSION_MAX_AGE = 24 * 3600
+
+    # Page size of list resources when no limit is given (None returns all items)
+    PAGE_LIMIT_DEFAULT = None
+    PAGE_LIMIT_MAX = 1000
+
+    # Seconds between the checks for new lines when following the log of a job
+    LOG_FOLLOW_INTERVAL = 1.0
+
+    # How the Celery worker completes a job: "direct" records the log and the
+    # status in the database itself, which needs access to the database and
+    # the upload folder, "http" posts the log to SERVER_URL. A failed direct
+    # completion falls back on the post. With a "local" response cache, the
+    # cache of the API is not invalidated by the worker, use a "shared" one.
+    # Only "direct" records the worker process of a job, so that the job is
+    # finished and its analysis killed if the worker process is lost.
+    JOB_COMPLETION = "direct"
+
+    # How the Celery worker runs an analysis: "process" starts SYMPATHY_EXEC for
+    # every job, "pool" runs it in a warm Sympathy process started with
+    # SYMPATHY_POOL_EXEC, which serves jobs as described in analysisweb.api.pool.
+    # Every worker process keeps SYMPATHY_POOL_SIZE warm processes, with the
+    # prefork pool of Celery a process runs one job at a time, so 1 is enough
+    # and the concurrency of the worker sets the number of warm processes.
+    JOB_EXECUTOR = "process"
+    SYMPATHY_POOL_EXEC = None
+    SYMPATHY_POOL_SIZE = 1
+    # A warm process is replaced after this many jobs, or once its resident
+    # memory has grown by this many bytes since its first job (None for no limit)
+    SYMPATHY_POOL_MAX_JOBS = 100
+    SYMPATHY_POOL_MAX_MEMORY_GROWTH = 512 * 1024 * 1024
+
+    # Wall-clock limit in seconds of all jobs (None for no limit), the timeout
+    # of an analysis can only be shorter
+    JOB_TIMEOUT = None
+
+    # The priorities that jobs can be submitted with, from the highest, and the
+    # Celery queues that they are sent to. Run separate workers for the queues,
+    # e.g. "celery worker -Q interactive" and "celery worker -Q celery,batch",
+    # so that batch jobs cannot hold up interactive ones
+    JOB_QUEUES = {"interactive": "interactive", "default": "celery", "batch": "batch"}
+    JOB_PRIORITY_DEFAULT = "default"
+    # Maximum number of jobs added at once with POST /jobs/batch
+    JOB_BATCH_MAX = 1000
+    # Maximum number of queued or running jobs per analysis and per measurement
+    # (None for no limit), the jobs beyond them are held back in the database
+    # until others finish. The limit of an analysis can be set on the analysis.
+    JOB_MAX_CONCURRENT_PER_ANALYSIS = None
+    JOB_MAX_CONCURRENT_PER_MEASUREMENT = None
+
+    # Satisfy a job with the outputs, reports and log of an earlier succeeded
+    # job of the same analysis file, inputs and measurement files, instead
+    # of running it again
+    JOB_RESULT_CACHE = False
+
+    # Save table (.csv) and figure (.html) outputs of jobs gzip-compressed
+    COMPRESS_OUTPUTS = True
+
+    # Files are sent with the sendfile support of the WSGI server. Set
+    # USE_X_SENDFILE to let the front server send them with X-Sendfile or set
+    # a prefix to let nginx send them from an internal location with
+    # X-Accel-Redirect, e.g. "/protected" mapped to UPLOAD_FOLDER
+    USE_X_SENDFILE = False
+    FILES_ACCEL_REDIRECT_PREFIX = None
+
+    # Cache of GET responses, either None (disabled), "local" for an in-process
+    # LRU cache or "shared" for a Redis cache at RESPONSE_CACHE_URL (if the URL
+    # is None, an in-process stand-in is used)
+    RESPONSE_CACHE_TYPE = None
+    RESPONSE_CACHE_TTL = 60
+    RESPONSE_CACHE_MAX_SIZE = 1024
+    RESPONSE_CACHE_URL = None
 
     SECRET_KEY = "you-will-never-guess"  # for developement
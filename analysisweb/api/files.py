@@ -0,0 +1,154 @@
+"""
+This module contain the blueprint serving the files that the resources refer to,
+e.g. files/measurement/1/data.csv or files/job/1/output/table.csv
+"""
+import mimetypes
+import os
+import posixpath
+from urllib.parse import quote
+
+from flask import (
+    Blueprint,
+    Response,
+    abort,
+    current_app,
+    request,
+    safe_join,
+    send_from_directory,
+)
+
+from analysisweb.api.uploads import CHUNK_SIZE, COMPRESSED_SUFFIX, open_stored
+
+files = Blueprint("files", __name__)
+
+# The config entries with the folders of the different kinds of files
+FOLDERS = {
+    "measurement": "MEASUREMENT_FILES_FOLDER",
+    "analysis": "ANALYSIS_FILES_FOLDER",
+    "job": "JOB_FILES_FOLDER",
+}
+
+# The parts of a job folder that can be downloaded, e.g. not inp.json
+JOB_SUBFOLDERS = ("input", "output", "reports")
+JOB_FILES = ("log.html",)
+
+
+def resolve_path(kind, filename):
+    """
+    Resolve a path in one of the file folders, aborting with 404 if it does not
+    exist or points outside of the folder
+
+    Returns
+    -------
+    tuple (str, str, str)
+        the folder, the normalized filename and the safe path of the file within
+        the folder
+    """
+    if kind not in FOLDERS:
+        abort(404)
+
+    # Normalized before the checks, e.g. job/1/output/../../2/inp.json would
+    # otherwise pass as an output
+    filename = posixpath.normpath(filename)
+    parts = filename.split("/")
+    if posixpath.isabs(filename) or ".." in parts or filename == ".":
+        abort(404)
+
+    if kind == "job":
+        if len(parts) < 2 or not (
+            (len(parts) > 2 and parts[1] in JOB_SUBFOLDERS)
+            or (len(parts) == 2 and parts[1] in JOB_FILES)
+        ):
+            abort(404)
+
+    folder = current_app.config[FOLDERS[kind]]
+    # Raises NotFound for paths outside of the folder
+    path = safe_join(folder, filename)
+    if not os.path.isfile(path) and not os.path.isfile(path + COMPRESSED_SUFFIX):
+        abort(404)
+    return folder, filename, path
+
+
+def send_compressed(folder, filename, path):
+    """
+    Send a file that is saved compressed, as it is to clients accepting gzip
+    encoding and otherwise decompressed on the fly
+    """
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    if request.accept_encodings["gzip"]:
+        response = send_from_directory(
+            folder, filename + COMPRESSED_SUFFIX, mimetype=mimetype
+        )
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+
+        def generate():
+            with open_stored(path) as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    yield chunk
+
+        response = Response(generate(), mimetype=mimetype)
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+@files.route("/<kind>/<path:filename>")
+def download(kind, filename):
+    """
+    Download a file of a measurement, an analysis or a job
+    ---
+    summary: Download a file, supports Range and conditional requests
+    tags:
+        - files
+    parameters:
+        -   name: kind
+            in: path
+            required: true
+            schema:
+                type: string
+                enum: [measurement, analysis, job]
+        -   name: filename
+            in: path
+            required: true
+            schema:
+                type: string
+    responses:
+        200:
+            description: The file, gzip encoded if it is saved compressed and
+                the client accepts it
+        206:
+            description: The requested range of the file
+        304:
+            description: File not modified
+        404:
+            description: File not found
+    """
+    folder, filename, path = resolve_path(kind, filename)
+
+    compressed = not os.path.isfile(path)
+    prefix = current_app.config["FILES_ACCEL_REDIRECT_PREFIX"]
+    if prefix is not None and (not compressed or request.accept_encodings["gzip"]):
+        # Let the front proxy, e.g. nginx, serve the file from an internal location
+        response = Response()
+        response.headers["X-Accel-Redirect"] = "{}/{}/{}".format(
+            prefix.rstrip("/"),
+            kind,
+            quote(filename + COMPRESSED_SUFFIX if compressed else filename),
+        )
+        del response.headers["Content-Type"]
+        if compressed:
+            # The proxy serves it as it is, with the type of the original file
+            response.headers["Content-Type"] = (
+                mimetypes.guess_type(filename)[0] or "application/octet-stream"
+            )
+            response.headers["Content-Encoding"] = "gzip"
+            response.vary.add("Accept-Encoding")
+        return response
+
+    if compressed:
+        # Decompressed on the fly for clients not accepting gzip
+        return send_compressed(folder, filename, path)
+
+    # Served with the file wrapper of the WSGI server (sendfile), or with an
+    # X-Sendfile header if USE_X_SENDFILE is set
+    return send_from_directory(folder, filename)
@@ -2,6 +2,8 @@
 Module containing model mixin classes that the user need to use in order
 to define user-defined tables for Measurements and Analyses
 """
+import datetime
+
 from sqlalchemy import Column, Integer, String, DateTime
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declared_attr
@@ -11,7 +13,41 @@ class MetaDataException(Exception):
     pass
 
 
-class MeasurementMixin(object):
+class VersionMixin(object):
+    """
+    A row version and modification time that are bumped on every change
+    to a resource, used to answer conditional requests
+    """
+
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    def touch(self):
+        # Incremented in SQL so that concurrent writers do not lose a bump
+        self.version = type(self).version + 1
+        self.updated_at = datetime.datetime.utcnow()
+
+
+class JobGroupMixin(VersionMixin):
+    """
+    A group of jobs submitted together, which is RUNNING until all of its jobs
+    have finished and then COMPLETED
+    """
+
+    id = Column(Integer, primary_key=True)
+    label = Column(String(64))
+    date = Column(DateTime, index=True)
+    status = Column(String(16), index=True)
+    finished_at = Column(DateTime)
+    # The number of jobs and how many of them have finished in each way,
+    # counted as the jobs finish
+    total = Column(Integer, default=0)
+    succeeded = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    cancelled = Column(Integer, default=0)
+
+
+class MeasurementMixin(VersionMixin):
     """
     A measurement of some sort that resulted in a collection of files
     This is a mixin class for a user-defined Measurement table
@@ -45,7 +81,7 @@ class MeasurementMixin(object):
             session.delete(file)
 
 
-class AnalysisMixin(object):
+class AnalysisMixin(VersionMixin):
     """
     A Sympathy for data analysis
     This is a mixin class for a user-defined Analysis table
@@ -54,6 +90,11 @@ class AnalysisMixin(object):
     id = Column(Integer, primary_key=True)
     label = Column(String(64))
     syx_file = Column(String(512))
+    syx_sha256 = Column(String(64))
+    # Wall-clock limit in seconds of the jobs of the analysis
+    timeout = Column(Integer)
+    # Maximum number of jobs of the analysis sent to the workers at once
+    max_concurrent = Column(Integer)
 
     @declared_attr
     def input(cls):
@@ -0,0 +1,312 @@
+"""
+This module contain the pool of warm Sympathy processes that the Celery worker
+can run analyses in, instead of starting Sympathy for every job
+
+A warm process is started with SYMPATHY_POOL_EXEC and runs one analysis at a
+time. It reads a request per line on stdin, a JSON object with the paths of the
+analysis, of the input config and of the log file. It writes the output of the
+analysis to the log file and then answers with a line on stdout, a JSON object
+with the exit code of the analysis, e.g.
+
+    {"analysis": "/data/analysis/1/flow.syx", "input": "/data/job/7/inp.json",
+     "log": "/data/job/7/log.txt"}
+    {"exit_code": 0}
+
+Other lines that it writes to stdout, e.g. by libraries printing, are skipped.
+It exits once its stdin is closed.
+"""
+import atexit
+import json
+import os
+import subprocess
+import threading
+
+from celery.utils.log import get_task_logger
+
+from analysisweb.api.utils import (
+    STOP_GRACE_PERIOD,
+    flask_app,
+    stop_process_group,
+    watch_process,
+    write_stop_reason,
+)
+
+logger = get_task_logger(__name__)
+
+
+class WarmProcess(object):
+    """
+    A long-lived Sympathy process running analyses one at a time
+
+    Parameters
+    ----------
+    args: list of str
+        the command that starts the process
+    """
+
+    def __init__(self, args):
+        self.process = subprocess.Popen(
+            args,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+            # A process group of its own, so that it can be stopped with
+            # all of its children
+            start_new_session=True,
+        )
+        self.jobs = 0
+        # The resident memory after the first job, once the process is warm
+        self.baseline_rss = None
+
+    @property
+    def alive(self):
+        return self.process.poll() is None
+
+    def rss(self):
+        """
+        The resident memory in bytes of the process group of the process, e.g.
+        Sympathy started by a wrapper script, or None if it is not known
+        """
+        try:
+            pids = [pid for pid in os.listdir("/proc") if pid.isdigit()]
+        except OSError:
+            return None
+        pages = None
+        for pid in pids:
+            try:
+                with open("/proc/{}/stat".format(pid)) as f:
+                    # The fields after the name, which can contain spaces,
+                    # starting with the state
+                    fields = f.read().rpartition(")")[2].split()
+                if int(fields[2]) == self.process.pid:
+                    pages = (pages or 0) + int(fields[21])
+            except (OSError, IndexError, ValueError):
+                # Exited in the meantime
+                continue
+        return None if pages is None else pages * os.sysconf("SC_PAGE_SIZE")
+
+    def _read_answer(self):
+        """
+        The exit code in the answer of the process, skipping other lines of its
+        output, or None if it exits without answering
+        """
+        for line in iter(self.process.stdout.readline, ""):
+            try:
+                return int(json.loads(line)["exit_code"])
+            except (KeyError, TypeError, ValueError):
+                logger.debug(
+                    "Skipping output of Sympathy process %s: %r",
+                    self.process.pid,
+                    line,
+                )
+        return None
+
+    def run(
+        self,
+        analysis_path,
+        inp_file,
+        log_path,
+        timeout=None,
+        should_stop=None,
+        on_start=None,
+    ):
+        """
+        Run an analysis, stopping the process if it times out or should stop
+
+        Returns
+        -------
+        tuple (int, str):
+            the exit code of the analysis and why it was stopped, i.e. None,
+            "timeout" or "cancelled"
+        """
+        open(log_path, "w").close()
+        if on_start is not None:
+            on_start(self.process)
+        request = {"analysis": analysis_path, "input": inp_file, "log": log_path}
+        finished = threading.Event()
+        reason = []
+        watchdog = threading.Thread(
+            target=watch_process,
+            args=(self.process, finished, timeout, should_stop, reason),
+            daemon=True,
+        )
+        watchdog.start()
+        try:
+            try:
+                self.process.stdin.write(json.dumps(request) + "\n")
+                self.process.stdin.flush()
+                exit_code = self._read_answer()
+            except OSError:
+                # The process has exited
+                exit_code = None
+        finally:
+            finished.set()
+        watchdog.join()
+        self.jobs += 1
+
+        reason = reason[0] if reason else None
+        if exit_code is not None:
+            return exit_code, reason
+        # Stopped, or exited or answered without running the analysis
+        if self.alive:
+            stop_process_group(self.process)
+        exit_code = self.process.wait()
+        with open(log_path, "a") as log:
+            if reason is None:
+                log.write("The Sympathy process exited unexpectedly\n")
+            write_stop_reason(log, reason, timeout)
+        # An exit without an answer is a failure even if the exit code is 0
+        return exit_code or 1, reason
+
+    def stop(self):
+        """
+        Let the process exit, stopping it if it has not after STOP_GRACE_PERIOD
+        seconds
+        """
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.process.wait(STOP_GRACE_PERIOD)
+        except subprocess.TimeoutExpired:
+            stop_process_group(self.process)
+        self.process.stdout.close()
+
+
+class SympathyPool(object):
+    """
+    A pool of warm Sympathy processes, which are replaced after a number of
+    jobs or once their memory has grown too much
+
+    Parameters
+    ----------
+    args: list of str
+        the command that starts a process
+    size: int
+        the number of processes
+    max_jobs: int
+        the number of jobs after which a process is replaced, or None
+    max_memory_growth: int
+        the growth in bytes of the resident memory of a process since its first
+        job after which it is replaced, or None
+    """
+
+    def __init__(self, args, size, max_jobs=None, max_memory_growth=None):
+        self.args = args
+        self.max_jobs = max_jobs
+        self.max_memory_growth = max_memory_growth
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        # Started up front, so that they are warm by the first job
+        self._idle = [self._start() for _ in range(size)]
+        self._idle = [process for process in self._idle if process is not None]
+
+    def _start(self):
+        try:
+            return WarmProcess(self.args)
+        except OSError:
+            logger.exception("Could not start a Sympathy process")
+            return None
+
+    def _worn_out(self, process):
+        if not process.alive:
+            return True
+        if self.max_jobs is not None and process.jobs >= self.max_jobs:
+            return True
+        rss = process.rss()
+        if process.baseline_rss is None:
+            process.baseline_rss = rss
+        elif (
+            rss is not None
+            and self.max_memory_growth is not None
+            and rss - process.baseline_rss > self.max_memory_growth
+        ):
+            logger.info(
+                "Replacing Sympathy process %s, which has grown by %s bytes",
+                process.process.pid,
+                rss - process.baseline_rss,
+            )
+            return True
+        return False
+
+    def run(
+        self,
+        analysis_path,
+        inp_file,
+        log_path,
+        timeout=None,
+        should_stop=None,
+        on_start=None,
+    ):
+        """
+        Run an analysis in an idle process, waiting for one if there is none
+
+        Returns
+        -------
+        tuple (int, str):
+            the exit code of the analysis and why it was stopped, i.e. None,
+            "timeout" or "cancelled"
+
+        Raises
+        ------
+        OSError
+            if no process can be started
+        """
+        with self._slots:
+            with self._lock:
+                process = self._idle.pop() if self._idle else None
+            if process is not None and not process.alive:
+                # Exited while it was idle
+                process.stop()
+                process = None
+            if process is None:
+                process = WarmProcess(self.args)
+            try:
+                result = process.run(
+                    analysis_path, inp_file, log_path, timeout, should_stop, on_start
+                )
+            except BaseException:
+                threading.Thread(target=process.stop, daemon=True).start()
+                raise
+
+            if self._worn_out(process):
+                # Stopped in the background, and the replacement warms up
+                # while the job is being finished
+                threading.Thread(target=process.stop, daemon=True).start()
+                process = self._start()
+            if process is not None:
+                with self._lock:
+                    self._idle.append(process)
+        return result
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for process in idle:
+            process.stop()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def sympathy_pool():
+    """
+    The pool of warm Sympathy processes of the worker process, started on first
+    use so that the processes of a forking worker do not share it
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            config = flask_app().config
+            if not config["SYMPATHY_POOL_EXEC"]:
+                raise OSError("SYMPATHY_POOL_EXEC is not set")
+            _pool = SympathyPool(
+                ["bash", config["SYMPATHY_POOL_EXEC"]],
+                config["SYMPATHY_POOL_SIZE"],
+                config["SYMPATHY_POOL_MAX_JOBS"],
+                config["SYMPATHY_POOL_MAX_MEMORY_GROWTH"],
+            )
+            atexit.register(_pool.close)
+        return _pool
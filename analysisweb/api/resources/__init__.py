@@ -1,14 +1,25 @@
+import base64
+import binascii
+import collections
+import datetime
 import json
 import os
 import shutil
+from urllib.parse import urlencode
 
-from flask import current_app, jsonify
+from dateutil.parser import parse as date_parser
+from flask import Response, current_app, request
 from flask_restful import Resource, marshal
 from flask_restful.fields import Raw
+from sqlalchemy import DateTime, and_, inspect, or_
+from sqlalchemy.orm import load_only
+from werkzeug.http import http_date
 
 import analysisweb_user
 from analysisweb.api import db
-from analysisweb_user.models import MetaDataException
+from analysisweb.api.cache import response_cache
+from analysisweb.api.storage import release_blobs
+from analysisweb_user.models import Job, MetaDataException
 
 
 class IDField(Raw):
@@ -32,23 +43,270 @@ class ResourceForbiddenActionException(Exception):
     response_code = 405
 
 
+class ResourceConflictException(Exception):
+    response_code = 409
+
+
+def naive_utc(date):
+    """
+    A date as naive UTC, as the dates are stored, if it has a time zone
+    """
+    if date.tzinfo is not None:
+        date = date.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return date
+
+
+def parse_date(value):
+    """
+    Parse a date given by a client, as naive UTC if it has a time zone
+
+    Raises
+    ------
+    ResourceInvalidInputException
+        if the value is not a valid date
+    """
+    try:
+        return naive_utc(date_parser(value))
+    except (OverflowError, ValueError):
+        raise ResourceInvalidInputException("Invalid date '{}'".format(value))
+
+
+def encode_cursor(values):
+    """
+    Encode the keyset values of the last item on a page as an opaque cursor
+    """
+    values = [v.isoformat() if hasattr(v, "isoformat") else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor, columns):
+    """
+    Decode a cursor created by `encode_cursor` into values for the given columns
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ResourceInvalidInputException("Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ResourceInvalidInputException("Invalid cursor")
+
+    decoded = []
+    for column, value in zip(columns, values):
+        if value is not None and isinstance(column.type, DateTime):
+            try:
+                value = date_parser(value)
+            except (OverflowError, ValueError):
+                raise ResourceInvalidInputException("Invalid cursor")
+        decoded.append(value)
+    return decoded
+
+
+def cache_namespaces(table, id_=None):
+    """
+    The namespaces of the cached responses for a resource, or for the list
+    of resources if no ID is given
+    """
+    name = table.__tablename__
+    return [name, "{}:{}".format(name, "list" if id_ is None else id_)]
+
+
 class ResourceBase(Resource):
 
     db_table = None
     fields = None
+    # Columns that define the order of list resources and that are
+    # used as the key for cursor pagination, the last one must be unique
+    cursor_columns = ("id",)
+    # Columns that list resources can be sorted on with the sort query argument
+    sort_columns = ()
+    # Relationships that are marshalled as part of the fields together with
+    # the loader strategy, e.g. selectinload, used to fetch them in bulk
+    eager_load = ()
+
+    def query_options(self, fields=None):
+        fields = fields or self.fields
+        options = [
+            loader(getattr(self.db_table, name))
+            for name, loader in self.eager_load
+            if name in fields
+        ]
+        columns = self.projected_columns(fields)
+        if columns is not None:
+            options.append(load_only(*columns))
+        return options
+
+    def projected_columns(self, fields):
+        """
+        The columns to load from the database for the given subset of the
+        fields, or None if all columns need to be loaded
+        """
+        if fields is self.fields:
+            return None
+        mapper = inspect(self.db_table)
+        # The version columns are needed for the ETag and Last-Modified headers
+        columns = set(name for name, _ in self.sort_order())
+        columns.update(["version", "updated_at"])
+        for name in fields:
+            if name in mapper.column_attrs.keys():
+                columns.add(name)
+            elif name not in mapper.relationships.keys():
+                # e.g. a property of a user-defined table, which could use any column
+                return None
+        return sorted(columns)
+
+    def requested_fields(self):
+        """
+        The fields given by the fields query argument, or all fields
+        """
+        if "fields" not in request.args:
+            return self.fields
+        names = [name.strip() for name in request.args["fields"].split(",")]
+        names = [name for name in names if name]
+        if not names:
+            raise ResourceInvalidInputException("No fields given")
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ResourceInvalidInputException(
+                "Unknown fields: {}".format(", ".join(unknown))
+            )
+        return {name: field for name, field in self.fields.items() if name in names}
+
+    def sort_order(self):
+        """
+        The columns to order list resources by, as (name, descending) pairs
+        """
+        if "sort" not in request.args:
+            return [(name, False) for name in self.cursor_columns]
+
+        sort = request.args["sort"]
+        name = sort.lstrip("-")
+        descending = sort.startswith("-")
+        if name not in self.sort_columns:
+            raise ResourceInvalidInputException(
+                "Cannot sort on '{}', expecting one of {}".format(
+                    name, ", ".join(self.sort_columns)
+                )
+            )
+        order = [(name, descending)]
+        if name != "id":
+            order.append(("id", descending))
+        return order
+
+    def filter_query(self, query):
+        """
+        Apply the filters given as query arguments to a list query
+        """
+        return query
 
     def get_all(self):
-        return [marshal(m, self.fields) for m in self.db_table.query.all()]
+        return response_cache.get_or_create(
+            cache_namespaces(self.db_table), request.full_path, self._get_all
+        )
 
-    def get_resource(self, id_, table=None):
-        table = table or self.db_table
+    def _get_all(self):
+        fields = self.requested_fields()
+        query = self.db_table.query.options(*self.query_options(fields))
+        query = self.filter_query(query)
+        limit = self.parse_limit()
+        order = self.sort_order()
+        columns = [getattr(self.db_table, name) for name, _ in order]
+        descending = [desc for _, desc in order]
+
+        if "after" in request.args:
+            values = decode_cursor(request.args["after"], columns)
+            query = query.filter(self.keyset_criterion(columns, values, descending))
+        query = query.order_by(
+            *[col.desc() if desc else col for col, desc in zip(columns, descending)]
+        )
+
+        if limit is None:
+            items = query.all()
+        else:
+            # Fetch one extra row to find out if there is a next page
+            items = query.limit(limit + 1).all()
+
+        headers = {}
+        if limit is not None and len(items) > limit:
+            items = items[:limit]
+            cursor = encode_cursor([getattr(items[-1], name) for name, _ in order])
+            args = [(k, v) for k, v in request.args.items(multi=True) if k != "after"]
+            args.append(("after", cursor))
+            headers["X-Next-Cursor"] = cursor
+            headers["Link"] = '<{}?{}>; rel="next"'.format(
+                request.base_url, urlencode(args)
+            )
+        return [marshal(m, fields) for m in items], 200, headers
+
+    @staticmethod
+    def keyset_criterion(columns, values, descending):
+        """
+        Create a criterion selecting all rows that come after the given
+        values when ordered by the given columns
+        """
+        column, value = columns[0], values[0]
+        after = column < value if descending[0] else column > value
+        if len(columns) == 1:
+            return after
+        rest = ResourceBase.keyset_criterion(columns[1:], values[1:], descending[1:])
+        return or_(after, and_(column == value, rest))
+
+    @staticmethod
+    def parse_limit():
+        limit = request.args.get("limit", current_app.config["PAGE_LIMIT_DEFAULT"])
+        if limit is None:
+            return None
         try:
-            id_ = int(id_)
+            limit = int(limit)
         except ValueError:
+            raise ResourceInvalidInputException("Limit is not a valid integer")
+        if limit < 1:
+            raise ResourceInvalidInputException("Limit must be a positive integer")
+        return min(limit, current_app.config["PAGE_LIMIT_MAX"])
+
+    def get_one(self, id_):
+        """
+        Respond to a GET of a single resource, using the version of the
+        resource and the response cache to avoid marshalling it if possible
+        """
+        not_modified = self.not_modified(id_)
+        if not_modified is not None:
+            return not_modified
+
+        try:
+            id_ = self.parse_id(id_)
+            fields = self.requested_fields()
+        except ResourceInvalidInputException as e:
+            return {"status": str(e)}, e.response_code
+        return response_cache.get_or_create(
+            cache_namespaces(self.db_table, id_),
+            request.full_path,
+            lambda: self._get_one(id_, fields),
+        )
+
+    def _get_one(self, id_, fields):
+        try:
+            resource = self.get_resource(id_, fields=fields)
+        except ResourceNotFoundException as e:
+            return {"status": str(e)}, e.response_code
+        headers = self.resource_headers(resource)
+        return self.dump_resource(resource, fields), 200, headers
+
+    @staticmethod
+    def parse_id(id_):
+        try:
+            return int(id_)
+        except (TypeError, ValueError):
             raise ResourceInvalidInputException("Item ID is not a valid integer")
 
+    def get_resource(self, id_, table=None, fields=None):
+        table = table or self.db_table
+        id_ = self.parse_id(id_)
+
+        query = table.query
+        if table is self.db_table:
+            query = query.options(*self.query_options(fields))
         try:
-            resource = table.query.get(id_)
+            resource = query.get(id_)
         except Exception as e:  # noqa
             raise ResourceNotFoundException(
                 "Item could not be retrieved from database: {}".format(e)
@@ -59,20 +317,116 @@ class ResourceBase(Resource):
         else:
             return resource
 
+    def not_modified(self, id_):
+        """
+        Answer a conditional GET from the version columns of a resource alone
+
+        Returns a 304 response if the copy of the client is still current,
+        otherwise None and the resource should be loaded and marshalled
+        """
+        if not request.if_none_match and not request.if_modified_since:
+            return None
+        try:
+            id_ = self.parse_id(id_)
+        except ResourceInvalidInputException:
+            return None
+
+        table = self.db_table
+        row = (
+            db.session.query(table.version, table.updated_at)
+            .filter(table.id == id_)
+            .first()
+        )
+        if row is None:
+            return None
+
+        if request.if_none_match:
+            current = request.if_none_match.contains(self.make_etag(id_, row.version))
+        else:
+            since = naive_utc(request.if_modified_since)
+            current = row.updated_at is not None and (
+                row.updated_at.replace(microsecond=0) <= since
+            )
+        if not current:
+            return None
+        return Response(
+            status=304, headers=self.version_headers(id_, row.version, row.updated_at)
+        )
+
+    def version_headers(self, id_, version, updated_at):
+        headers = {"ETag": '"{}"'.format(self.make_etag(id_, version))}
+        if updated_at is not None:
+            headers["Last-Modified"] = http_date(updated_at)
+        return headers
+
+    def resource_headers(self, db_resource):
+        return self.version_headers(
+            db_resource.id, db_resource.version, db_resource.updated_at
+        )
+
+    def make_etag(self, id_, version):
+        return "{}-{}-{}".format(self.db_table.__tablename__, id_, version)
+
+    @staticmethod
+    def touch_jobs(criterion):
+        """
+        Bump the version of all jobs matching a criterion in a single update
+        """
+        Job.query.filter(criterion).update(
+            {Job.version: Job.version + 1, Job.updated_at: datetime.datetime.utcnow()},
+            synchronize_session=False,
+        )
+
+    def parent_resources(self, db_resource):
+        """
+        The resources whose representation includes the given resource
+        """
+        return []
+
+    def file_hashes(self, db_resource):
+        """
+        The SHA-256 of the stored files of a resource
+        """
+        return []
+
     def delete_resource(self, base_path, db_resource):
         if hasattr(db_resource, "jobs") and db_resource.jobs:
             raise ResourceForbiddenActionException(
                 "Item cannot be removed because it is associated with a job"
             )
         json_resource = self.dump_resource(db_resource)
+        parents = self.parent_resources(db_resource)
+        for parent in parents:
+            parent.touch()
+        namespaces = self.cache_namespaces_of(db_resource, *parents)
+        hashes = self.file_hashes(db_resource)
         shutil.rmtree(os.path.join(base_path, str(db_resource.id)))
         db_resource.clean_up(db.session)
         db.session.delete(db_resource)
         db.session.commit()
+        response_cache.invalidate(*namespaces)
+        release_blobs(hashes)
         return json_resource
 
-    def dump_resource(self, db_resource):
-        return marshal(db_resource, self.fields)
+    def invalidate_cache(self, *db_resources):
+        """
+        Invalidate the cached responses of resources and of the lists of them,
+        should be called after the changes to the resources are committed
+        """
+        response_cache.invalidate(*self.cache_namespaces_of(*db_resources))
+
+    @staticmethod
+    def cache_namespaces_of(*db_resources):
+        namespaces = []
+        for db_resource in db_resources:
+            if db_resource is not None:
+                name = db_resource.__tablename__
+                namespaces.append("{}:{}".format(name, db_resource.id))
+                namespaces.append("{}:list".format(name))
+        return namespaces
+
+    def dump_resource(self, db_resource, fields=None):
+        return marshal(db_resource, fields or self.fields)
 
     @staticmethod
     def load_metadata(metadata, db_resource):
@@ -89,15 +443,21 @@ class ResourceBase(Resource):
 
 
 class MetaResource(Resource):
+
+    # The serialized meta data by filename, together with the file modification
+    # time when it was read
+    _meta_cache = {}
+
     @staticmethod
     def load_meta(filename):
         path = os.path.abspath(os.path.dirname(analysisweb_user.__file__))
         meta_filename = os.path.join(path, filename)
-        with open(meta_filename, "r") as f:
-            meta = json.load(f)
-        current_app.config[
-            "JSON_SORT_KEYS"
-        ] = False  # This is not recommended by Flask but done here locally
-        meta = jsonify(meta)
-        current_app.config["JSON_SORT_KEYS"] = True
-        return meta
+        mtime = os.stat(meta_filename).st_mtime
+        cached = MetaResource._meta_cache.get(meta_filename)
+        if cached is None or cached[0] != mtime:
+            with open(meta_filename, "r") as f:
+                meta = json.load(f, object_pairs_hook=collections.OrderedDict)
+            # Serialized here rather than by jsonify to keep the order of the keys
+            cached = (mtime, json.dumps(meta, indent=2).encode() + b"\n")
+            MetaResource._meta_cache[meta_filename] = cached
+        return Response(cached[1], mimetype="application/json")
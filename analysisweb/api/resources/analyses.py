@@ -3,10 +3,13 @@ import json
 
 from flask import request, current_app
 from flask_restful.fields import Integer, List, Nested, String
+from sqlalchemy.orm import selectinload
 from werkzeug.utils import secure_filename
 
 from analysisweb.api import db
-from analysisweb_user.models import Analysis, AnalysisInput, AnalysisOutput
+from analysisweb.api.cache import response_cache
+from analysisweb.api.uploads import save_upload
+from analysisweb_user.models import Analysis, AnalysisInput, AnalysisOutput, Job
 from . import (
     ResourceBase,
     MetaResource,
@@ -30,11 +33,19 @@ class AnalysisResource(ResourceBase):
             attribute=lambda x: "files/analysis/{}/{}".format(x.id, x.syx_file)
         ),
         "meta_data": String,
+        "timeout": Integer(default=None),
+        "max_concurrent": Integer(default=None),
         "input": List(Nested(analysis_inputoutput)),
         "output": List(Nested(analysis_inputoutput)),
         "jobs": List(IDField),
     }
 
+    eager_load = (
+        ("input", selectinload),
+        ("output", selectinload),
+        ("jobs", selectinload),
+    )
+
     def get(self, id_):
         """
         Receive a analysis
@@ -49,6 +60,12 @@ class AnalysisResource(ResourceBase):
                 required: true
                 schema:
                     type: integer
+            -   name: fields
+                in: query
+                description: Comma-separated list of the fields to return
+                required: false
+                schema:
+                    type: string
         responses:
             200:
                 description: successful operation
@@ -56,16 +73,14 @@ class AnalysisResource(ResourceBase):
                     application/json:
                         schema:
                             $ref: "#/components/schemas/Analysis"
+            304:
+                description: Resource not modified since the given ETag or date
             400:
                 description: Invalid ID supplied
             404:
                 description: Analysis not found
         """
-        try:
-            resource = self.get_resource(id_)
-        except (ResourceInvalidInputException, ResourceNotFoundException) as e:
-            return {"status": str(e)}, e.response_code
-        return self.dump_resource(resource), 200
+        return self.get_one(id_)
 
     def delete(self, id_):
         """
@@ -138,6 +153,15 @@ class AnalysisResource(ResourceBase):
                                     $ref: "#/components/schemas/AnalysisInput"
                             meta_data:
                                 type: string
+                            timeout:
+                                type: integer
+                                description: Seconds after which the jobs of the
+                                    analysis are stopped, empty for no timeout
+                            max_concurrent:
+                                type: integer
+                                description: Maximum number of jobs of the analysis
+                                    that are queued or run at once, empty for
+                                    the default of the server
                             syx_file:
                                 $ref: "#/components/schemas/File"
         responses:
@@ -177,8 +201,39 @@ class AnalysisResource(ResourceBase):
                     raise ResourceInvalidInputException("Missing input")
                 self.set_analysis_syx(list(request.files.values())[0], resource)
 
-        resource.label = request.form.get("label", resource.label)
+        label = request.form.get("label", resource.label)
+        label_changed = label != resource.label
+        if label_changed:
+            # The jobs of the analysis list its label
+            self.touch_jobs(Job.analysis_id == resource.id)
+        resource.label = label
         self.load_metadata(request.form.get("meta_data", None), resource)
+        for name in ["timeout", "max_concurrent"]:
+            self.load_limit(name, request.form.get(name, None), resource)
+        resource.touch()
+        db.session.commit()
+        self.invalidate_cache(resource)
+        if label_changed:
+            response_cache.invalidate(Job.__tablename__)
+
+    @staticmethod
+    def load_limit(name, value, analysis):
+        """
+        Set a limit of the jobs of an analysis, i.e. the timeout or the maximum
+        number of concurrent jobs, an empty string removes it
+        """
+        if value is None:
+            return
+        label = name.replace("_", " ").capitalize()
+        try:
+            value = int(value) if value else None
+        except ValueError:
+            raise ResourceInvalidInputException(
+                "{} is not a valid integer".format(label)
+            )
+        if value is not None and value <= 0:
+            raise ResourceInvalidInputException("{} must be positive".format(label))
+        setattr(analysis, name, value)
 
     @staticmethod
     def add_analysis_io(analysis, input_list, output_list):
@@ -254,7 +309,9 @@ class AnalysisResource(ResourceBase):
             current_app.config["ANALYSIS_FILES_FOLDER"], str(analysis.id)
         )
         os.makedirs(file_folder)
-        file.save(os.path.join(file_folder, filename))
+        # The jobs of another analysis file get other fingerprints, so the
+        # results of the jobs of the previous file are not reused
+        analysis.syx_sha256, _ = save_upload(file, os.path.join(file_folder, filename))
         analysis.syx_file = filename
 
     @staticmethod
@@ -320,6 +377,7 @@ class AnalysisListResource(ResourceBase):
 
     db_table = Analysis
     fields = AnalysisResource.fields
+    eager_load = AnalysisResource.eager_load
 
     def get(self):
         """
@@ -328,17 +386,46 @@ class AnalysisListResource(ResourceBase):
         summary: Retrieve a list of analyses
         tags:
             - analyses
+        parameters:
+            -   name: limit
+                in: query
+                description: Maximum number of analyses to return
+                required: false
+                schema:
+                    type: integer
+            -   name: after
+                in: query
+                description: Cursor from the X-Next-Cursor header of the previous page
+                required: false
+                schema:
+                    type: string
+            -   name: fields
+                in: query
+                description: Comma-separated list of the fields to return
+                required: false
+                schema:
+                    type: string
         responses:
             200:
                 description: OK
+                headers:
+                    X-Next-Cursor:
+                        description: Cursor of the next page, if there is one
+                        schema:
+                            type: string
                 content:
                     application/json:
                         schema:
                             type: array
                             items:
                                 $ref: "#/components/schemas/Analysis"
+            400:
+                description: Invalid limit, cursor or fields
         """
-        return self.get_all(), 200
+        try:
+            return self.get_all()
+        except ResourceInvalidInputException as e:
+            return {"status": str(e)}, e.response_code
 
     def post(self):
         """
@@ -364,6 +451,15 @@ class AnalysisListResource(ResourceBase):
                                     $ref: "#/components/schemas/AnalysisInput"
                             meta_data:
                                 type: string
+                            timeout:
+                                type: integer
+                                description: Seconds after which the jobs of the
+                                    analysis are stopped, empty for no timeout
+                            max_concurrent:
+                                type: integer
+                                description: Maximum number of jobs of the analysis
+                                    that are queued or run at once, empty for
+                                    the default of the server
                             syx_file:
                                 $ref: "#/components/schemas/File"
 
@@ -390,8 +486,11 @@ class AnalysisListResource(ResourceBase):
             f, request.form.getlist("input"), request.form.getlist("output")
         )
         self.load_metadata(request.form.get("meta_data", "{}"), f)
+        for name in ["timeout", "max_concurrent"]:
+            AnalysisResource.load_limit(name, request.form.get(name, None), f)
         AnalysisResource.set_analysis_syx(list(request.files.values())[0], f)
         db.session.commit()
+        self.invalidate_cache(f)
         return analysis_id
 
     @staticmethod
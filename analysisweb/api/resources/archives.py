@@ -0,0 +1,178 @@
+import os
+
+from flask import Response, request, current_app
+from sqlalchemy.orm import selectinload
+
+from analysisweb.api.archives import archive_size, make_entries, stream_archive
+from analysisweb_user.models import Job
+from .jobs import JobResource
+from . import (
+    ResourceBase,
+    ResourceInvalidInputException,
+    ResourceNotFoundException,
+)
+
+
+def job_files(job):
+    """
+    The files of the outputs, reports and log of a job
+
+    Returns
+    -------
+    list of (str, str)
+        the name in the archive and the path of every file
+    """
+    folder = os.path.join(current_app.config["JOB_FILES_FOLDER"], str(job.id))
+    prefix = "job-{}".format(job.id)
+    paths = []
+    for output in job.table_output:
+        paths.append(os.path.join("output", output.path))
+    for output in job.figure_output:
+        paths.append(os.path.join("output", output.path))
+        paths.append(os.path.join("output", output.html))
+    for report in job.reports:
+        paths.append(os.path.join("reports", report.path))
+    if job.log:
+        paths.append(job.log)
+    return [(prefix + "/" + path, os.path.join(folder, path)) for path in paths]
+
+
+def archive_response(jobs, filename):
+    """
+    A streamed response with a ZIP archive of the files of jobs, the size
+    of the archive is only known up front if no file is compressed
+    """
+    compress = request.args.get("compress", "1") != "0"
+    entries = make_entries([f for job in jobs for f in job_files(job)], compress)
+    headers = {"Content-Disposition": 'attachment; filename="{}"'.format(filename)}
+    size = archive_size(entries)
+    if size is not None:
+        headers["Content-Length"] = str(size)
+    return Response(
+        stream_archive(entries), mimetype="application/zip", headers=headers
+    )
+
+
+class JobArchiveResource(ResourceBase):
+
+    db_table = Job
+    fields = JobResource.fields
+    eager_load = (
+        ("table_output", selectinload),
+        ("figure_output", selectinload),
+        ("reports", selectinload),
+    )
+
+    def get(self, id_):
+        """
+        Download the results of a job
+        ---
+        summary: Download a ZIP archive with the output, reports and log of a job
+        tags:
+            - jobs
+        parameters:
+            -   name: id_
+                in: path
+                description: ID of job
+                required: true
+                schema:
+                    type: integer
+            -   name: compress
+                in: query
+                description: Set to 0 to store all files uncompressed, which
+                    makes the size of the archive known up front
+                required: false
+                schema:
+                    type: integer
+        responses:
+            200:
+                description: The archive
+                content:
+                    application/zip:
+                        schema:
+                            type: string
+                            format: binary
+            400:
+                description: Invalid ID supplied
+            404:
+                description: Job not found
+        """
+        try:
+            resource = self.get_resource(id_)
+        except (ResourceInvalidInputException, ResourceNotFoundException) as e:
+            return {"status": str(e)}, e.response_code
+        return archive_response([resource], "job-{}.zip".format(resource.id))
+
+
+class JobListArchiveResource(ResourceBase):
+
+    db_table = Job
+    fields = JobResource.fields
+    eager_load = JobArchiveResource.eager_load
+
+    def get(self):
+        """
+        Download the results of several jobs
+        ---
+        summary: Download a ZIP archive with the output, reports and log of jobs
+        tags:
+            - jobs
+        parameters:
+            -   name: ids
+                in: query
+                description: Comma-separated list of job IDs
+                required: true
+                schema:
+                    type: string
+            -   name: compress
+                in: query
+                description: Set to 0 to store all files uncompressed, which
+                    makes the size of the archive known up front
+                required: false
+                schema:
+                    type: integer
+        responses:
+            200:
+                description: The archive
+                content:
+                    application/zip:
+                        schema:
+                            type: string
+                            format: binary
+            400:
+                description: Invalid or too many IDs supplied
+            404:
+                description: Job not found
+        """
+        try:
+            jobs = self._get_jobs()
+        except (ResourceInvalidInputException, ResourceNotFoundException) as e:
+            return {"status": str(e)}, e.response_code
+        return archive_response(jobs, "jobs.zip")
+
+    def _get_jobs(self):
+        try:
+            ids = [int(id_) for id_ in request.args["ids"].split(",")]
+        except (KeyError, ValueError):
+            raise ResourceInvalidInputException("Missing or invalid job IDs")
+        if len(ids) > current_app.config["PAGE_LIMIT_MAX"]:
+            raise ResourceInvalidInputException(
+                "At most {} jobs can be archived at once".format(
+                    current_app.config["PAGE_LIMIT_MAX"]
+                )
+            )
+
+        jobs = (
+            Job.query.options(*self.query_options())
+            .filter(Job.id.in_(ids))
+            .order_by(Job.id)
+            .all()
+        )
+        missing = set(ids) - set(job.id for job in jobs)
+        if missing:
+            raise ResourceNotFoundException(
+                "Jobs {} do not exist in the database".format(
+                    ", ".join(str(id_) for id_ in sorted(missing))
+                )
+            )
+        return jobs
@@ -0,0 +1,22 @@
+from flask_restful import Resource
+
+from analysisweb.api.cache import response_cache
+
+
+class CacheStatsResource(Resource):
+    def get(self):
+        """
+        Obtain statistics of the response cache
+        ---
+        summary: Retrieve the hit and miss counters of the response cache
+        tags:
+            - cache
+        responses:
+            200:
+                description: OK
+                content:
+                    application/json:
+                        schema:
+                            $ref: "#/components/schemas/CacheStats"
+        """
+        return response_cache.stats(), 200
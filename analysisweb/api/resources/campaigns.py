@@ -0,0 +1,338 @@
+import datetime
+
+from flask import request, current_app
+from flask_restful.fields import Integer, List, String
+from sqlalchemy.orm import joinedload, selectinload
+
+from analysisweb.api import db
+from analysisweb.api.cache import response_cache
+from analysisweb.api.base_models import Campaign
+from analysisweb.api.services import dispatch_jobs
+from analysisweb_user.models import Analysis, Job, Measurement
+from .jobs import JobBatchResource, JobListResource
+from .measurements import MeasurementListResource
+from . import (
+    ResourceBase,
+    ResourceInvalidInputException,
+    ResourceNotFoundException,
+    IDField,
+)
+
+# The placeholders of the input template and the measurement attributes that
+# replace them
+INPUT_PLACEHOLDERS = (("{measurement_id}", "id"), ("{measurement_label}", "label"))
+
+
+class CampaignResource(ResourceBase):
+
+    db_table = Campaign
+
+    fields = {
+        "id": Integer,
+        "label": String,
+        "date": String(attribute=lambda x: x.date.strftime("%Y-%m-%d %H:%M")),
+        "status": String,
+        "finished_at": String,
+        "total": Integer,
+        "succeeded": Integer,
+        "failed": Integer,
+        "cancelled": Integer,
+        "analysis": IDField,
+        "jobs": List(IDField),
+    }
+
+    eager_load = (("analysis", joinedload), ("jobs", selectinload))
+
+    def get(self, id_):
+        """
+        Receive a campaign
+        ---
+        summary: Find a campaign by ID, with the progress of its jobs
+        tags:
+            - campaigns
+        parameters:
+            -   name: id_
+                in: path
+                description: ID of campaign to return
+                required: true
+                schema:
+                    type: integer
+            -   name: fields
+                in: query
+                description: Comma-separated list of the fields to return
+                required: false
+                schema:
+                    type: string
+        responses:
+            200:
+                description: successful operation
+                content:
+                    application/json:
+                        schema:
+                            $ref: "#/components/schemas/Campaign"
+            304:
+                description: Resource not modified since the given ETag or date
+            400:
+                description: Invalid ID supplied
+            404:
+                description: Campaign not found
+        """
+        return self.get_one(id_)
+
+
+class CampaignListResource(ResourceBase):
+
+    db_table = Campaign
+    fields = CampaignResource.fields
+    eager_load = CampaignResource.eager_load
+    cursor_columns = ("date", "id")
+    sort_columns = ("date", "status", "label", "id")
+
+    def get(self):
+        """
+        Obtain a list of campaigns
+        ---
+        summary: Retrieve a list of campaigns
+        tags:
+            - campaigns
+        parameters:
+            -   name: limit
+                in: query
+                description: Maximum number of campaigns to return
+                required: false
+                schema:
+                    type: integer
+            -   name: after
+                in: query
+                description: Cursor from the X-Next-Cursor header of the previous page
+                required: false
+                schema:
+                    type: string
+            -   name: fields
+                in: query
+                description: Comma-separated list of the fields to return
+                required: false
+                schema:
+                    type: string
+            -   name: status
+                in: query
+                description: Comma-separated list of campaign statuses to include,
+                    i.e. running or completed
+                required: false
+                schema:
+                    type: string
+            -   name: analysis
+                in: query
+                description: ID of the analysis of the campaigns
+                required: false
+                schema:
+                    type: integer
+            -   name: sort
+                in: query
+                description: Column to sort on, prefix with - for descending order
+                required: false
+                schema:
+                    type: string
+                    enum: [date, -date, status, -status, label, -label, id, -id]
+        responses:
+            200:
+                description: OK
+                headers:
+                    X-Next-Cursor:
+                        description: Cursor of the next page, if there is one
+                        schema:
+                            type: string
+                content:
+                    application/json:
+                        schema:
+                            type: array
+                            items:
+                                $ref: "#/components/schemas/Campaign"
+            400:
+                description: Invalid limit, cursor, fields, filter or sort
+        """
+        try:
+            return self.get_all()
+        except ResourceInvalidInputException as e:
+            return {"status": str(e)}, e.response_code
+
+    def filter_query(self, query):
+        args = request.args
+        if args.get("status"):
+            query = query.filter(Campaign.status.in_(args["status"].upper().split(",")))
+        if "analysis" in args:
+            try:
+                query = query.filter(Campaign.analysis_id == int(args["analysis"]))
+            except ValueError:
+                raise ResourceInvalidInputException(
+                    "ID of analysis is not a valid integer"
+                )
+        return query
+
+    def post(self):
+        """
+        Run an analysis over many measurements
+        ---
+        summary: Add a campaign, which queues one job of an analysis for every
+            measurement matching a selector, with inputs from a template
+        tags:
+            - campaigns
+        requestBody:
+            content:
+                application/json:
+                    schema:
+                        properties:
+                            label:
+                                type: string
+                            analysis:
+                                type: integer
+                            priority:
+                                type: string
+                            measurements:
+                                type: object
+                                description: Selects the measurements matching
+                                    all of the given criteria, the time windows
+                                    are given as <from>,<to>
+                                properties:
+                                    ids:
+                                        type: array
+                                        items:
+                                            type: integer
+                                    overlaps:
+                                        type: string
+                                    contains:
+                                        type: string
+                                    within:
+                                        type: string
+                            input:
+                                type: array
+                                description: Values or references to the
+                                    measurement, in which {measurement_id} and
+                                    {measurement_label} are replaced for every job
+                                items:
+                                    type: string
+        responses:
+            202:
+                description: Campaign was successfully added and its jobs queued
+                content:
+                    application/json:
+                        schema:
+                            properties:
+                                status:
+                                    type: string
+                                id:
+                                    type: integer
+                                total:
+                                    type: integer
+            400:
+                description: Id of analysis is invalid, invalid input, or no
+                    measurement matches the selector
+            404:
+                description: Id of analysis is not existing
+        """
+        try:
+            campaign = self._add_campaign()
+        except (ResourceInvalidInputException, ResourceNotFoundException) as e:
+            db.session.rollback()
+            return {"status": str(e)}, e.response_code
+        return {"status": "success", "id": campaign.id, "total": campaign.total}, 202
+
+    def _add_campaign(self):
+        data = request.get_json(silent=True)
+        if (
+            not isinstance(data, dict)
+            or not isinstance(data.get("label", None), str)
+            or "analysis" not in data
+            or not isinstance(data.get("measurements", None), dict)
+            or not isinstance(data.get("input", None), list)
+        ):
+            raise ResourceInvalidInputException("Missing input")
+        template = [str(value) for value in data["input"]]
+        if any(value.startswith("$file:") for value in template):
+            raise ResourceInvalidInputException(
+                "Files cannot be uploaded in a campaign"
+            )
+
+        analysis = self.get_resource(data["analysis"], Analysis)
+        priority = JobListResource.parse_priority(data.get("priority", None))
+        measurements = self.select_measurements(data["measurements"])
+        items = []
+        for measurement in measurements:
+            input_list = self.expand_input(template, measurement)
+            JobListResource.validate_job_input(analysis, measurement, input_list)
+            label = "{} {}".format(data["label"], measurement.label)
+            items.append((label[: Job.label.type.length], measurement, input_list))
+
+        campaign = Campaign(
+            label=data["label"],
+            date=datetime.datetime.now(),
+            status="RUNNING",
+            total=len(items),
+            succeeded=0,
+            failed=0,
+            cancelled=0,
+            analysis_id=analysis.id,
+        )
+        db.session.add(campaign)
+        db.session.flush()
+        jobs = JobBatchResource.create_jobs(
+            analysis, priority, items, campaign_id=campaign.id
+        )
+
+        analysis.touch()
+        Measurement.query.filter(
+            Measurement.id.in_([measurement.id for measurement in measurements])
+        ).update(
+            {
+                Measurement.version: Measurement.version + 1,
+                Measurement.updated_at: datetime.datetime.utcnow(),
+            },
+            synchronize_session=False,
+        )
+        db.session.commit()
+        self.invalidate_cache(campaign, analysis, *measurements)
+        response_cache.invalidate("{}:list".format(Job.__tablename__))
+        # The jobs share the analysis, so they are all sent to the workers at
+        # once, as far as the concurrency limits allow
+        dispatch_jobs(jobs[0])
+        return campaign
+
+    @staticmethod
+    def select_measurements(selector):
+        """
+        The measurements matching a selector of IDs and time windows
+        """
+        query = Measurement.query.options(selectinload("files"))
+        if "ids" in selector:
+            if not isinstance(selector["ids"], list):
+                raise ResourceInvalidInputException(
+                    "IDs of measurements must be given as a list"
+                )
+            try:
+                ids = [int(id_) for id_ in selector["ids"]]
+            except (TypeError, ValueError):
+                raise ResourceInvalidInputException(
+                    "IDs of measurements are not valid integers"
+                )
+            query = query.filter(Measurement.id.in_(ids))
+        query = MeasurementListResource.filter_windows(query, selector)
+        measurements = query.order_by(Measurement.start_date, Measurement.id).all()
+
+        if not measurements:
+            raise ResourceInvalidInputException("No measurement matches the selector")
+        if len(measurements) > current_app.config["JOB_BATCH_MAX"]:
+            raise ResourceInvalidInputException(
+                "At most {} measurements can be selected, found {}".format(
+                    current_app.config["JOB_BATCH_MAX"], len(measurements)
+                )
+            )
+        return measurements
+
+    @staticmethod
+    def expand_input(template, measurement):
+        input_list = []
+        for value in template:
+            for placeholder, attribute in INPUT_PLACEHOLDERS:
+                value = value.replace(placeholder, str(getattr(measurement, attribute)))
+            input_list.append(value)
+        return input_list
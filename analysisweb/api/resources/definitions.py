@@ -18,7 +18,12 @@ schemas["Measurement"] = {
         "meta_data": {"type": "string"},
         "files": {
             "type": "object",
-            "properties": {"label": {"type": "string"}, "path": {"type": "string"}},
+            "properties": {
+                "label": {"type": "string"},
+                "path": {"type": "string"},
+                "sha256": {"type": "string"},
+                "size": {"type": "integer"},
+            },
         },
         "jobs": {
             "type": "array",
@@ -53,6 +58,8 @@ schemas["Analysis"] = {
         "label": {"type": "string"},
         "syx_file": {"type": "string"},
         "meta_data": {"type": "string"},
+        "timeout": {"type": "integer"},
+        "max_concurrent": {"type": "integer"},
         "input": {
             "type": "array",
             "items": {"$ref": "#/components/schemas/AnalysisInput"},
@@ -76,7 +83,23 @@ schemas["Job"] = {
     "properties": {
         "id": {"type": "integer"},
         "label": {"type": "string"},
-        "status": {"type": "string"},
+        "status": {
+            "type": "string",
+            "enum": [
+                "WAITING",
+                "QUEUED",
+                "RUNNING",
+                "SUCCEEDED",
+                "FAILED",
+                "TIMED_OUT",
+                "CANCELLED",
+            ],
+        },
+        "priority": {"type": "string"},
+        "queued_at": {"type": "string", "format": "date-time"},
+        "started_at": {"type": "string", "format": "date-time"},
+        "finished_at": {"type": "string", "format": "date-time"},
+        "exit_code": {"type": "integer"},
         "log": {"type": "string"},
         "analysis": {
             "type": "object",
@@ -86,6 +109,21 @@ schemas["Job"] = {
             "type": "object",
             "properties": {"id": {"type": "integer"}, "label": {"type": "string"}},
         },
+        "campaign": {
+            "type": "object",
+            "properties": {"id": {"type": "integer"}, "label": {"type": "string"}},
+        },
+        "pipeline": {
+            "type": "object",
+            "properties": {"id": {"type": "integer"}, "label": {"type": "string"}},
+        },
+        "upstream": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"id": {"type": "integer"}, "label": {"type": "string"}},
+            },
+        },
         "date": {"type": "string", "format": "date-time"},
         "input": {"type": "array", "items": {"type": "string"}},
         "output": {"type": "array", "items": {"type": "string"}},
@@ -93,6 +131,80 @@ schemas["Job"] = {
     },
 }
 
+schemas["Campaign"] = {
+    "type": "object",
+    "properties": {
+        "id": {"type": "integer"},
+        "label": {"type": "string"},
+        "date": {"type": "string", "format": "date-time"},
+        "status": {"type": "string", "enum": ["RUNNING", "COMPLETED"]},
+        "finished_at": {"type": "string", "format": "date-time"},
+        "total": {"type": "integer"},
+        "succeeded": {"type": "integer"},
+        "failed": {"type": "integer"},
+        "cancelled": {"type": "integer"},
+        "analysis": {
+            "type": "object",
+            "properties": {"id": {"type": "integer"}, "label": {"type": "string"}},
+        },
+        "jobs": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"id": {"type": "integer"}, "label": {"type": "string"}},
+            },
+        },
+    },
+}
+
+schemas["Pipeline"] = {
+    "type": "object",
+    "properties": {
+        "id": {"type": "integer"},
+        "label": {"type": "string"},
+        "date": {"type": "string", "format": "date-time"},
+        "status": {"type": "string", "enum": ["RUNNING", "COMPLETED"]},
+        "finished_at": {"type": "string", "format": "date-time"},
+        "total": {"type": "integer"},
+        "succeeded": {"type": "integer"},
+        "failed": {"type": "integer"},
+        "cancelled": {"type": "integer"},
+        "jobs": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"id": {"type": "integer"}, "label": {"type": "string"}},
+            },
+        },
+    },
+}
+
+schemas["UploadSession"] = {
+    "type": "object",
+    "properties": {
+        "id": {"type": "integer"},
+        "filename": {"type": "string"},
+        "size": {"type": "integer"},
+        "sha256": {"type": "string"},
+        "received": {
+            "type": "array",
+            "items": {"type": "array", "items": {"type": "integer"}},
+        },
+        "complete": {"type": "boolean"},
+    },
+}
+
+schemas["CacheStats"] = {
+    "type": "object",
+    "properties": {
+        "enabled": {"type": "boolean"},
+        "hits": {"type": "integer"},
+        "misses": {"type": "integer"},
+        "invalidations": {"type": "integer"},
+        "size": {"type": "integer"},
+    },
+}
+
 swagger_template = {
     "openapi": "3.0.0",
     "info": {
@@ -102,6 +214,15 @@ swagger_template = {
         "version": "0.0.1",
         "contact": {"email": "samuel.genheden@combine.se"},
     },
-    "tags": [{"name": "measurements"}, {"name": "analyses"}, {"name": "jobs"}],
+    "tags": [
+        {"name": "measurements"},
+        {"name": "analyses"},
+        {"name": "jobs"},
+        {"name": "campaigns"},
+        {"name": "pipelines"},
+        {"name": "uploads"},
+        {"name": "files"},
+        {"name": "cache"},
+    ],
     "components": {"schemas": schemas},
 }
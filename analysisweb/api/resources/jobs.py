@@ -1,13 +1,25 @@
 import datetime
-import json
 import os
+import time
 
-from flask import request, current_app
+from flask import Response, request, current_app, stream_with_context
 from flask_restful.fields import Integer, List, Raw, String, Nested
+from sqlalchemy.orm import joinedload, selectinload
 from werkzeug.utils import secure_filename
 
 from analysisweb.api import db
+from analysisweb.api.cache import response_cache
 import analysisweb.api.utils as utils
+from analysisweb.api.base_models import JOB_ACTIVE_STATES, JOB_TRANSITIONS
+from analysisweb.api.services import (
+    cancel_job,
+    dispatch_jobs,
+    finish_job,
+    job_fingerprint,
+    job_folder,
+)
+from analysisweb.api.storage import store_file
+from analysisweb.api.uploads import mkstemp, save_compressed, save_upload
 from analysisweb_user.models import (
     Measurement,
     Analysis,
@@ -20,22 +32,17 @@ from analysisweb_user.models import (
 from . import (
     ResourceBase,
     ResourceInvalidInputException,
+    ResourceConflictException,
     ResourceForbiddenActionException,
     ResourceNotFoundException,
     IDField,
+    parse_date,
 )
 
 
 class JobInputFile(Raw):
     def format(self, value):
-        val = value.value
-        if os.path.exists(
-            os.path.join(
-                current_app.config["JOB_FILES_FOLDER"], str(value.job_id), "input", val
-            )
-        ):
-            val = "files/job/{}/input/{}".format(value.job_id, val)
-        return val
+        return make_input_value(value)
 
 
 class JobReportFile(Raw):
@@ -44,14 +51,9 @@ class JobReportFile(Raw):
 
 
 def make_input_value(value):
-    val = value.value
-    if os.path.exists(
-        os.path.join(
-            current_app.config["JOB_FILES_FOLDER"], str(value.job_id), "input", val
-        )
-    ):
-        val = "files/job/{}/input/{}".format(value.job_id, val)
-    return val
+    if value.is_file:
+        return "files/job/{}/input/{}".format(value.job_id, value.value)
+    return value.value
 
 
 class JobResource(ResourceBase):
@@ -66,7 +68,7 @@ class JobResource(ResourceBase):
     job_outputfile = {
         "label": String,
         "path": String(
-            attribute=lambda x: "files/job/{}/output/{}".format(x.job.id, x.path)
+            attribute=lambda x: "files/job/{}/output/{}".format(x.job_id, x.path)
         ),
     }
 
@@ -75,17 +77,53 @@ class JobResource(ResourceBase):
         "label": String,
         "date": String(attribute=lambda x: x.date.strftime("%Y-%m-%d %H:%M")),
         "status": String,
+        "priority": String,
+        "queued_at": String,
+        "started_at": String,
+        "finished_at": String,
+        "exit_code": Integer(default=None),
         "log": String(
             attribute=lambda x: "files/job/{}/{}".format(x.id, x.log) if x.log else ""
         ),
         "analysis": IDField,
         "measurement": IDField,
+        "campaign": IDField,
+        "pipeline": IDField,
+        "upstream": List(IDField),
         "input": List(Nested(job_inputfile)),
         "table_output": List(Nested(job_outputfile)),
         "figure_output": List(Nested(job_outputfile)),
         "reports": List(JobReportFile),
     }
 
+    eager_load = (
+        ("analysis", joinedload),
+        ("measurement", joinedload),
+        ("campaign", joinedload),
+        ("pipeline", joinedload),
+        ("upstream", selectinload),
+        ("input", selectinload),
+        ("table_output", selectinload),
+        ("figure_output", selectinload),
+        ("reports", selectinload),
+    )
+
+    def file_hashes(self, db_resource):
+        return [input_.sha256 for input_ in db_resource.input]
+
+    def parent_resources(self, db_resource):
+        # The analysis, measurement, campaign and pipeline list their jobs
+        return [
+            parent
+            for parent in (
+                db_resource.analysis,
+                db_resource.measurement,
+                db_resource.campaign,
+                db_resource.pipeline,
+            )
+            if parent is not None
+        ]
+
     def get(self, id_):
         """
         Receive a job
@@ -94,12 +132,18 @@ class JobResource(ResourceBase):
         tags:
             - jobs
         parameters:
-            -   name: id
+            -   name: id_
                 in: path
                 description: ID of job to return
                 required: true
                 schema:
                     type: integer
+            -   name: fields
+                in: query
+                description: Comma-separated list of the fields to return
+                required: false
+                schema:
+                    type: string
         responses:
             200:
                 description: successful operation
@@ -107,16 +151,14 @@ class JobResource(ResourceBase):
                     application/json:
                         schema:
                             $ref: "#/components/schemas/Job"
+            304:
+                description: Resource not modified since the given ETag or date
             400:
                 description: Invalid ID supplied
             404:
                 description: Job not found
         """
-        try:
-            resource = self.get_resource(id_)
-        except (ResourceInvalidInputException, ResourceNotFoundException) as e:
-            return {"status": str(e)}, e.response_code
-        return self.dump_resource(resource), 200
+        return self.get_one(id_)
 
     def delete(self, id_):
         """
@@ -126,7 +168,7 @@ class JobResource(ResourceBase):
         tags:
             - jobs
         parameters:
-            -   name: id
+            -   name: id_
                 in: path
                 description: ID of job to delete
                 required: true
@@ -143,6 +185,9 @@ class JobResource(ResourceBase):
                 description: Invalid ID supplied
             404:
                 description: Job not found
+            405:
+                description: Other jobs of its pipeline depend on the job, or
+                    the job of a campaign or a pipeline has not finished
         """
         try:
             resource = self.get_resource(id_)
@@ -150,6 +195,18 @@ class JobResource(ResourceBase):
             return {"status": str(e)}, e.response_code
 
         try:
+            if resource.downstream:
+                raise ResourceForbiddenActionException(
+                    "Job cannot be removed because other jobs depend on it"
+                )
+            if resource.status in JOB_ACTIVE_STATES and (
+                resource.campaign_id is not None or resource.pipeline_id is not None
+            ):
+                # The campaign or pipeline would never complete without it
+                raise ResourceForbiddenActionException(
+                    "Job of a campaign or pipeline cannot be removed before it "
+                    "has finished, cancel it first"
+                )
             return self.delete_resource(
                 current_app.config["JOB_FILES_FOLDER"], resource
             )
@@ -161,6 +218,9 @@ class JobListResource(ResourceBase):
 
     db_table = Job
     fields = JobResource.fields
+    eager_load = JobResource.eager_load
+    cursor_columns = ("date", "id")
+    sort_columns = ("date", "status", "label", "id")
 
     def get(self):
         """
@@ -169,17 +229,140 @@ class JobListResource(ResourceBase):
         summary: Retrieve a list of executed jobs
         tags:
             - jobs
+        parameters:
+            -   name: limit
+                in: query
+                description: Maximum number of jobs to return
+                required: false
+                schema:
+                    type: integer
+            -   name: after
+                in: query
+                description: Cursor from the X-Next-Cursor header of the previous page
+                required: false
+                schema:
+                    type: string
+            -   name: fields
+                in: query
+                description: Comma-separated list of the fields to return
+                required: false
+                schema:
+                    type: string
+            -   name: status
+                in: query
+                description: Comma-separated list of job statuses to include,
+                    i.e. waiting, queued, running, succeeded, failed, timed_out
+                    or cancelled
+                required: false
+                schema:
+                    type: string
+            -   name: analysis
+                in: query
+                description: ID of the analysis of the jobs
+                required: false
+                schema:
+                    type: integer
+            -   name: measurement
+                in: query
+                description: ID of the measurement of the jobs
+                required: false
+                schema:
+                    type: integer
+            -   name: campaign
+                in: query
+                description: ID of the campaign of the jobs
+                required: false
+                schema:
+                    type: integer
+            -   name: pipeline
+                in: query
+                description: ID of the pipeline of the jobs
+                required: false
+                schema:
+                    type: integer
+            -   name: date_from
+                in: query
+                description: Only include jobs submitted at or after this date
+                required: false
+                schema:
+                    type: string
+                    format: date-time
+            -   name: date_to
+                in: query
+                description: Only include jobs submitted at or before this date
+                required: false
+                schema:
+                    type: string
+                    format: date-time
+            -   name: finished_from
+                in: query
+                description: Only include jobs finished at or after this date (UTC)
+                required: false
+                schema:
+                    type: string
+                    format: date-time
+            -   name: finished_to
+                in: query
+                description: Only include jobs finished at or before this date (UTC)
+                required: false
+                schema:
+                    type: string
+                    format: date-time
+            -   name: sort
+                in: query
+                description: Column to sort on, prefix with - for descending order
+                required: false
+                schema:
+                    type: string
+                    enum: [date, -date, status, -status, label, -label, id, -id]
         responses:
             200:
                 description: OK
+                headers:
+                    X-Next-Cursor:
+                        description: Cursor of the next page, if there is one
+                        schema:
+                            type: string
                 content:
                     application/json:
                         schema:
                             type: array
                             items:
                                 $ref: "#/components/schemas/Job"
+            400:
+                description: Invalid limit, cursor, fields, filter or sort
         """
-        return self.get_all(), 200
+        try:
+            return self.get_all()
+        except ResourceInvalidInputException as e:
+            return {"status": str(e)}, e.response_code
+
+    def filter_query(self, query):
+        args = request.args
+        if args.get("status"):
+            query = query.filter(Job.status.in_(args["status"].upper().split(",")))
+        for name, column in [
+            ("analysis", Job.analysis_id),
+            ("measurement", Job.measurement_id),
+            ("campaign", Job.campaign_id),
+            ("pipeline", Job.pipeline_id),
+        ]:
+            if name in args:
+                try:
+                    query = query.filter(column == int(args[name]))
+                except ValueError:
+                    raise ResourceInvalidInputException(
+                        "ID of {} is not a valid integer".format(name)
+                    )
+        if "date_from" in args:
+            query = query.filter(Job.date >= parse_date(args["date_from"]))
+        if "date_to" in args:
+            query = query.filter(Job.date <= parse_date(args["date_to"]))
+        if "finished_from" in args:
+            query = query.filter(Job.finished_at >= parse_date(args["finished_from"]))
+        if "finished_to" in args:
+            query = query.filter(Job.finished_at <= parse_date(args["finished_to"]))
+        return query
 
     def post(self):
         """
@@ -199,6 +382,10 @@ class JobListResource(ResourceBase):
                                 type: integer
                             analysis:
                                 type: integer
+                            priority:
+                                type: string
+                                description: One of the priorities in JOB_QUEUES,
+                                    which decides the queue of the job
                             input:
                                 type: array
                                 items:
@@ -229,10 +416,14 @@ class JobListResource(ResourceBase):
         else:
             measurement = None
         analysis = self.get_resource(request.form["analysis"], Analysis)
-        self._validate_job_input(analysis, measurement)
+        self.validate_job_input(analysis, measurement, request.form.getlist("input"))
+        priority = self.parse_priority(request.form.get("priority", None))
 
         job = Job(
-            label=request.form["label"], measurement=measurement, analysis=analysis
+            label=request.form["label"],
+            priority=priority,
+            measurement=measurement,
+            analysis=analysis,
         )
         db.session.add(job)
         db.session.flush()
@@ -244,11 +435,19 @@ class JobListResource(ResourceBase):
             )
             os.makedirs(file_folder)
         self._add_job_input(job, analysis, file_folder)
+        job.fingerprint = job_fingerprint(
+            analysis, measurement, [(i.value, i.sha256) for i in job.input]
+        )
 
-        job.status = "SUBMITTED"
+        job.status = "QUEUED"
         job.date = datetime.datetime.now()
+        job.queued_at = datetime.datetime.utcnow()
+        analysis.touch()
+        if measurement is not None:
+            measurement.touch()
         db.session.commit()
-        self._initiate_job(job, analysis, measurement)
+        self.invalidate_cache(job, analysis, measurement)
+        dispatch_jobs(job)
         return job_id
 
     @staticmethod
@@ -256,72 +455,29 @@ class JobListResource(ResourceBase):
         input_list = request.form.getlist("input")
         files = request.files
         for analysis_input, item in zip(analysis.input, input_list):
+            is_file = False
+            sha256 = None
             if item.startswith("$file:"):
                 file_key = item[6:]
                 file = files.get(file_key)
                 if file:
                     filename = secure_filename(file.filename)
-                    file.save(os.path.join(path, filename))
+                    sha256, _ = store_file(file, os.path.join(path, filename))
                     value = filename
+                    is_file = True
                 else:
                     value = file_key
             else:
                 value = item
-            db_obj = JobInput(value=value, job=job, label=analysis_input.label)
+            db_obj = JobInput(
+                value=value,
+                is_file=is_file,
+                sha256=sha256,
+                job=job,
+                label=analysis_input.label,
+            )
             db.session.add(db_obj)
 
-    @staticmethod
-    def _initiate_job(job, analysis, measurement):
-        base_folder = os.path.join(current_app.config["JOB_FILES_FOLDER"], str(job.id))
-        inp = JobListResource._make_input_json(job, analysis, measurement)
-        inp_file = os.path.join(base_folder, "inp.json")
-        with open(inp_file, "w") as f:
-            json.dump(inp, f)
-        syx_file = os.path.join(
-            current_app.config["ANALYSIS_FILES_FOLDER"],
-            str(analysis.id),
-            analysis.syx_file,
-        )
-        post_url = current_app.config["SERVER_URL"] + "job/{}/log".format(job.id)
-        utils.sympathy_job.delay(
-            inp_file, syx_file, current_app.config["SYMPATHY_EXEC"], post_url
-        )
-
-    @staticmethod
-    def _make_input_json(job, analysis, measurement):
-        # TODO replace actual paths to the upload folder with URLs to the server
-        input_ = []
-        for job_input, analysis_input in zip(job.input, analysis.input):
-            if analysis_input.type == "value":
-                value = job_input.value
-            else:
-                if job_input.value.startswith("$measurement"):
-                    value = ""
-                    for f in measurement.files:
-                        if f.label == analysis_input.label:
-                            value = os.path.join(
-                                current_app.config["MEASUREMENT_FILES_FOLDER"],
-                                str(measurement.id),
-                                f.path,
-                            )
-                            break
-                else:
-                    value = os.path.join(
-                        current_app.config["JOB_FILES_FOLDER"],
-                        str(job.id),
-                        "input",
-                        job_input.value,
-                    )
-            input_.append({"label": analysis_input.label, "value": value})
-        output = [{"type": o.type, "label": o.label} for o in analysis.output]
-        post_url = current_app.config["SERVER_URL"] + "job/{}/output".format(job.id)
-        return {
-            "input": input_,
-            "output": output,
-            "job_id": job.id,
-            "post_url": post_url,
-        }
-
     @staticmethod
     def _validate_form_data():
         if (
@@ -332,8 +488,23 @@ class JobListResource(ResourceBase):
             raise ResourceInvalidInputException("Missing input")
 
     @staticmethod
-    def _validate_job_input(analysis, measurement):
-        ninput = len(request.form.getlist("input"))
+    def parse_priority(priority):
+        """
+        Validate the priority of a job, the default priority if None
+        """
+        if priority is None:
+            return current_app.config["JOB_PRIORITY_DEFAULT"]
+        if priority not in current_app.config["JOB_QUEUES"]:
+            raise ResourceInvalidInputException(
+                "Priority must be one of {}".format(
+                    ", ".join(current_app.config["JOB_QUEUES"])
+                )
+            )
+        return priority
+
+    @staticmethod
+    def validate_job_input(analysis, measurement, input_list):
+        ninput = len(input_list)
         nexpected = len(analysis.input)
         if ninput != nexpected:
             raise ResourceInvalidInputException(
@@ -342,7 +513,6 @@ class JobListResource(ResourceBase):
                 )
             )
 
-        input_list = request.form.getlist("input")
         if measurement is not None:
             measurement_labels = [f.label for f in measurement.files]
         else:
@@ -370,10 +540,199 @@ class JobListResource(ResourceBase):
                 )
 
 
+class JobBatchResource(ResourceBase):
+
+    db_table = Job
+    fields = JobResource.fields
+
+    def post(self):
+        """
+        Add a batch of jobs to the queue
+        ---
+        summary: Add many jobs of one analysis to the queue at once, e.g. for a
+            parameter sweep
+        tags:
+            - jobs
+        requestBody:
+            content:
+                application/json:
+                    schema:
+                        properties:
+                            analysis:
+                                type: integer
+                            measurement:
+                                type: integer
+                            priority:
+                                type: string
+                            jobs:
+                                type: array
+                                items:
+                                    type: object
+                                    properties:
+                                        label:
+                                            type: string
+                                        input:
+                                            type: array
+                                            description: Values or references to
+                                                the measurement, files cannot be
+                                                uploaded in a batch
+                                            items:
+                                                type: string
+        responses:
+            202:
+                description: Jobs were successfully added to the queue
+                content:
+                    application/json:
+                        schema:
+                            properties:
+                                status:
+                                    type: string
+                                ids:
+                                    type: array
+                                    items:
+                                        type: integer
+            400:
+                description: Id of measurement or analysis is invalid, or invalid input
+            404:
+                description: Id of measurement or analysis is not existing
+        """
+        try:
+            job_ids = self._add_jobs()
+        except (ResourceInvalidInputException, ResourceNotFoundException) as e:
+            db.session.rollback()
+            return {"status": str(e)}, e.response_code
+        return {"status": "success", "ids": job_ids}, 202
+
+    def _add_jobs(self):
+        data = request.get_json(silent=True)
+        if (
+            not isinstance(data, dict)
+            or "analysis" not in data
+            or not isinstance(data.get("jobs"), list)
+            or not data["jobs"]
+        ):
+            raise ResourceInvalidInputException("Missing input")
+        if len(data["jobs"]) > current_app.config["JOB_BATCH_MAX"]:
+            raise ResourceInvalidInputException(
+                "At most {} jobs can be added at once".format(
+                    current_app.config["JOB_BATCH_MAX"]
+                )
+            )
+
+        # Loaded and validated against once for the whole batch
+        if data.get("measurement", None) is not None:
+            measurement = self.get_resource(data["measurement"], Measurement)
+        else:
+            measurement = None
+        analysis = self.get_resource(data["analysis"], Analysis)
+        priority = JobListResource.parse_priority(data.get("priority", None))
+        input_lists = [self._parse_item(i, item) for i, item in enumerate(data["jobs"])]
+        for input_list in input_lists:
+            JobListResource.validate_job_input(analysis, measurement, input_list)
+
+        jobs = self.create_jobs(
+            analysis,
+            priority,
+            [
+                (item["label"], measurement, input_list)
+                for item, input_list in zip(data["jobs"], input_lists)
+            ],
+        )
+
+        analysis.touch()
+        if measurement is not None:
+            measurement.touch()
+        db.session.commit()
+        self.invalidate_cache(analysis, measurement)
+        response_cache.invalidate("{}:list".format(Job.__tablename__))
+        dispatch_jobs(jobs[0])
+        return [job.id for job in jobs]
+
+    @staticmethod
+    def create_jobs(analysis, priority, items, **values):
+        """
+        Add queued jobs of an analysis in bulk, with validated inputs that are
+        not files
+
+        The jobs are inserted one by one, as their IDs are needed for their
+        inputs and folders, but without the overhead of the unit of work,
+        and their inputs are inserted all at once
+
+        Parameters
+        ----------
+        analysis: Analysis
+            the analysis of the jobs
+        priority: str
+            the priority of the jobs
+        items: list of tuple (str, Measurement, list of str)
+            the label, the measurement, or None, and the input values of every job
+        values: dict
+            other columns of all the jobs, e.g. the status if they are not to
+            be queued
+
+        Returns
+        -------
+        list of Job:
+            the jobs, which are flushed but not committed
+        """
+        date = datetime.datetime.now()
+        queued_at = datetime.datetime.utcnow()
+        jobs = []
+        for label, measurement, input_list in items:
+            columns = dict(
+                label=label,
+                priority=priority,
+                status="QUEUED",
+                date=date,
+                queued_at=queued_at,
+                analysis_id=analysis.id,
+                measurement_id=None if measurement is None else measurement.id,
+                fingerprint=job_fingerprint(
+                    analysis, measurement, [(value, None) for value in input_list]
+                ),
+            )
+            columns.update(values)
+            jobs.append(Job(**columns))
+        db.session.bulk_save_objects(jobs, return_defaults=True)
+        db.session.bulk_insert_mappings(
+            JobInput,
+            [
+                {
+                    "value": value,
+                    "is_file": False,
+                    "label": analysis_input.label,
+                    "job_id": job.id,
+                }
+                for job, (_, _, input_list) in zip(jobs, items)
+                for analysis_input, value in zip(analysis.input, input_list)
+            ],
+        )
+        for job in jobs:
+            for f in ["reports", "output", "input"]:
+                os.makedirs(os.path.join(job_folder(job.id), f))
+        return jobs
+
+    @staticmethod
+    def _parse_item(i, item):
+        if (
+            not isinstance(item, dict)
+            or not isinstance(item.get("label", None), str)
+            or not isinstance(item.get("input", None), list)
+        ):
+            raise ResourceInvalidInputException("Missing input of job {}".format(i))
+        input_list = [str(value) for value in item["input"]]
+        if any(value.startswith("$file:") for value in input_list):
+            raise ResourceInvalidInputException(
+                "Files cannot be uploaded in a batch, found one in job {}".format(i)
+            )
+        return input_list
+
+
 class JobOutputResource(ResourceBase):
 
     db_table = Job
     fields = JobResource.fields
+    eager_load = JobResource.eager_load
 
     def post(self, id_):
         """
@@ -383,7 +742,7 @@ class JobOutputResource(ResourceBase):
         tags:
             - jobs
         parameters:
-            -   name: id
+            -   name: id_
                 in: path
                 description: ID of job to add the output
                 required: true
@@ -439,7 +798,17 @@ class JobOutputResource(ResourceBase):
                 self._add_table(resource, output_label, file_folder)
             elif output_type == "figure":
                 self._add_figure(resource, output_label, file_folder)
+        resource.touch()
         db.session.commit()
+        self.invalidate_cache(resource)
+
+    @staticmethod
+    def _save_output(file, path):
+        # Text outputs compress well, they are served decompressed if needed
+        if current_app.config["COMPRESS_OUTPUTS"]:
+            save_compressed(file, path)
+        else:
+            save_upload(file, path)
 
     @staticmethod
     def _add_figure(job, label, path):
@@ -458,8 +827,8 @@ class JobOutputResource(ResourceBase):
                 "Unexpected file extension '{}' "
                 "for '{}' for figure type".format(filename_fig[-4:], filename_html[-5:])
             )
-        file_fig.save(os.path.join(path, filename_fig))
-        file_html.save(os.path.join(path, filename_html))
+        save_upload(file_fig, os.path.join(path, filename_fig))
+        JobOutputResource._save_output(file_html, os.path.join(path, filename_html))
         f = JobFigureOutput(path=filename_fig, html=filename_html, label=label, job=job)
         db.session.add(f)
 
@@ -475,7 +844,7 @@ class JobOutputResource(ResourceBase):
             raise ResourceInvalidInputException(
                 "Unexpected file extension '{}' for table type".format(filename[-4:])
             )
-        file.save(os.path.join(path, filename))
+        JobOutputResource._save_output(file, os.path.join(path, filename))
         f = JobTableOutput(path=filename, label=label, job=job)
         db.session.add(f)
 
@@ -484,6 +853,7 @@ class JobReportResource(ResourceBase):
 
     db_table = Job
     fields = JobResource.fields
+    eager_load = JobResource.eager_load
 
     def post(self, id_):
         """
@@ -492,6 +862,13 @@ class JobReportResource(ResourceBase):
         summary: Add a report to a job
         tags:
             - jobs
+        parameters:
+            -   name: id_
+                in: path
+                description: ID of job to add the report
+                required: true
+                schema:
+                    type: integer
         requestBody:
             content:
                 multipart/form-data:
@@ -521,8 +898,7 @@ class JobReportResource(ResourceBase):
             return {"status": str(e)}, e.response_code
         return self.dump_resource(resource), 200
 
-    @staticmethod
-    def _add_report(resource):
+    def _add_report(self, resource):
         if not request.files:
             raise ResourceInvalidInputException("No reports in request body")
 
@@ -532,30 +908,127 @@ class JobReportResource(ResourceBase):
         lookup = [report.path for report in resource.reports]
         for label, file in request.files.items():
             if file:
-                file.save(os.path.join(file_folder, label))
+                # Replaced, as the reports may be linked to those of another job
+                save_upload(file, os.path.join(file_folder, label))
                 if label not in lookup:
                     f = JobReport(path=label, job=resource)
                     db.session.add(f)
+        resource.touch()
         db.session.commit()
+        self.invalidate_cache(resource)
 
 
 class JobLogResource(ResourceBase):
 
     db_table = Job
     fields = JobResource.fields
+    eager_load = JobResource.eager_load
+
+    def get(self, id_):
+        """
+        Receive the live log of a job
+        ---
+        summary: Read the log of a job while it runs
+        tags:
+            - jobs
+        parameters:
+            -   name: id_
+                in: path
+                description: ID of job
+                required: true
+                schema:
+                    type: integer
+            -   name: tail
+                in: query
+                description: Only return the last lines of the log
+                required: false
+                schema:
+                    type: integer
+            -   name: follow
+                in: query
+                description: Set to 1 to keep streaming the log until the job finishes
+                required: false
+                schema:
+                    type: integer
+        responses:
+            200:
+                description: The log
+                content:
+                    text/plain:
+                        schema:
+                            type: string
+            400:
+                description: Invalid ID or tail supplied
+            404:
+                description: Job not found or the job has no log
+        """
+        try:
+            job_id = self.parse_id(id_)
+            tail = int(request.args.get("tail", 0))
+        except (ResourceInvalidInputException, ValueError):
+            return {"status": "Invalid ID or tail"}, 400
+        if not db.session.query(Job.id).filter(Job.id == job_id).count():
+            return {"status": "Item does not exists in the database"}, 404
+
+        path = os.path.join(
+            current_app.config["JOB_FILES_FOLDER"], str(job_id), utils.LOG_FILENAME
+        )
+        follow = request.args.get("follow", "0") == "1"
+        if not follow and not os.path.exists(path):
+            return {"status": "This job does not have a log"}, 404
+        offset = 0
+        if tail > 0 and os.path.exists(path):
+            offset = utils.tail_offset(path, tail)
+
+        if not follow:
+            return Response(utils.read_from(path, offset), mimetype="text/plain")
+        return Response(
+            stream_with_context(self._follow(job_id, path, offset)),
+            mimetype="text/plain",
+        )
+
+    @staticmethod
+    def _follow(job_id, path, offset):
+        while True:
+            # Checked before reading, so that all of the log is read once finished
+            status = db.session.query(Job.status).filter(Job.id == job_id).scalar()
+            # Do not keep a transaction open between the polls
+            db.session.rollback()
+            for chunk in utils.read_from(path, offset):
+                offset += len(chunk)
+                yield chunk
+            if status not in JOB_ACTIVE_STATES:
+                return
+            time.sleep(current_app.config["LOG_FOLLOW_INTERVAL"])
 
     def post(self, id_):
         """
         Add a log to a job
         ---
-        summary: Add a log to a job
+        summary: Add the log and the exit code to a job and mark it as finished
         tags:
             - jobs
         requestBody:
             content:
                 multipart/form-data:
                     schema:
-                        $ref: "#/components/schemas/File"
+                        properties:
+                            log:
+                                type: string
+                                format: binary
+                            exit_code:
+                                type: integer
+                                description: Exit code of the analysis, the job
+                                    failed unless it is 0 (the default)
+                            started_at:
+                                type: string
+                                format: date-time
+                                description: When the job started running (UTC),
+                                    if its start has not been recorded
+                            status:
+                                type: string
+                                description: The final state, if the job was
+                                    stopped, i.e. timed_out or cancelled
         responses:
             200:
                 description: Log was sucessfully added
@@ -567,6 +1040,8 @@ class JobLogResource(ResourceBase):
                 description: Invalid input
             404:
                 description: ID of job not found
+            409:
+                description: The job is not running
         """
 
         try:
@@ -576,25 +1051,84 @@ class JobLogResource(ResourceBase):
 
         try:
             self._add_job(resource)
-        except ResourceInvalidInputException as e:
+        except (ResourceInvalidInputException, ResourceConflictException) as e:
             return {"status": str(e)}, e.response_code
         return self.dump_resource(resource), 200
 
-    @staticmethod
-    def _add_job(resource):
+    def _add_job(self, resource):
         if not request.files:
             raise ResourceInvalidInputException("No file in request body")
         if len(request.files) > 1:
             raise ResourceInvalidInputException("Only one log can be added to the job")
         if resource.log:
             raise ResourceInvalidInputException("This job already have a job")
+        try:
+            exit_code = int(request.form.get("exit_code", 0))
+        except ValueError:
+            raise ResourceInvalidInputException("Invalid exit code")
+        started_at = request.form.get("started_at", None)
+        if started_at is not None:
+            started_at = parse_date(started_at)
+        status = request.form.get("status", None)
+        if status is not None:
+            status = status.upper()
+            if status not in JOB_TRANSITIONS["RUNNING"]:
+                raise ResourceInvalidInputException("Invalid status")
 
-        file_folder = os.path.join(
-            current_app.config["JOB_FILES_FOLDER"], str(resource.id)
-        )
         file = request.files["log"]
+        log_path = None
         if file:
-            file.save(os.path.join(file_folder, "log.html"))
-            resource.log = "log.html"
-        resource.status = "COMPLETED"
-        db.session.commit()
+            fd, log_path = mkstemp(job_folder(resource.id), suffix=".part")
+            os.close(fd)
+            file.save(log_path)
+        try:
+            finish_job(resource, exit_code, log_path, started_at, status)
+        finally:
+            if log_path is not None and os.path.exists(log_path):
+                os.remove(log_path)
+
+
+class JobCancelResource(ResourceBase):
+
+    db_table = Job
+    fields = JobResource.fields
+    eager_load = JobResource.eager_load
+
+    def post(self, id_):
+        """
+        Cancel a job
+        ---
+        summary: Cancel a queued job or stop a running one
+        tags:
+            - jobs
+        parameters:
+            -   name: id_
+                in: path
+                description: ID of job to cancel
+                required: true
+                schema:
+                    type: integer
+        responses:
+            200:
+                description: Job cancelled and returned
+                content:
+                    application/json:
+                        schema:
+                            $ref: "#/components/schemas/Job"
+            400:
+                description: Invalid ID supplied
+            404:
+                description: Job not found
+            409:
+                description: The job has already finished
+        """
+        try:
+            resource = self.get_resource(id_)
+        except (ResourceInvalidInputException, ResourceNotFoundException) as e:
+            return {"status": str(e)}, e.response_code
+
+        try:
+            cancel_job(resource)
+        except ResourceConflictException as e:
+            return {"status": str(e)}, e.response_code
+        return self.dump_resource(resource), 200
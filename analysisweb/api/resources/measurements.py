@@ -3,10 +3,13 @@ import os
 from dateutil.parser import parse as date_parser
 from flask import request, current_app
 from flask_restful.fields import Integer, List, Nested, Raw, String
+from sqlalchemy.orm import selectinload
 from werkzeug.utils import secure_filename
 
 from analysisweb.api import db
-from analysisweb_user.models import Measurement, MeasurementFile
+from analysisweb.api.cache import response_cache
+from analysisweb.api.storage import store_file
+from analysisweb_user.models import Job, Measurement, MeasurementFile
 from . import (
     ResourceBase,
     MetaResource,
@@ -14,6 +17,7 @@ from . import (
     ResourceForbiddenActionException,
     ResourceNotFoundException,
     IDField,
+    parse_date,
 )
 
 
@@ -28,6 +32,8 @@ class MeasurementResource(ResourceBase):
                 x.measurement_id, x.path
             )
         ),
+        "sha256": String,
+        "size": Integer,
     }
 
     fields = {
@@ -40,6 +46,11 @@ class MeasurementResource(ResourceBase):
         "jobs": List(IDField),
     }
 
+    eager_load = (("files", selectinload), ("jobs", selectinload))
+
+    def file_hashes(self, db_resource):
+        return [f.sha256 for f in db_resource.files]
+
     def get(self, id_):
         """
         Receive a measurement
@@ -48,12 +59,18 @@ class MeasurementResource(ResourceBase):
         tags:
             - measurements
         parameters:
-            -   name: id
+            -   name: id_
                 in: path
                 description: ID of measurement to return
                 required: true
                 schema:
                     type: integer
+            -   name: fields
+                in: query
+                description: Comma-separated list of the fields to return
+                required: false
+                schema:
+                    type: string
         responses:
             200:
                 description: successful operation
@@ -61,16 +78,14 @@ class MeasurementResource(ResourceBase):
                     application/json:
                         schema:
                             $ref: "#/components/schemas/Measurement"
+            304:
+                description: Resource not modified since the given ETag or date
             400:
                 description: Invalid ID supplied
             404:
                 description: Measurement not found
         """
-        try:
-            resource = self.get_resource(id_)
-        except (ResourceInvalidInputException, ResourceNotFoundException) as e:
-            return {"status": str(e)}, e.response_code
-        return self.dump_resource(resource), 200
+        return self.get_one(id_)
 
     def delete(self, id_):
         """
@@ -80,7 +95,7 @@ class MeasurementResource(ResourceBase):
         tags:
             - measurements
         parameters:
-            -   name: id
+            -   name: id_
                 in: path
                 description: ID of measurement to return
                 required: true
@@ -120,7 +135,7 @@ class MeasurementResource(ResourceBase):
         tags:
             - measurements
         parameters:
-            -   name: id
+            -   name: id_
                 in: path
                 description: ID of measurement to return
                 required: true
@@ -171,9 +186,18 @@ class MeasurementResource(ResourceBase):
         )
         resource.start_date = start_date
         resource.end_date = end_date
-        resource.label = request.form.get("label", resource.label)
+        label = request.form.get("label", resource.label)
+        label_changed = label != resource.label
+        if label_changed:
+            # The jobs of the measurement list its label
+            self.touch_jobs(Job.measurement_id == resource.id)
+        resource.label = label
         self.load_metadata(request.form.get("meta_data", "{}"), resource)
+        resource.touch()
         db.session.commit()
+        self.invalidate_cache(resource)
+        if label_changed:
+            response_cache.invalidate(Job.__tablename__)
 
     @staticmethod
     def parse_dates(start=None, end=None):
@@ -192,6 +216,8 @@ class MeasurementListResource(ResourceBase):
 
     db_table = Measurement
     fields = MeasurementResource.fields
+    eager_load = MeasurementResource.eager_load
+    sort_columns = ("start_date", "end_date", "id")
 
     def get(self):
         """
@@ -200,17 +226,108 @@ class MeasurementListResource(ResourceBase):
         summary: Retrieve a list of measurements
         tags:
             - measurements
+        parameters:
+            -   name: limit
+                in: query
+                description: Maximum number of measurements to return
+                required: false
+                schema:
+                    type: integer
+            -   name: after
+                in: query
+                description: Cursor from the X-Next-Cursor header of the previous page
+                required: false
+                schema:
+                    type: string
+            -   name: fields
+                in: query
+                description: Comma-separated list of the fields to return
+                required: false
+                schema:
+                    type: string
+            -   name: overlaps
+                in: query
+                description: Only include measurements overlapping the time window, given as <from>,<to>
+                required: false
+                schema:
+                    type: string
+            -   name: contains
+                in: query
+                description: Only include measurements covering the whole time window, given as <from>,<to>
+                required: false
+                schema:
+                    type: string
+            -   name: within
+                in: query
+                description: Only include measurements inside the time window, given as <from>,<to>
+                required: false
+                schema:
+                    type: string
+            -   name: sort
+                in: query
+                description: Column to sort on, prefix with - for descending order
+                required: false
+                schema:
+                    type: string
+                    enum: [start_date, -start_date, end_date, -end_date, id, -id]
         responses:
             200:
                 description: OK
+                headers:
+                    X-Next-Cursor:
+                        description: Cursor of the next page, if there is one
+                        schema:
+                            type: string
                 content:
                     application/json:
                         schema:
                             type: array
                             items:
                                 $ref: "#/components/schemas/Measurement"
+            400:
+                description: Invalid limit, cursor, fields, time window or sort
         """
-        return self.get_all(), 200
+        try:
+            return self.get_all()
+        except ResourceInvalidInputException as e:
+            return {"status": str(e)}, e.response_code
+
+    def filter_query(self, query):
+        return self.filter_windows(query, request.args)
+
+    @staticmethod
+    def filter_windows(query, args):
+        """
+        Filter a query of measurements on the time windows given in a mapping,
+        e.g. the query arguments
+        """
+        start, end = Measurement.start_date, Measurement.end_date
+        if "overlaps" in args:
+            from_, to = MeasurementListResource.parse_window(args, "overlaps")
+            query = query.filter(start <= to, end >= from_)
+        if "contains" in args:
+            from_, to = MeasurementListResource.parse_window(args, "contains")
+            query = query.filter(start <= from_, end >= to)
+        if "within" in args:
+            from_, to = MeasurementListResource.parse_window(args, "within")
+            query = query.filter(start >= from_, end <= to)
+        return query
+
+    @staticmethod
+    def parse_window(args, name):
+        try:
+            from_, to = args[name].split(",")
+        except (AttributeError, ValueError):
+            raise ResourceInvalidInputException(
+                "Time window '{}' must be given as <from>,<to>".format(name)
+            )
+        # Compared as naive UTC, so that a bound with a time zone can be mixed
+        # with one without
+        from_, to = parse_date(from_), parse_date(to)
+
+        if to < from_:
+            raise ResourceInvalidInputException("end of time window < start")
+        return from_, to
 
     def post(self):
         """
@@ -252,22 +369,35 @@ class MeasurementListResource(ResourceBase):
 
     def _add_measurement(self):
         self._validate_form_data()
+        m, file_folder = self.create_measurement()
+        measurement_id = m.id
+        self._add_measurement_files(m, request.files.items(), file_folder)
+        db.session.commit()
+        self.invalidate_cache(m)
+        return measurement_id
+
+    @staticmethod
+    def create_measurement():
+        """
+        Create a measurement and its file folder from the form data
+
+        Returns
+        -------
+        tuple (Measurement, str)
+            the measurement and the folder of its files
+        """
         start_date, end_date = MeasurementResource.parse_dates()
         m = Measurement(
             start_date=start_date, end_date=end_date, label=request.form["label"]
         )
         db.session.add(m)
         db.session.flush()
-        measurement_id = m.id
-        self.load_metadata(request.form.get("meta_data", "{}"), m)
+        ResourceBase.load_metadata(request.form.get("meta_data", "{}"), m)
         file_folder = os.path.join(
-            current_app.config["MEASUREMENT_FILES_FOLDER"], str(measurement_id)
+            current_app.config["MEASUREMENT_FILES_FOLDER"], str(m.id)
         )
         os.makedirs(file_folder)
-        print(request.files)
-        self._add_measurement_files(m, request.files.items(), file_folder)
-        db.session.commit()
-        return measurement_id
+        return m, file_folder
 
     @staticmethod
     def _add_measurement_files(measurement, file_list, path):
@@ -286,8 +416,14 @@ class MeasurementListResource(ResourceBase):
         for label, file in file_list:
             if file:
                 filename = secure_filename(file.filename)
-                file.save(os.path.join(path, filename))
-                f = MeasurementFile(label=label, path=filename, measurement=measurement)
+                sha256, size = store_file(file, os.path.join(path, filename))
+                f = MeasurementFile(
+                    label=label,
+                    path=filename,
+                    sha256=sha256,
+                    size=size,
+                    measurement=measurement,
+                )
                 db.session.add(f)
 
     @staticmethod
@@ -0,0 +1,381 @@
+import datetime
+
+from flask import request, current_app
+from flask_restful.fields import Integer, List, String
+from sqlalchemy.orm import selectinload
+
+from analysisweb.api import db
+from analysisweb.api.cache import response_cache
+from analysisweb.api.base_models import Pipeline, job_dependency
+from analysisweb.api.services import dispatch_jobs
+from analysisweb_user.models import Analysis, Job, Measurement
+from .jobs import JobBatchResource, JobListResource
+from . import (
+    ResourceBase,
+    ResourceInvalidInputException,
+    ResourceNotFoundException,
+    IDField,
+)
+
+
+class PipelineResource(ResourceBase):
+
+    db_table = Pipeline
+
+    fields = {
+        "id": Integer,
+        "label": String,
+        "date": String(attribute=lambda x: x.date.strftime("%Y-%m-%d %H:%M")),
+        "status": String,
+        "finished_at": String,
+        "total": Integer,
+        "succeeded": Integer,
+        "failed": Integer,
+        "cancelled": Integer,
+        "jobs": List(IDField),
+    }
+
+    eager_load = (("jobs", selectinload),)
+
+    def get(self, id_):
+        """
+        Receive a pipeline
+        ---
+        summary: Find a pipeline by ID, with the progress of its jobs
+        tags:
+            - pipelines
+        parameters:
+            -   name: id_
+                in: path
+                description: ID of pipeline to return
+                required: true
+                schema:
+                    type: integer
+            -   name: fields
+                in: query
+                description: Comma-separated list of the fields to return
+                required: false
+                schema:
+                    type: string
+        responses:
+            200:
+                description: successful operation
+                content:
+                    application/json:
+                        schema:
+                            $ref: "#/components/schemas/Pipeline"
+            304:
+                description: Resource not modified since the given ETag or date
+            400:
+                description: Invalid ID supplied
+            404:
+                description: Pipeline not found
+        """
+        return self.get_one(id_)
+
+
+class PipelineListResource(ResourceBase):
+
+    db_table = Pipeline
+    fields = PipelineResource.fields
+    eager_load = PipelineResource.eager_load
+    cursor_columns = ("date", "id")
+    sort_columns = ("date", "status", "label", "id")
+
+    def get(self):
+        """
+        Obtain a list of pipelines
+        ---
+        summary: Retrieve a list of pipelines
+        tags:
+            - pipelines
+        parameters:
+            -   name: limit
+                in: query
+                description: Maximum number of pipelines to return
+                required: false
+                schema:
+                    type: integer
+            -   name: after
+                in: query
+                description: Cursor from the X-Next-Cursor header of the previous page
+                required: false
+                schema:
+                    type: string
+            -   name: fields
+                in: query
+                description: Comma-separated list of the fields to return
+                required: false
+                schema:
+                    type: string
+            -   name: status
+                in: query
+                description: Comma-separated list of pipeline statuses to include,
+                    i.e. running or completed
+                required: false
+                schema:
+                    type: string
+            -   name: sort
+                in: query
+                description: Column to sort on, prefix with - for descending order
+                required: false
+                schema:
+                    type: string
+                    enum: [date, -date, status, -status, label, -label, id, -id]
+        responses:
+            200:
+                description: OK
+                headers:
+                    X-Next-Cursor:
+                        description: Cursor of the next page, if there is one
+                        schema:
+                            type: string
+                content:
+                    application/json:
+                        schema:
+                            type: array
+                            items:
+                                $ref: "#/components/schemas/Pipeline"
+            400:
+                description: Invalid limit, cursor, fields, filter or sort
+        """
+        try:
+            return self.get_all()
+        except ResourceInvalidInputException as e:
+            return {"status": str(e)}, e.response_code
+
+    def filter_query(self, query):
+        if request.args.get("status"):
+            query = query.filter(
+                Pipeline.status.in_(request.args["status"].upper().split(","))
+            )
+        return query
+
+    def post(self):
+        """
+        Add a pipeline of jobs that depend on each other
+        ---
+        summary: Add a pipeline, which queues its jobs as soon as the jobs
+            upstream of them have succeeded
+        tags:
+            - pipelines
+        requestBody:
+            content:
+                application/json:
+                    schema:
+                        properties:
+                            label:
+                                type: string
+                            priority:
+                                type: string
+                            stages:
+                                type: array
+                                description: The jobs of the pipeline, which can
+                                    only depend on the stages before them
+                                items:
+                                    type: object
+                                    properties:
+                                        label:
+                                            type: string
+                                            description: Unique within the pipeline
+                                        analysis:
+                                            type: integer
+                                        measurement:
+                                            type: integer
+                                        input:
+                                            type: array
+                                            description: Values or references to
+                                                the measurement or, for file
+                                                inputs, to an output of an earlier
+                                                stage as $job:<stage>:<output>
+                                            items:
+                                                type: string
+                                        after:
+                                            type: array
+                                            description: Labels of earlier stages
+                                                to wait for, besides those whose
+                                                outputs are used
+                                            items:
+                                                type: string
+        responses:
+            202:
+                description: Pipeline was successfully added
+                content:
+                    application/json:
+                        schema:
+                            properties:
+                                status:
+                                    type: string
+                                id:
+                                    type: integer
+                                jobs:
+                                    type: object
+                                    description: The ID of the job of every stage
+            400:
+                description: Id of measurement or analysis is invalid, or invalid input
+            404:
+                description: Id of measurement or analysis is not existing
+        """
+        try:
+            pipeline, jobs = self._add_pipeline()
+        except (ResourceInvalidInputException, ResourceNotFoundException) as e:
+            db.session.rollback()
+            return {"status": str(e)}, e.response_code
+        return (
+            {
+                "status": "success",
+                "id": pipeline.id,
+                "jobs": {label: job.id for label, job in jobs.items()},
+            },
+            202,
+        )
+
+    def _add_pipeline(self):
+        data = request.get_json(silent=True)
+        if (
+            not isinstance(data, dict)
+            or not isinstance(data.get("label", None), str)
+            or not isinstance(data.get("stages", None), list)
+            or not data["stages"]
+        ):
+            raise ResourceInvalidInputException("Missing input")
+        if len(data["stages"]) > current_app.config["JOB_BATCH_MAX"]:
+            raise ResourceInvalidInputException(
+                "A pipeline can have at most {} stages".format(
+                    current_app.config["JOB_BATCH_MAX"]
+                )
+            )
+        priority = JobListResource.parse_priority(data.get("priority", None))
+
+        pipeline = Pipeline(
+            label=data["label"],
+            date=datetime.datetime.now(),
+            status="RUNNING",
+            total=len(data["stages"]),
+            succeeded=0,
+            failed=0,
+            cancelled=0,
+        )
+        db.session.add(pipeline)
+        db.session.flush()
+
+        # Loaded once for all stages using them
+        analyses, measurements = {}, {}
+        jobs, stage_analyses, dependencies = {}, {}, []
+        for i, stage in enumerate(data["stages"]):
+            self._validate_stage(i, stage, jobs)
+            key = str(stage["analysis"])
+            if key not in analyses:
+                analyses[key] = self.get_resource(key, Analysis)
+            analysis = analyses[key]
+            measurement = None
+            if stage.get("measurement", None) is not None:
+                key = str(stage["measurement"])
+                if key not in measurements:
+                    measurements[key] = self.get_resource(key, Measurement)
+                measurement = measurements[key]
+            input_list = [str(value) for value in stage["input"]]
+            JobListResource.validate_job_input(analysis, measurement, input_list)
+            upstream = self._resolve_references(
+                i, analysis, input_list, jobs, stage_analyses
+            )
+            upstream.update(str(label) for label in stage.get("after", []))
+
+            values = {"pipeline_id": pipeline.id}
+            if upstream:
+                # Queued once the upstream jobs have succeeded
+                values.update(status="WAITING", queued_at=None, fingerprint=None)
+            (job,) = JobBatchResource.create_jobs(
+                analysis,
+                priority,
+                [(stage["label"], measurement, input_list)],
+                **values
+            )
+            jobs[stage["label"]] = job
+            stage_analyses[stage["label"]] = analysis
+            dependencies += [
+                {"job_id": job.id, "upstream_id": jobs[label].id} for label in upstream
+            ]
+        if dependencies:
+            db.session.execute(job_dependency.insert(), dependencies)
+
+        for parent in list(analyses.values()) + list(measurements.values()):
+            parent.touch()
+        db.session.commit()
+        self.invalidate_cache(pipeline, *analyses.values(), *measurements.values())
+        response_cache.invalidate("{}:list".format(Job.__tablename__))
+        # One dispatch sends the queued jobs of an analysis
+        queued = {
+            job.analysis_id: job for job in jobs.values() if job.status == "QUEUED"
+        }
+        for job in queued.values():
+            dispatch_jobs(job)
+        return pipeline, jobs
+
+    @staticmethod
+    def _validate_stage(i, stage, jobs):
+        if (
+            not isinstance(stage, dict)
+            or not isinstance(stage.get("label", None), str)
+            or "analysis" not in stage
+            or not isinstance(stage.get("input", None), list)
+            or not isinstance(stage.get("after", []), list)
+        ):
+            raise ResourceInvalidInputException("Missing input of stage {}".format(i))
+        if stage["label"] in jobs:
+            raise ResourceInvalidInputException(
+                "Label '{}' of stage {} is not unique".format(stage["label"], i)
+            )
+        if any(str(value).startswith("$file:") for value in stage["input"]):
+            raise ResourceInvalidInputException(
+                "Files cannot be uploaded in a pipeline, found one in stage {}".format(
+                    i
+                )
+            )
+        unknown = [
+            label for label in map(str, stage.get("after", [])) if label not in jobs
+        ]
+        if unknown:
+            raise ResourceInvalidInputException(
+                "Stage {} waits for unknown or later stages: {}".format(
+                    i, ", ".join(unknown)
+                )
+            )
+
+    @staticmethod
+    def _resolve_references(i, analysis, input_list, jobs, stage_analyses):
+        """
+        Replace the references to the outputs of earlier stages in the input
+        values of a stage with references to the outputs of their jobs
+
+        Returns
+        -------
+        set of str:
+            the labels of the referenced stages
+        """
+        upstream = set()
+        for j, analysis_input in enumerate(analysis.input):
+            value = input_list[j]
+            if not value.startswith("$job:"):
+                continue
+            label, _, output_label = value[5:].rpartition(":")
+            if label not in jobs:
+                raise ResourceInvalidInputException(
+                    "Input {} of stage {} refers to an unknown or later stage "
+                    "'{}'".format(j, i, label)
+                )
+            if analysis_input.type != "file":
+                raise ResourceInvalidInputException(
+                    "Input {} of stage {} refers to an output but is not a file "
+                    "input".format(j, i)
+                )
+            # The jobs are saved in bulk, without their relationships
+            outputs = [o.label for o in stage_analyses[label].output]
+            if output_label not in outputs:
+                raise ResourceInvalidInputException(
+                    "Input {} of stage {} refers to an unknown output '{}' of "
+                    "stage '{}'".format(j, i, output_label, label)
+                )
+            input_list[j] = "$job:{}:{}".format(jobs[label].id, output_label)
+            upstream.add(label)
+        return upstream
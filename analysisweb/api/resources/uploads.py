@@ -0,0 +1,396 @@
+import datetime
+import hashlib
+import os
+
+from flask import request, current_app
+from flask_restful.fields import Boolean, Integer, Raw, String
+from werkzeug.utils import secure_filename
+
+from analysisweb.api import db
+from analysisweb.api.base_models import UploadChunk, UploadSession
+from analysisweb.api.storage import add_blob
+from analysisweb.api.uploads import CHUNK_SIZE
+from analysisweb_user.models import Measurement, MeasurementFile
+from .measurements import MeasurementListResource
+from . import (
+    ResourceBase,
+    ResourceInvalidInputException,
+    ResourceNotFoundException,
+)
+
+
+def session_path(session_id):
+    return os.path.join(
+        current_app.config["UPLOAD_TMP_FOLDER"], "session-{}.part".format(session_id)
+    )
+
+
+def received_ranges(session):
+    """
+    The received byte ranges of an upload session as merged [start, end) pairs
+    """
+    ranges = []
+    for chunk in sorted(session.chunks, key=lambda c: c.offset):
+        start, end = chunk.offset, chunk.offset + chunk.length
+        if ranges and start <= ranges[-1][1]:
+            ranges[-1][1] = max(ranges[-1][1], end)
+        else:
+            ranges.append([start, end])
+    return ranges
+
+
+def is_complete(session):
+    return session.size == 0 or received_ranges(session) == [[0, session.size]]
+
+
+def remove_session(session):
+    for chunk in session.chunks:
+        db.session.delete(chunk)
+    db.session.delete(session)
+    path = session_path(session.id)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def reap_upload_sessions():
+    """
+    Remove the upload sessions that have not received any chunk for
+    UPLOAD_SESSION_MAX_AGE seconds
+    """
+    max_age = datetime.timedelta(seconds=current_app.config["UPLOAD_SESSION_MAX_AGE"])
+    sessions = UploadSession.query.filter(
+        UploadSession.updated_at < datetime.datetime.utcnow() - max_age
+    ).all()
+    for session in sessions:
+        remove_session(session)
+    db.session.commit()
+    return len(sessions)
+
+
+class UploadSessionResource(ResourceBase):
+
+    db_table = UploadSession
+
+    fields = {
+        "id": Integer,
+        "filename": String,
+        "size": Integer,
+        "sha256": String,
+        "received": Raw(attribute=received_ranges),
+        "complete": Boolean(attribute=is_complete),
+    }
+
+    def get(self, id_):
+        """
+        Receive the state of an upload session
+        ---
+        summary: Find an upload session by ID
+        tags:
+            - uploads
+        parameters:
+            -   name: id_
+                in: path
+                description: ID of upload session to return
+                required: true
+                schema:
+                    type: integer
+        responses:
+            200:
+                description: successful operation
+                content:
+                    application/json:
+                        schema:
+                            $ref: "#/components/schemas/UploadSession"
+            400:
+                description: Invalid ID supplied
+            404:
+                description: Upload session not found
+        """
+        try:
+            resource = self.get_resource(id_)
+        except (ResourceInvalidInputException, ResourceNotFoundException) as e:
+            return {"status": str(e)}, e.response_code
+        return self.dump_resource(resource), 200
+
+    def put(self, id_):
+        """
+        Upload a chunk of the file
+        ---
+        summary: Upload a chunk of the file at an offset, chunks can be
+            uploaded in any order and in parallel
+        tags:
+            - uploads
+        parameters:
+            -   name: id_
+                in: path
+                description: ID of upload session
+                required: true
+                schema:
+                    type: integer
+            -   name: offset
+                in: query
+                description: Offset in bytes of the chunk in the file
+                required: true
+                schema:
+                    type: integer
+        requestBody:
+            content:
+                application/octet-stream:
+                    schema:
+                        type: string
+                        format: binary
+        responses:
+            200:
+                description: Chunk received
+                content:
+                    application/json:
+                        schema:
+                            $ref: "#/components/schemas/UploadSession"
+            400:
+                description: Invalid ID or offset supplied, or chunk beyond the file
+            404:
+                description: Upload session not found
+        """
+        try:
+            resource = self.get_resource(id_)
+        except (ResourceInvalidInputException, ResourceNotFoundException) as e:
+            return {"status": str(e)}, e.response_code
+
+        try:
+            self._add_chunk(resource)
+        except ResourceInvalidInputException as e:
+            return {"status": str(e)}, e.response_code
+        return self.dump_resource(resource), 200
+
+    def delete(self, id_):
+        """
+        Abort an upload session
+        ---
+        summary: Aborts an upload session and removes the received data
+        tags:
+            - uploads
+        parameters:
+            -   name: id_
+                in: path
+                description: ID of upload session to abort
+                required: true
+                schema:
+                    type: integer
+        responses:
+            200:
+                description: Upload session aborted
+            400:
+                description: Invalid ID supplied
+            404:
+                description: Upload session not found
+        """
+        try:
+            resource = self.get_resource(id_)
+        except (ResourceInvalidInputException, ResourceNotFoundException) as e:
+            return {"status": str(e)}, e.response_code
+        remove_session(resource)
+        db.session.commit()
+        return {"status": "success"}, 200
+
+    @staticmethod
+    def _add_chunk(resource):
+        try:
+            offset = int(request.args["offset"])
+        except (KeyError, ValueError):
+            raise ResourceInvalidInputException("Missing or invalid offset")
+        if offset < 0 or offset > resource.size:
+            raise ResourceInvalidInputException("Offset outside of the file")
+
+        # Written in place, so chunks can arrive in any order and in parallel
+        length = 0
+        fd = os.open(session_path(resource.id), os.O_WRONLY)
+        try:
+            for data in iter(lambda: request.stream.read(CHUNK_SIZE), b""):
+                if offset + length + len(data) > resource.size:
+                    raise ResourceInvalidInputException("Chunk extends beyond the file")
+                os.pwrite(fd, data, offset + length)
+                length += len(data)
+        finally:
+            os.close(fd)
+
+        db.session.add(UploadChunk(offset=offset, length=length, session=resource))
+        resource.updated_at = datetime.datetime.utcnow()
+        db.session.commit()
+
+
+class UploadSessionListResource(ResourceBase):
+
+    db_table = UploadSession
+    fields = UploadSessionResource.fields
+
+    def post(self):
+        """
+        Start a new upload session
+        ---
+        summary: Start a new upload session for a measurement file
+        tags:
+            - uploads
+        requestBody:
+            content:
+                multipart/form-data:
+                    schema:
+                        properties:
+                            filename:
+                                type: string
+                            size:
+                                type: integer
+                            sha256:
+                                type: string
+        responses:
+            201:
+                description: Upload session created
+            400:
+                description: Invalid input
+        """
+        try:
+            session_id = self._add_session()
+        except ResourceInvalidInputException as e:
+            return {"status": str(e)}, e.response_code
+        return {"status": "success", "id": session_id}, 201
+
+    @staticmethod
+    def _add_session():
+        if "filename" not in request.form or "size" not in request.form:
+            raise ResourceInvalidInputException("Missing input")
+        try:
+            size = int(request.form["size"])
+        except ValueError:
+            raise ResourceInvalidInputException("Size is not a valid integer")
+        max_size = current_app.config["UPLOAD_MAX_FILE_SIZE"]
+        if size < 0 or (max_size is not None and size > max_size):
+            raise ResourceInvalidInputException("Invalid size of file")
+
+        reap_upload_sessions()
+        now = datetime.datetime.utcnow()
+        session = UploadSession(
+            filename=request.form["filename"],
+            size=size,
+            sha256=request.form.get("sha256", None),
+            created_at=now,
+            updated_at=now,
+        )
+        db.session.add(session)
+        db.session.flush()
+        session_id = session.id
+
+        # A sparse file that the chunks are written into
+        os.makedirs(current_app.config["UPLOAD_TMP_FOLDER"], exist_ok=True)
+        with open(session_path(session_id), "wb") as f:
+            f.truncate(size)
+        db.session.commit()
+        return session_id
+
+
+class UploadSessionFinalizeResource(ResourceBase):
+
+    db_table = UploadSession
+    fields = UploadSessionResource.fields
+
+    def post(self, id_):
+        """
+        Finalize an upload session
+        ---
+        summary: Add the uploaded file to an existing or a new measurement
+        tags:
+            - uploads
+        parameters:
+            -   name: id_
+                in: path
+                description: ID of upload session
+                required: true
+                schema:
+                    type: integer
+        requestBody:
+            content:
+                multipart/form-data:
+                    schema:
+                        properties:
+                            file_label:
+                                type: string
+                            measurement:
+                                type: integer
+                            start_date:
+                                type: string
+                                format: date-time
+                            end_date:
+                                type: string
+                                format: date-time
+                            label:
+                                type: string
+                            meta_data:
+                                type: string
+        responses:
+            201:
+                description: File added to the measurement
+            400:
+                description: Invalid input, incomplete upload or checksum mismatch
+            404:
+                description: Upload session or measurement not found
+        """
+        try:
+            resource = self.get_resource(id_)
+        except (ResourceInvalidInputException, ResourceNotFoundException) as e:
+            return {"status": str(e)}, e.response_code
+
+        try:
+            measurement_id = self._finalize(resource)
+        except (ResourceInvalidInputException, ResourceNotFoundException) as e:
+            return {"status": str(e)}, e.response_code
+        return {"status": "success", "id": measurement_id}, 201
+
+    def _finalize(self, resource):
+        if "file_label" not in request.form:
+            raise ResourceInvalidInputException("Missing input")
+        if not is_complete(resource):
+            raise ResourceInvalidInputException("Upload is not complete")
+
+        path = session_path(resource.id)
+        sha256 = hashlib.sha256()
+        with open(path, "rb") as f:
+            for data in iter(lambda: f.read(CHUNK_SIZE), b""):
+                sha256.update(data)
+        sha256 = sha256.hexdigest()
+        if resource.sha256 and resource.sha256.lower() != sha256:
+            raise ResourceInvalidInputException("Checksum of uploaded file mismatch")
+
+        if "measurement" in request.form:
+            measurement = self.get_resource(request.form["measurement"], Measurement)
+            file_folder = os.path.join(
+                current_app.config["MEASUREMENT_FILES_FOLDER"], str(measurement.id)
+            )
+        else:
+            if (
+                "start_date" not in request.form
+                or "end_date" not in request.form
+                or "label" not in request.form
+            ):
+                raise ResourceInvalidInputException("Missing input")
+            measurement, file_folder = MeasurementListResource.create_measurement()
+        measurement_id = measurement.id
+
+        filename = secure_filename(resource.filename)
+        file_path = os.path.join(file_folder, filename)
+        if os.path.exists(file_path):
+            raise ResourceInvalidInputException(
+                "Measurement already has a file named '{}'".format(filename)
+            )
+        # The assembled file is moved to the store rather than copied
+        add_blob(path, sha256, file_path)
+        f = MeasurementFile(
+            label=request.form["file_label"],
+            path=filename,
+            sha256=sha256,
+            size=resource.size,
+            measurement=measurement,
+        )
+        db.session.add(f)
+        measurement.touch()
+        remove_session(resource)
+        db.session.commit()
+        self.invalidate_cache(measurement)
+        return measurement_id
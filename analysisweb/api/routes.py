@@ -13,19 +13,51 @@ from analysisweb.api.resources.analyses import (
 from analysisweb.api.resources.jobs import (
     JobResource,
     JobListResource,
+    JobBatchResource,
     JobOutputResource,
     JobReportResource,
     JobLogResource,
+    JobCancelResource,
 )
+from analysisweb.api.resources.campaigns import (
+    CampaignResource,
+    CampaignListResource,
+)
+from analysisweb.api.resources.pipelines import (
+    PipelineResource,
+    PipelineListResource,
+)
+from analysisweb.api.resources.archives import (
+    JobArchiveResource,
+    JobListArchiveResource,
+)
+from analysisweb.api.resources.uploads import (
+    UploadSessionResource,
+    UploadSessionListResource,
+    UploadSessionFinalizeResource,
+)
+from analysisweb.api.resources.cache import CacheStatsResource
 
 api.add_resource(MeasurementListResource, "/measurements")
-api.add_resource(MeasurementResource, "/measurement/<id>")
+api.add_resource(MeasurementResource, "/measurement/<id_>")
 api.add_resource(MeasurementMetaResource, "/measurements/meta")
 api.add_resource(AnalysisListResource, "/analyses")
-api.add_resource(AnalysisResource, "/analysis/<id>")
+api.add_resource(AnalysisResource, "/analysis/<id_>")
 api.add_resource(AnalysisMetaResource, "/analysis/meta")
 api.add_resource(JobListResource, "/jobs")
-api.add_resource(JobResource, "/job/<id>")
-api.add_resource(JobOutputResource, "/job/<id>/output")
-api.add_resource(JobReportResource, "/job/<id>/report")
-api.add_resource(JobLogResource, "/job/<id>/log")
+api.add_resource(JobBatchResource, "/jobs/batch")
+api.add_resource(JobResource, "/job/<id_>")
+api.add_resource(JobOutputResource, "/job/<id_>/output")
+api.add_resource(JobReportResource, "/job/<id_>/report")
+api.add_resource(JobLogResource, "/job/<id_>/log")
+api.add_resource(JobCancelResource, "/job/<id_>/cancel")
+api.add_resource(CampaignListResource, "/campaigns")
+api.add_resource(CampaignResource, "/campaign/<id_>")
+api.add_resource(PipelineListResource, "/pipelines")
+api.add_resource(PipelineResource, "/pipeline/<id_>")
+api.add_resource(JobArchiveResource, "/job/<id_>/archive")
+api.add_resource(JobListArchiveResource, "/jobs/archive")
+api.add_resource(UploadSessionListResource, "/uploads")
+api.add_resource(UploadSessionResource, "/upload/<id_>")
+api.add_resource(UploadSessionFinalizeResource, "/upload/<id_>/finalize")
+api.add_resource(CacheStatsResource, "/cache/stats")
@@ -0,0 +1,850 @@
+"""
+This module contain the operations on jobs that are shared by the resources and
+the Celery worker, which runs them directly on the database and the job folders
+instead of calling back to the API
+"""
+import contextlib
+import datetime
+import hashlib
+import json
+import os
+import signal
+import socket
+import uuid
+
+from flask import current_app, g
+from sqlalchemy import case, func, or_
+from sqlalchemy.orm import joinedload, selectinload
+
+from analysisweb.api import celery, db, utils
+from analysisweb.api.base_models import (
+    Campaign,
+    JOB_ACTIVE_STATES,
+    JOB_TRANSITIONS,
+    Pipeline,
+    job_dependency,
+)
+from analysisweb.api.cache import response_cache
+from analysisweb.api.resources import ResourceBase, ResourceConflictException
+from analysisweb.api.storage import link
+from analysisweb.api.uploads import (
+    CHUNK_SIZE,
+    COMPRESSED_SUFFIX,
+    mkstemp,
+    open_stored,
+)
+from analysisweb_user.models import Job, JobFigureOutput, JobReport, JobTableOutput
+
+LOG_HTML_FILENAME = "log.html"
+
+
+def job_folder(job_id):
+    return os.path.join(current_app.config["JOB_FILES_FOLDER"], str(job_id))
+
+
+def update_job(job, sources, committing=None, **values):
+    """
+    Update a job if it is in one of the given states, the state is checked as
+    part of the update so that of two concurrent updates, e.g. the completion
+    and the cancellation of a job, only one succeeds
+
+    committing is a function returning a context manager that the update is
+    committed in, e.g. to move a file the update refers to into place and back
+    if the commit fails. If it raises, the update is rolled back.
+
+    Returns
+    -------
+    bool:
+        False if the job was not in any of the states
+    """
+    values.update(version=Job.version + 1, updated_at=datetime.datetime.utcnow())
+    updated = Job.query.filter(Job.id == job.id, Job.status.in_(sources)).update(
+        values, synchronize_session=False
+    )
+    if not updated:
+        db.session.rollback()
+        return False
+    namespaces = ResourceBase.cache_namespaces_of(job)
+    status = values.get("status", None)
+    finished = status is not None and status not in JOB_ACTIVE_STATES
+    for table, group_id in [
+        (Campaign, job.campaign_id),
+        (Pipeline, job.pipeline_id),
+    ]:
+        if finished and group_id is not None:
+            # Counted in the same transaction, so that every job is counted once
+            gather_job(table, group_id, status)
+            namespaces += [
+                "{}:{}".format(table.__tablename__, key) for key in (group_id, "list")
+            ]
+    try:
+        if committing is None:
+            db.session.commit()
+        else:
+            with committing():
+                db.session.commit()
+    except BaseException:
+        db.session.rollback()
+        raise
+    response_cache.invalidate(*namespaces)
+    if finished and job.pipeline_id is not None:
+        release_downstream(job, status)
+    return True
+
+
+def gather_job(table, group_id, status):
+    """
+    Count a job of a campaign or a pipeline that has finished in the given
+    state, and complete the group if it was the last one
+    """
+    if status == "SUCCEEDED":
+        column = table.succeeded
+    elif status == "CANCELLED":
+        column = table.cancelled
+    else:
+        column = table.failed
+    now = datetime.datetime.utcnow()
+    table.query.filter(table.id == group_id).update(
+        {column: column + 1, table.version: table.version + 1, table.updated_at: now},
+        synchronize_session=False,
+    )
+    finished = table.succeeded + table.failed + table.cancelled
+    table.query.filter(
+        table.id == group_id, table.status == "RUNNING", finished >= table.total
+    ).update(
+        {table.status: "COMPLETED", table.finished_at: now},
+        synchronize_session=False,
+    )
+
+
+def release_downstream(job, status):
+    """
+    Queue the waiting jobs downstream of a finished job whose upstream jobs
+    have all succeeded, with the outputs they use linked into their input
+    folders, or cancel them all if the job did not succeed
+
+    The jobs that finish in turn, e.g. the cancelled ones, are added to a work
+    list instead of being released by a nested call, as a pipeline can have
+    too many stages to be walked by recursion
+    """
+    work = g.get("release_work", None)
+    if work is not None:
+        # Released by the outermost call
+        work.append((job, status))
+        return
+    g.release_work = work = [(job, status)]
+    try:
+        while work:
+            _release_downstream_of(*work.pop())
+    finally:
+        del g.release_work
+
+
+def _release_downstream_of(job, status):
+    downstream = (
+        Job.query.options(
+            joinedload("analysis"), joinedload("measurement"), selectinload("input")
+        )
+        .join(job_dependency, Job.id == job_dependency.c.job_id)
+        .filter(job_dependency.c.upstream_id == job.id, Job.status == "WAITING")
+        .all()
+    )
+    released = []
+    for downstream_job in downstream:
+        try:
+            if status != "SUCCEEDED":
+                # The jobs further downstream are cancelled in turn
+                transition_job(
+                    downstream_job,
+                    "CANCELLED",
+                    finished_at=datetime.datetime.utcnow(),
+                )
+                continue
+            upstream_states = (
+                db.session.query(Job.status)
+                .join(job_dependency, Job.id == job_dependency.c.upstream_id)
+                .filter(job_dependency.c.job_id == downstream_job.id)
+                .all()
+            )
+            if any(state != "SUCCEEDED" for state, in upstream_states):
+                continue
+            if not link_upstream_outputs(downstream_job):
+                transition_job(
+                    downstream_job, "FAILED", finished_at=datetime.datetime.utcnow()
+                )
+                continue
+            fingerprint = job_fingerprint(
+                downstream_job.analysis,
+                downstream_job.measurement,
+                [(i.value, i.sha256) for i in downstream_job.input],
+            )
+            transition_job(
+                downstream_job,
+                "QUEUED",
+                queued_at=datetime.datetime.utcnow(),
+                fingerprint=fingerprint,
+            )
+            released.append(downstream_job)
+        except ResourceConflictException:
+            # Released or cancelled concurrently
+            pass
+    for released_job in released:
+        dispatch_jobs(released_job)
+
+
+def parse_job_reference(value):
+    """
+    Split a reference to an output of another job, $job:<id>:<output label>
+
+    Returns
+    -------
+    tuple (int, str):
+        the ID of the job and the label of the output, or None if the value
+        is not a reference
+    """
+    if not value.startswith("$job:"):
+        return None
+    job_id, _, label = value[5:].partition(":")
+    try:
+        return int(job_id), label
+    except ValueError:
+        return None
+
+
+def link_upstream_outputs(job):
+    """
+    Replace the references of the inputs of a job to the outputs of upstream
+    jobs with the output files, linked into the input folder of the job or
+    decompressed there if they are saved compressed
+
+    The inputs are changed in the session, but not committed
+
+    Returns
+    -------
+    bool:
+        False if an upstream job does not have the referenced output
+    """
+    outputs = {}
+    for upstream_job in job.upstream:
+        for output in upstream_job.table_output + upstream_job.figure_output:
+            outputs[upstream_job.id, output.label] = os.path.join(
+                job_folder(upstream_job.id), "output", output.path
+            )
+    folder = os.path.join(job_folder(job.id), "input")
+    for job_input in job.input:
+        reference = parse_job_reference(job_input.value)
+        if reference is None:
+            continue
+        src = outputs.get(reference, None)
+        if src is None:
+            current_app.logger.error(
+                "Job %s has no output %s needed by job %s", *reference, job.id
+            )
+            return False
+        # Named after the job as outputs of different jobs can share names
+        filename = "{}-{}".format(reference[0], os.path.basename(src))
+        job_input.sha256 = link_input(src, os.path.join(folder, filename))
+        job_input.value = filename
+        job_input.is_file = True
+    return True
+
+
+def link_input(src, path):
+    """
+    Link a stored file to a path, or decompress it there if it is saved
+    compressed, replacing the path atomically
+
+    Returns
+    -------
+    str:
+        the SHA-256 of the file
+    """
+    fd, tmp_path = mkstemp(os.path.dirname(path), suffix=".input")
+    os.close(fd)
+    sha256 = hashlib.sha256()
+    try:
+        if os.path.isfile(src):
+            link(src, tmp_path)
+            with open(tmp_path, "rb") as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    sha256.update(chunk)
+        else:
+            with open_stored(src) as f, open(tmp_path, "wb") as dst:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    sha256.update(chunk)
+                    dst.write(chunk)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return sha256.hexdigest()
+
+
+def transition_job(job, status, committing=None, **values):
+    """
+    Move a job to another state
+
+    Parameters
+    ----------
+    job: Job
+        the job
+    status: str
+        the new state
+    committing: callable
+        returns a context manager that the new state is committed in, see
+        update_job
+    values: dict
+        other columns to update along with the state
+
+    Raises
+    ------
+    ResourceConflictException
+        if the job cannot move to the state from its current state
+    """
+    sources = [
+        source for source, targets in JOB_TRANSITIONS.items() if status in targets
+    ]
+    if not update_job(job, sources, committing, status=status, **values):
+        raise ResourceConflictException(
+            "Job {} cannot become {} when it is {}".format(
+                job.id, status.lower(), (job.status or "").lower()
+            )
+        )
+
+
+def start_job(job, started_at=None):
+    """
+    Mark a queued job as running
+    """
+    transition_job(job, "RUNNING", started_at=started_at or datetime.datetime.utcnow())
+
+
+def finish_job(job, exit_code, log_path=None, started_at=None, status=None):
+    """
+    Add the rendered log and the exit code to a job and mark it as finished
+
+    Parameters
+    ----------
+    job: Job
+        the job
+    exit_code: int
+        the exit code of the analysis
+    log_path: str
+        the path to the rendered HTML log, which is moved into the job folder,
+        or None if the job has no log. It must be on the same file system as
+        the job folder.
+    started_at: datetime.datetime
+        when the job started, if its start has not been recorded
+    status: str
+        the final state, by default SUCCEEDED if the exit code is 0 and
+        otherwise FAILED
+    """
+    if job.status == "QUEUED":
+        start_job(job, started_at)
+
+    if status is None:
+        status = "SUCCEEDED" if exit_code == 0 else "FAILED"
+    values = {"exit_code": exit_code}
+    path = os.path.join(job_folder(job.id), LOG_HTML_FILENAME)
+
+    @contextlib.contextmanager
+    def log_moved():
+        # Moved before the job is committed, so that a committed job always
+        # has its log, and back if the commit fails, for a retry
+        if log_path is None or log_path == path:
+            yield
+            return
+        os.replace(log_path, path)
+        try:
+            yield
+        except BaseException:
+            os.replace(path, log_path)
+            raise
+
+    if log_path is not None:
+        values["log"] = LOG_HTML_FILENAME
+    try:
+        transition_job(
+            job, status, log_moved, finished_at=datetime.datetime.utcnow(), **values
+        )
+    except ResourceConflictException:
+        # A job cancelled while it ran still gets the log of the run
+        if job.status != "CANCELLED" or not update_job(
+            job, ["CANCELLED"], log_moved, **values
+        ):
+            raise
+
+    # The job frees a place for a held job
+    dispatch_jobs(job)
+
+
+def cancel_job(job):
+    """
+    Cancel a queued or running job
+
+    The job is marked as cancelled and a marker is left in its folder, which
+    makes the worker skip it or stop the analysis, and its task is revoked in
+    case the worker has not received it yet
+
+    Raises
+    ------
+    ResourceConflictException
+        if the job has already finished
+    """
+    task_id = job.task_id
+    transition_job(job, "CANCELLED", finished_at=datetime.datetime.utcnow())
+    open(os.path.join(job_folder(job.id), utils.CANCEL_FILENAME), "w").close()
+    if task_id:
+        try:
+            celery.control.revoke(task_id)
+        except Exception:
+            # The marker and the state are enough to stop the job
+            current_app.logger.exception("Could not revoke task %s", task_id)
+    dispatch_jobs(job)
+
+
+def record_worker(job, pgid):
+    """
+    Record the worker process running a job and the process group of its
+    analysis, so that the job can be reaped if the worker process is lost
+    """
+    update_job(
+        job,
+        JOB_ACTIVE_STATES,
+        worker_host=socket.gethostname(),
+        worker_pid=os.getpid(),
+        pgid=pgid,
+    )
+
+
+def reap_lost_jobs():
+    """
+    Finish the jobs whose worker process on this host has been lost, e.g.
+    killed at the time limit of its task, and kill their analyses, which run in
+    sessions of their own and so outlive the worker process
+
+    A job is finished as timed out if its time limit has passed, and as failed
+    otherwise. Its place is then freed for a held job.
+    """
+    jobs = (
+        Job.query.options(joinedload("analysis"))
+        .filter(
+            Job.status.in_(("QUEUED", "RUNNING")),
+            Job.worker_host == socket.gethostname(),
+        )
+        .all()
+    )
+    for job in jobs:
+        try:
+            os.kill(job.worker_pid, 0)
+            continue
+        except ProcessLookupError:
+            pass
+        except PermissionError:
+            # Alive, but of another user
+            continue
+        if job.pgid is not None:
+            try:
+                os.killpg(job.pgid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+        time_limit = job_time_limit(job_timeout(job.analysis))
+        timed_out = (
+            time_limit is not None
+            and job.started_at is not None
+            and datetime.datetime.utcnow() - job.started_at
+            >= datetime.timedelta(seconds=time_limit)
+        )
+
+        folder = job_folder(job.id)
+        log_path = os.path.join(folder, utils.LOG_FILENAME)
+        with open(log_path, "a") as log:
+            if timed_out:
+                log.write(
+                    "Stopped after the time limit of {} seconds\n".format(time_limit)
+                )
+            else:
+                log.write("The worker running the job was lost\n")
+        fd, html_path = mkstemp(folder, suffix=".html.part")
+        os.close(fd)
+        utils.render_log(log_path, html_path)
+        current_app.logger.warning(
+            "Reaping job %s, whose worker process %s was lost",
+            job.id,
+            job.worker_pid,
+        )
+        try:
+            finish_job(
+                job,
+                -signal.SIGKILL,
+                html_path,
+                status="TIMED_OUT" if timed_out else "FAILED",
+            )
+        except ResourceConflictException:
+            # Finished concurrently, e.g. reaped by another worker process
+            os.remove(html_path)
+
+
+def make_input_json(job):
+    """
+    The input config of the analysis of a job
+    """
+    # TODO replace actual paths to the upload folder with URLs to the server
+    analysis, measurement = job.analysis, job.measurement
+    input_ = []
+    for job_input, analysis_input in zip(job.input, analysis.input):
+        if analysis_input.type == "value":
+            value = job_input.value
+        else:
+            if job_input.value.startswith("$measurement"):
+                value = ""
+                for f in measurement.files:
+                    if f.label == analysis_input.label:
+                        value = os.path.join(
+                            current_app.config["MEASUREMENT_FILES_FOLDER"],
+                            str(measurement.id),
+                            f.path,
+                        )
+                        break
+            else:
+                value = os.path.join(job_folder(job.id), "input", job_input.value)
+        input_.append({"label": analysis_input.label, "value": value})
+    output = [{"type": o.type, "label": o.label} for o in analysis.output]
+    post_url = current_app.config["SERVER_URL"] + "job/{}/output".format(job.id)
+    return {
+        "input": input_,
+        "output": output,
+        "job_id": job.id,
+        "post_url": post_url,
+    }
+
+
+def analysis_sha256(analysis):
+    """
+    The SHA-256 of the analysis file, computed and kept on the analysis if it
+    is not known yet, or None if the file is missing
+    """
+    if analysis.syx_sha256 is None:
+        path = os.path.join(
+            current_app.config["ANALYSIS_FILES_FOLDER"],
+            str(analysis.id),
+            analysis.syx_file,
+        )
+        sha256 = hashlib.sha256()
+        try:
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    sha256.update(chunk)
+        except FileNotFoundError:
+            return None
+        analysis.syx_sha256 = sha256.hexdigest()
+    return analysis.syx_sha256
+
+
+def job_fingerprint(analysis, measurement, inputs):
+    """
+    A hash identifying the result of a job, from the contents of the analysis
+    file, the input values and the contents of the input files
+
+    Parameters
+    ----------
+    analysis: Analysis
+        the analysis of the job
+    measurement: Measurement
+        the measurement of the job, or None
+    inputs: list of tuple (str, str)
+        the value and the SHA-256, if it is a file, of every input
+
+    Returns
+    -------
+    str:
+        the fingerprint, or None if the checksum of the analysis file or of an
+        input file is not known
+    """
+    syx_sha256 = analysis_sha256(analysis)
+    if syx_sha256 is None:
+        return None
+    measurement_files = {}
+    if measurement is not None:
+        measurement_files = {f.label: f.sha256 for f in measurement.files}
+    resolved = []
+    # Resolved in the same way as in make_input_json
+    for analysis_input, (value, sha256) in zip(analysis.input, inputs):
+        if analysis_input.type == "value":
+            resolved.append([analysis_input.label, "value", value])
+            continue
+        if value.startswith("$measurement"):
+            sha256 = measurement_files.get(analysis_input.label, None)
+        if sha256 is None:
+            return None
+        resolved.append([analysis_input.label, "file", sha256])
+    key = {
+        "analysis": syx_sha256,
+        "input": resolved,
+        "output": [[o.type, o.label] for o in analysis.output],
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+def find_results(jobs):
+    """
+    The last succeeded job with the fingerprint of each of a number of jobs,
+    found in a single query
+
+    Returns
+    -------
+    dict:
+        the succeeded job by fingerprint, fingerprints without one are left out
+    """
+    fingerprints = {job.fingerprint for job in jobs} - {None}
+    if not fingerprints:
+        return {}
+    sources = (
+        Job.query.options(
+            selectinload("table_output"),
+            selectinload("figure_output"),
+            selectinload("reports"),
+        )
+        .filter(Job.fingerprint.in_(fingerprints), Job.status == "SUCCEEDED")
+        .order_by(Job.finished_at.desc(), Job.id.desc())
+        .all()
+    )
+    results = {}
+    for source in sources:
+        results.setdefault(source.fingerprint, source)
+    return results
+
+
+def reuse_result(job, source):
+    """
+    Satisfy a queued job with the result of a succeeded job with the same
+    fingerprint, by linking its outputs, reports and log
+
+    The linked files are shared with the succeeded job, so they are only ever
+    replaced and never written in place, see uploads.replaced.
+
+    Parameters
+    ----------
+    job: Job
+        the queued job
+    source: Job
+        the succeeded job, from find_results
+    """
+    paths = [utils.LOG_FILENAME]
+    if source.log:
+        paths.append(source.log)
+    for output in source.table_output:
+        paths.append(os.path.join("output", output.path))
+        db.session.add(JobTableOutput(label=output.label, path=output.path, job=job))
+    for output in source.figure_output:
+        paths.append(os.path.join("output", output.path))
+        paths.append(os.path.join("output", output.html))
+        db.session.add(
+            JobFigureOutput(
+                label=output.label, path=output.path, html=output.html, job=job
+            )
+        )
+    for report in source.reports:
+        paths.append(os.path.join("reports", report.path))
+        db.session.add(JobReport(path=report.path, job=job))
+    src, dst = job_folder(source.id), job_folder(job.id)
+    for path in paths:
+        # Outputs may be saved compressed
+        for name in [path, path + COMPRESSED_SUFFIX]:
+            if os.path.isfile(os.path.join(src, name)):
+                link(os.path.join(src, name), os.path.join(dst, name))
+
+    now = datetime.datetime.utcnow()
+    try:
+        transition_job(
+            job,
+            "SUCCEEDED",
+            started_at=now,
+            finished_at=now,
+            exit_code=source.exit_code,
+            log=source.log,
+        )
+    except ResourceConflictException:
+        # No longer queued, e.g. cancelled, so it is not to be run either
+        pass
+
+
+def job_timeout(analysis):
+    """
+    The wall-clock time in seconds after which the jobs of an analysis are
+    stopped, or None
+    """
+    # The global timeout is an upper bound for the one of the analysis
+    timeouts = [t for t in (analysis.timeout, current_app.config["JOB_TIMEOUT"]) if t]
+    return min(timeouts) if timeouts else None
+
+
+def job_time_limit(timeout):
+    """
+    The time limit of the task of a job, after which the worker process running
+    it is killed in case the analysis cannot be stopped
+    """
+    return None if timeout is None else timeout + utils.STOP_GRACE_PERIOD + 60
+
+
+def prepare_job(job):
+    """
+    Write the input config of a job and make the options of its task, which
+    sends it to the queue of its priority
+    """
+    config = current_app.config
+    analysis = job.analysis
+    inp_file = os.path.join(job_folder(job.id), "inp.json")
+    with open(inp_file, "w") as f:
+        json.dump(make_input_json(job), f)
+    syx_file = os.path.join(
+        config["ANALYSIS_FILES_FOLDER"], str(analysis.id), analysis.syx_file
+    )
+    post_url = config["SERVER_URL"] + "job/{}/log".format(job.id)
+    timeout = job_timeout(analysis)
+    queue = config["JOB_QUEUES"].get(
+        job.priority, config["JOB_QUEUES"][config["JOB_PRIORITY_DEFAULT"]]
+    )
+    return {
+        "args": (inp_file, syx_file, config["SYMPATHY_EXEC"], post_url),
+        "kwargs": {
+            "job_id": job.id,
+            "direct": config["JOB_COMPLETION"] == "direct",
+            "timeout": timeout,
+            "executor": config["JOB_EXECUTOR"],
+        },
+        "queue": queue,
+        "time_limit": job_time_limit(timeout),
+    }
+
+
+def dispatch_jobs(job):
+    """
+    Send the held jobs that share the analysis or the measurement of a job to
+    the workers, as far as the concurrency limits allow, by priority and then
+    in the order they were queued
+
+    A job is held while it is queued without a task. The limits are only
+    checked here, so that the workers can stay unaware of them.
+
+    Returns
+    -------
+    int:
+        the number of jobs sent
+    """
+    config = current_app.config
+    criteria = [Job.analysis_id == job.analysis_id]
+    if job.measurement_id is not None:
+        criteria.append(Job.measurement_id == job.measurement_id)
+    ranks = {name: rank for rank, name in enumerate(config["JOB_QUEUES"])}
+    held = (
+        Job.query.options(joinedload("analysis"), selectinload("input"))
+        .filter(Job.status == "QUEUED", Job.task_id.is_(None), or_(*criteria))
+        .order_by(
+            case(ranks, value=Job.priority, else_=len(ranks)), Job.queued_at, Job.id
+        )
+        .all()
+    )
+    if config["JOB_RESULT_CACHE"]:
+        results = find_results(held)
+        for held_job in held:
+            if held_job.fingerprint in results:
+                reuse_result(held_job, results[held_job.fingerprint])
+        held = [held_job for held_job in held if held_job.fingerprint not in results]
+    if not held:
+        return 0
+
+    def count_active(column, ids):
+        return dict(
+            db.session.query(column, func.count(Job.id))
+            .filter(
+                Job.status.in_(JOB_ACTIVE_STATES),
+                Job.task_id.isnot(None),
+                column.in_(ids),
+            )
+            .group_by(column)
+            .all()
+        )
+
+    per_analysis = count_active(Job.analysis_id, {j.analysis_id for j in held})
+    per_measurement = count_active(
+        Job.measurement_id, {j.measurement_id for j in held} - {None}
+    )
+    claimed = []
+    for held_job in held:
+        analysis_id, measurement_id = held_job.analysis_id, held_job.measurement_id
+        limit = (
+            held_job.analysis.max_concurrent
+            or config["JOB_MAX_CONCURRENT_PER_ANALYSIS"]
+        )
+        if limit is not None and per_analysis.get(analysis_id, 0) >= limit:
+            continue
+        limit = config["JOB_MAX_CONCURRENT_PER_MEASUREMENT"]
+        if (
+            measurement_id is not None
+            and limit is not None
+            and per_measurement.get(measurement_id, 0) >= limit
+        ):
+            continue
+        # Claimed in the update, so that concurrent dispatchers cannot both
+        # send the job
+        task_id = str(uuid.uuid4())
+        claimed_job = Job.query.filter(
+            Job.id == held_job.id, Job.status == "QUEUED", Job.task_id.is_(None)
+        ).update({Job.task_id: task_id}, synchronize_session=False)
+        if claimed_job:
+            per_analysis[analysis_id] = per_analysis.get(analysis_id, 0) + 1
+            if measurement_id is not None:
+                per_measurement[measurement_id] = (
+                    per_measurement.get(measurement_id, 0) + 1
+                )
+            claimed.append((held_job.id, task_id, prepare_job(held_job)))
+    db.session.commit()
+
+    # Sent over a single connection to the broker
+    sent = set()
+    try:
+        with celery.producer_or_acquire() as producer:
+            for job_id, task_id, options in claimed:
+                utils.sympathy_job.apply_async(
+                    task_id=task_id, producer=producer, **options
+                )
+                sent.add(job_id)
+    except Exception:
+        current_app.logger.exception("Could not send the held jobs")
+    failed = [job_id for job_id, _, _ in claimed if job_id not in sent]
+    if failed:
+        # Held again, to be sent when the next job finishes or by
+        # dispatch_held_jobs
+        Job.query.filter(Job.id.in_(failed)).update(
+            {Job.task_id: None}, synchronize_session=False
+        )
+        db.session.commit()
+    return len(sent)
+
+
+def dispatch_held_jobs():
+    """
+    Send all the held jobs to the workers, as far as the concurrency limits
+    allow, e.g. the jobs that were held again as the broker could not be
+    reached and that no finishing job of their analysis would send
+
+    Returns
+    -------
+    int:
+        the number of jobs sent
+    """
+    # One job of each analysis, as its held jobs are all dispatched together
+    job_ids = (
+        db.session.query(func.min(Job.id))
+        .filter(Job.status == "QUEUED", Job.task_id.is_(None))
+        .group_by(Job.analysis_id)
+        .all()
+    )
+    sent = 0
+    for (job_id,) in job_ids:
+        job = Job.query.get(job_id)
+        if job is not None:
+            sent += dispatch_jobs(job)
+    return sent
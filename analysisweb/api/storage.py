@@ -0,0 +1,129 @@
+"""
+This module contain the content-addressed store of uploaded files
+
+Every distinct file content is stored once as a blob named by its SHA-256 in
+BLOB_FOLDER, sharded on the first characters of the hash. The files of the
+measurements and jobs are hard links to the blobs, so the link count of a blob
+is its reference count: a blob with a single link is not used by any resource.
+"""
+import errno
+import os
+import shutil
+import tempfile
+
+from flask import current_app
+
+from analysisweb.api.uploads import UploadFileStream, mkstemp, save_upload
+
+
+def blob_path(sha256):
+    return os.path.join(
+        current_app.config["BLOB_FOLDER"], sha256[:2], sha256[2:4], sha256
+    )
+
+
+def store_file(file, path):
+    """
+    Store an uploaded file at a path, linked to the blob of its content
+
+    Parameters
+    ----------
+    file: werkzeug.FileStorage
+        the uploaded file
+    path: str
+        the path of the stored file
+
+    Returns
+    -------
+    tuple (str, int)
+        the SHA-256 and the size in bytes of the file
+    """
+    stream = file.stream
+    if isinstance(stream, UploadFileStream) and not stream.moved:
+        sha256, size, tmp_path = stream.sha256, stream.size, stream.path
+        stream.moved = True  # The temporary file is now handled here
+    else:
+        folder = current_app.config["UPLOAD_TMP_FOLDER"]
+        os.makedirs(folder, exist_ok=True)
+        fd, tmp_path = mkstemp(folder, suffix=".upload")
+        os.close(fd)
+        sha256, size = save_upload(file, tmp_path)
+    add_blob(tmp_path, sha256, path)
+    return sha256, size
+
+
+def add_blob(src, sha256, path):
+    """
+    Add a file to the store and link it to a path, if the blob already exists
+    the file is removed
+
+    Parameters
+    ----------
+    src: str
+        the path of the file, it is moved or removed
+    sha256: str
+        the SHA-256 of the file
+    path: str
+        the path to link to the blob
+    """
+    blob = blob_path(sha256)
+    try:
+        link(blob, path)
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        os.replace(src, blob)
+        link(blob, path)
+    else:
+        os.remove(src)
+
+
+def link(blob, path):
+    """
+    Link a blob to a path, replacing the file at the path if there is one
+
+    The link is made at a temporary path in the same folder and then moved
+    into place, so that an existing file is replaced atomically instead of
+    failing the link.
+    """
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path), prefix=".", suffix=".link"
+    )
+    os.close(fd)
+    os.remove(tmp_path)
+    try:
+        try:
+            os.link(blob, tmp_path)
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+                raise
+            # Fall back on a copy, which will not count as a reference to the
+            # blob
+            if not os.path.exists(blob):
+                raise FileNotFoundError(blob)
+            shutil.copyfile(blob, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def release_blobs(hashes):
+    """
+    Remove the blobs that are no longer linked to by any resource, should be
+    called after the files of the resources have been removed
+
+    Parameters
+    ----------
+    hashes: list of str
+        the SHA-256 of the blobs, None entries are ignored
+    """
+    for sha256 in set(hashes):
+        if sha256 is None:
+            continue
+        blob = blob_path(sha256)
+        try:
+            if os.stat(blob).st_nlink <= 1:
+                os.remove(blob)
+        except FileNotFoundError:
+            pass
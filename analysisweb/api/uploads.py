@@ -0,0 +1,197 @@
+"""
+This module contain the handling of uploaded files
+
+Uploaded files are streamed by the form parser straight to a temporary file in the
+upload folder, hashing them on the way. Storing the file is then a rename within
+the same file system rather than another copy.
+"""
+import contextlib
+import gzip
+import hashlib
+import os
+import tempfile
+
+from flask import Request, current_app
+from werkzeug.exceptions import RequestEntityTooLarge
+
+CHUNK_SIZE = 1024 * 1024
+COMPRESSED_SUFFIX = ".gz"
+
+# The umask of the process, which can only be read by setting it
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+
+def mkstemp(folder, prefix=None, suffix=None):
+    """
+    Create a temporary file in a folder with the mode of files created by open
+    rather than 0600, as the temporary files are moved into place as the stored
+    files, which the front server and the workers need to read
+
+    Returns
+    -------
+    tuple (int, str)
+        the file descriptor and the path of the file
+    """
+    fd, path = tempfile.mkstemp(dir=folder, prefix=prefix, suffix=suffix)
+    os.fchmod(fd, 0o666 & ~UMASK)
+    return fd, path
+
+
+class UploadFileStream(object):
+    """
+    A temporary file for an uploaded file that keeps track of the size and
+    SHA-256 of the data written to it
+
+    Parameters
+    ----------
+    folder: str
+        the folder in which to create the file
+    max_size: int or None
+        the maximum number of bytes that can be written
+    """
+
+    def __init__(self, folder, max_size=None):
+        os.makedirs(folder, exist_ok=True)
+        fd, self.path = mkstemp(folder, suffix=".upload")
+        self._file = os.fdopen(fd, "wb+")
+        self._sha256 = hashlib.sha256()
+        self.max_size = max_size
+        self.size = 0
+        self.moved = False
+
+    def write(self, data):
+        self.size += len(data)
+        if self.max_size is not None and self.size > self.max_size:
+            self.close()
+            raise RequestEntityTooLarge(
+                "Uploaded file is larger than {} bytes".format(self.max_size)
+            )
+        self._sha256.update(data)
+        return self._file.write(data)
+
+    @property
+    def sha256(self):
+        return self._sha256.hexdigest()
+
+    def move(self, dst):
+        """
+        Move the file to its final destination
+        """
+        self._file.flush()
+        os.replace(self.path, dst)
+        self.path = dst
+        self.moved = True
+
+    def close(self):
+        self._file.close()
+        if not self.moved and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __getattr__(self, name):
+        # read, seek, tell etc. are used by werkzeug.FileStorage
+        return getattr(self._file, name)
+
+    def __iter__(self):
+        return iter(self._file)
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:  # noqa
+            pass
+
+
+class UploadRequest(Request):
+    """
+    A request that streams uploaded files to UploadFileStream objects
+    """
+
+    def _get_file_stream(
+        self, total_content_length, content_type, filename=None, content_length=None
+    ):
+        return UploadFileStream(
+            current_app.config["UPLOAD_TMP_FOLDER"],
+            current_app.config["UPLOAD_MAX_FILE_SIZE"],
+        )
+
+
+@contextlib.contextmanager
+def replaced(path):
+    """
+    A temporary path next to a path, moved onto the path once the block has
+    written it
+
+    Stored files can be hard links shared with other jobs or blobs, so they are
+    replaced rather than written in place.
+    """
+    fd, tmp_path = mkstemp(os.path.dirname(path), prefix=".", suffix=".part")
+    os.close(fd)
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def save_upload(file, path):
+    """
+    Save an uploaded file, replacing the file at the path if there is one
+
+    Parameters
+    ----------
+    file: werkzeug.FileStorage
+        the uploaded file
+    path: str
+        the path of the saved file
+
+    Returns
+    -------
+    tuple (str, int)
+        the SHA-256 and the size in bytes of the file
+    """
+    stream = file.stream
+    if isinstance(stream, UploadFileStream) and not stream.moved:
+        stream.move(path)
+        return stream.sha256, stream.size
+
+    stream.seek(0)
+    sha256 = hashlib.sha256()
+    size = 0
+    with replaced(path) as tmp_path, open(tmp_path, "wb") as f:
+        for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+            sha256.update(chunk)
+            size += len(chunk)
+            f.write(chunk)
+    return sha256.hexdigest(), size
+
+
+def save_compressed(file, path):
+    """
+    Save an uploaded file gzip-compressed, at the path with a .gz suffix
+
+    Parameters
+    ----------
+    file: werkzeug.FileStorage
+        the uploaded file
+    path: str
+        the path of the file, before the suffix
+    """
+    stream = file.stream
+    stream.seek(0)
+    with replaced(path + COMPRESSED_SUFFIX) as tmp_path, gzip.open(
+        tmp_path, "wb", compresslevel=6
+    ) as f:
+        for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+            f.write(chunk)
+
+
+def open_stored(path):
+    """
+    Open a stored file for reading, that may have been saved compressed
+    """
+    if not os.path.isfile(path) and os.path.isfile(path + COMPRESSED_SUFFIX):
+        return gzip.open(path + COMPRESSED_SUFFIX, "rb")
+    return open(path, "rb")
@@ -1,12 +1,18 @@
 """
 This module contain help routines for the different resources
 """
+import datetime
 import os
+import signal
 import subprocess
-import tempfile
+import threading
+import time
 
 from jinja2 import Template
 import requests
+from requests.adapters import HTTPAdapter
+from celery.signals import worker_process_init
+from celery.utils.log import get_task_logger
 
 from . import celery
 
@@ -22,9 +28,294 @@ log_template = Template(
     "</html>\n"
 )
 
+logger = get_task_logger(__name__)
+
+
+# The live log of the Sympathy run, written to the job folder while it runs
+LOG_FILENAME = "log.txt"
+# Flushed by the watchdog every STOP_POLL_INTERVAL seconds
+LOG_BUFFER_SIZE = 64 * 1024
+# Longer lines are split, so that a single line cannot exhaust the memory
+LOG_MAX_LINE_LENGTH = 64 * 1024
+
+# A marker in the job folder that makes the worker stop the job
+CANCEL_FILENAME = "cancel"
+# Seconds between the checks for timeouts and cancellations of a running job
+STOP_POLL_INTERVAL = 1.0
+# Seconds that a stopped process gets to exit before it is killed
+STOP_GRACE_PERIOD = 10.0
+
+
+def stop_process_group(process):
+    """
+    Terminate a process started in a new session and all of its children,
+    killing them if they have not exited after STOP_GRACE_PERIOD seconds
+    """
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        return
+    try:
+        process.wait(STOP_GRACE_PERIOD)
+    except subprocess.TimeoutExpired:
+        pass
+    # Children may outlive the process itself
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def watch_process(process, finished, timeout, should_stop, reason, poll=None):
+    """
+    Stop a process once it times out or should stop, until it has finished
+
+    Parameters
+    ----------
+    process: subprocess.Popen
+        the process, started in a new session
+    finished: threading.Event
+        set once the process has finished
+    timeout: float
+        the wall-clock time in seconds after which the process is stopped,
+        or None
+    should_stop: callable
+        polled while the process runs, or None
+    reason: list
+        "timeout" or "cancelled" is appended to it if the process is stopped
+    poll: callable
+        called every STOP_POLL_INTERVAL seconds while the process runs, or None
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while not finished.wait(STOP_POLL_INTERVAL):
+        if poll is not None:
+            poll()
+        if deadline is not None and time.monotonic() > deadline:
+            reason.append("timeout")
+        elif should_stop is not None and should_stop():
+            reason.append("cancelled")
+        else:
+            continue
+        stop_process_group(process)
+        return
+
+
+def run_logged(args, log_path, timeout=None, should_stop=None, on_start=None):
+    """
+    Run a process and write its output to a log file line by line while it runs
+
+    Parameters
+    ----------
+    args: list of str
+        the command to run
+    log_path: str
+        the path to the log file
+    timeout: float
+        the wall-clock time in seconds after which the process and its
+        children are stopped, or None
+    should_stop: callable
+        polled while the process runs, the process and its children are stopped
+        once it returns True
+    on_start: callable
+        called with the process once it has started, or None
+
+    Returns
+    -------
+    tuple (int, str):
+        the exit code of the process and why it was stopped, i.e. None,
+        "timeout" or "cancelled"
+    """
+    with open(log_path, "w", buffering=LOG_BUFFER_SIZE) as log:
+        process = subprocess.Popen(
+            args,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            universal_newlines=True,
+            errors="replace",
+            # A process group of its own, so that it can be stopped with
+            # all of its children
+            start_new_session=True,
+        )
+        if on_start is not None:
+            on_start(process)
+        finished = threading.Event()
+        reason = []
+        # Flushed from the watchdog, so that the output before the process goes
+        # quiet is not left in the buffer
+        log_lock = threading.Lock()
+
+        def flush():
+            with log_lock:
+                log.flush()
+
+        watchdog = threading.Thread(
+            target=watch_process,
+            args=(process, finished, timeout, should_stop, reason, flush),
+            daemon=True,
+        )
+        watchdog.start()
+        try:
+            for line in iter(lambda: process.stdout.readline(LOG_MAX_LINE_LENGTH), ""):
+                with log_lock:
+                    log.write(line)
+            process.stdout.close()
+            exit_code = process.wait()
+        finally:
+            finished.set()
+        watchdog.join()
+
+        reason = reason[0] if reason else None
+        write_stop_reason(log, reason, timeout)
+        return exit_code, reason
+
+
+def write_stop_reason(log, reason, timeout):
+    """
+    Write why a process was stopped, if it was, at the end of its log
+    """
+    if reason == "timeout":
+        log.write("Stopped after the timeout of {} seconds\n".format(timeout))
+    elif reason == "cancelled":
+        log.write("Stopped because the job was cancelled\n")
+
+
+def render_log(log_path, html_path):
+    """
+    Render a log file as HTML without reading it all into memory
+    """
+    with open(log_path, "r") as log, open(html_path, "w") as f:
+        lines = (line.rstrip("\n") for line in log)
+        log_template.stream(lines=lines).dump(f)
+
+
+def tail_offset(path, nlines, block_size=64 * 1024):
+    """
+    The offset in a file where the last lines start, found by reading
+    the file backwards in blocks
+
+    Parameters
+    ----------
+    path: str
+        the path to the file
+    nlines: int
+        the number of lines at the end of the file
+
+    Returns
+    -------
+    int:
+        the offset of the first of the lines
+    """
+    with open(path, "rb") as f:
+        end = f.seek(0, os.SEEK_END)
+        pos = end
+        count = 0
+        while pos > 0:
+            size = min(block_size, pos)
+            pos -= size
+            f.seek(pos)
+            block = f.read(size)
+            # A newline ending the file does not start another line
+            if pos + size == end and block.endswith(b"\n"):
+                block = block[:-1]
+            idx = len(block)
+            while True:
+                idx = block.rfind(b"\n", 0, idx)
+                if idx == -1:
+                    break
+                count += 1
+                if count == nlines:
+                    return pos + idx + 1
+        return 0
+
+
+def read_from(path, offset, chunk_size=64 * 1024):
+    """
+    Read a file from an offset to its current end in chunks, nothing is read
+    if the file does not exist
+    """
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return
+    with f:
+        f.seek(offset)
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            yield chunk
+
+
+# Connections to the API are reused between the jobs run by a worker process
+HTTP_POOL_MAXSIZE = 10
+_http_session = None
+_flask_app = None
+
+
+def http_session():
+    """
+    The requests session of the worker process, with a pool of connections
+    """
+    global _http_session
+    if _http_session is None:
+        _http_session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=HTTP_POOL_MAXSIZE)
+        _http_session.mount("http://", adapter)
+        _http_session.mount("https://", adapter)
+    return _http_session
+
+
+def flask_app():
+    """
+    The app of the worker process, which gives access to the database
+    """
+    global _flask_app
+    if _flask_app is None:
+        from . import create_app
+
+        _flask_app = create_app()
+    return _flask_app
+
+
+def update_job_directly(job_id, operation, *args):
+    """
+    Run one of the operations of analysisweb.api.services on a job
+
+    Parameters
+    ----------
+    job_id: int
+        the ID of the job
+    operation: str
+        the name of the operation, e.g. "start_job"
+    args:
+        the other arguments of the operation
+
+    Raises
+    ------
+    ResourceNotFoundException
+        if the job no longer exists
+    ResourceConflictException
+        if the job cannot be updated from its current state
+    """
+    from analysisweb_user.models import Job
+    from . import services
+    from .resources import ResourceNotFoundException
+
+    with flask_app().app_context():
+        job = Job.query.get(job_id)
+        if job is None:
+            raise ResourceNotFoundException("Job {} does not exist".format(job_id))
+        getattr(services, operation)(job, *args)
+
 
 @celery.task()
-def sympathy_job(inp_file, analysis_path, sympathy_exec, log_post_url):
+def sympathy_job(
+    inp_file,
+    analysis_path,
+    sympathy_exec,
+    log_post_url,
+    job_id=None,
+    direct=False,
+    timeout=None,
+    executor="process",
+):
     """
     Run a Sympathy for data job as a Celery task in the "background"
 
@@ -38,18 +329,121 @@ def sympathy_job(inp_file, analysis_path, sympathy_exec, log_post_url):
         the path to the executable that runs the analysis
     log_post_url: str
         the URL to the route where to log can be added
+    job_id: int
+        the ID of the job
+    direct: bool
+        record the start and the end of the job in the database instead of
+        posting the log, the log is posted if that fails
+    timeout: float
+        the wall-clock time in seconds after which the analysis is stopped
+    executor: str
+        "process" to start sympathy_exec for the analysis, or "pool" to run it
+        in a warm Sympathy process of the worker process
 
     Returns
     -------
     int:
-        the status code of the post of the log
-    """
-    output = subprocess.getoutput(
-        "bash {} {} {}".format(sympathy_exec, analysis_path, inp_file)
-    )
-    temp_path = tempfile.mkstemp()[1]
-    with open(temp_path, "w") as f:
-        f.write(log_template.render(lines=output.split("\n")))
-    r = requests.post(log_post_url, files={"log": open(temp_path, "rb")})
-    os.remove(temp_path)
+        the status code of the post of the log, or 200 if the job was finished
+        directly
+    """
+    from .resources import ResourceConflictException, ResourceNotFoundException
+
+    folder = os.path.dirname(inp_file)
+    cancel_path = os.path.join(folder, CANCEL_FILENAME)
+    if os.path.exists(cancel_path):
+        logger.info("Not running job %s: the job was cancelled", job_id)
+        return 409
+
+    direct = direct and job_id is not None
+    started_at = datetime.datetime.utcnow()
+    if direct:
+        try:
+            update_job_directly(job_id, "start_job", started_at)
+        except (ResourceNotFoundException, ResourceConflictException) as e:
+            # Deleted or cancelled before it started
+            logger.info("Not running job %s: %s", job_id, e)
+            return e.response_code
+        except Exception:
+            logger.exception("Could not record the start of job %s", job_id)
+
+    def record_worker(process):
+        # The analysis is the leader of a process group of its own
+        try:
+            update_job_directly(job_id, "record_worker", process.pid)
+        except Exception:
+            logger.exception("Could not record the worker of job %s", job_id)
+
+    on_start = record_worker if direct else None
+    log_path = os.path.join(folder, LOG_FILENAME)
+    status = None
+    try:
+        if executor == "pool":
+            from .pool import sympathy_pool
+
+            exit_code, reason = sympathy_pool().run(
+                analysis_path,
+                inp_file,
+                log_path,
+                timeout=timeout,
+                should_stop=lambda: os.path.exists(cancel_path),
+                on_start=on_start,
+            )
+        else:
+            exit_code, reason = run_logged(
+                ["bash", sympathy_exec, analysis_path, inp_file],
+                log_path,
+                timeout=timeout,
+                should_stop=lambda: os.path.exists(cancel_path),
+                on_start=on_start,
+            )
+        status = {"timeout": "TIMED_OUT", "cancelled": "CANCELLED"}.get(reason)
+    except OSError as e:
+        with open(log_path, "a") as log:
+            log.write("Could not run the analysis: {}\n".format(e))
+        # As a shell does for a command that cannot be run
+        exit_code = 127
+    # Rendered next to the final log, so that it is moved rather than copied
+    html_path = os.path.join(folder, "log.html.part")
+    render_log(log_path, html_path)
+
+    if direct:
+        try:
+            update_job_directly(
+                job_id, "finish_job", exit_code, html_path, started_at, status
+            )
+            return 200
+        except (ResourceNotFoundException, ResourceConflictException) as e:
+            logger.info("Not finishing job %s: %s", job_id, e)
+            os.remove(html_path)
+            return e.response_code
+        except Exception:
+            logger.exception("Could not finish job %s, posting the log", job_id)
+
+    data = {"exit_code": exit_code, "started_at": started_at.isoformat()}
+    if status is not None:
+        data["status"] = status
+    with open(html_path, "rb") as f:
+        r = http_session().post(log_post_url, data=data, files={"log": ("log.html", f)})
+    os.remove(html_path)
     return r.status_code
+
+
+@worker_process_init.connect
+def reap_on_process_init(**kwargs):
+    """
+    Reap the jobs of the lost worker processes on this host when a worker
+    process starts, e.g. the one replacing a process killed at the time limit
+    of its task, and send the jobs held as they could not be sent before
+    """
+    from . import services
+
+    try:
+        with flask_app().app_context():
+            services.reap_lost_jobs()
+    except Exception:
+        logger.exception("Could not reap the jobs of lost worker processes")
+    try:
+        with flask_app().app_context():
+            services.dispatch_held_jobs()
+    except Exception:
+        logger.exception("Could not send the held jobs")
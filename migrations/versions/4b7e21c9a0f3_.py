@@ -0,0 +1,54 @@
+"""add is_file to job_input
+
+Revision ID: 4b7e21c9a0f3
+Revises: dce8fa9f5dad
+Create Date: 2026-10-17 09:12:41.503318
+
+"""
+import os
+
+from alembic import op
+from flask import current_app
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b7e21c9a0f3'
+down_revision = 'dce8fa9f5dad'
+branch_labels = None
+depends_on = None
+
+
+job_input = sa.table(
+    'job_input',
+    sa.column('id', sa.Integer),
+    sa.column('value', sa.String),
+    sa.column('is_file', sa.Boolean),
+    sa.column('job_id', sa.Integer),
+)
+
+
+def upgrade():
+    op.add_column('job_input', sa.Column('is_file', sa.Boolean(), nullable=True))
+
+    # Backfill from the uploaded files, this is the last time we stat them
+    connection = op.get_bind()
+    job_folder = current_app.config['JOB_FILES_FOLDER']
+    file_ids = []
+    for id_, value, job_id in connection.execute(
+        sa.select([job_input.c.id, job_input.c.value, job_input.c.job_id])
+    ):
+        path = os.path.join(job_folder, str(job_id), 'input', value or '')
+        if value and os.path.isfile(path):
+            file_ids.append(id_)
+    connection.execute(job_input.update().values(is_file=False))
+    if file_ids:
+        connection.execute(
+            job_input.update()
+            .where(job_input.c.id.in_(file_ids))
+            .values(is_file=True)
+        )
+
+
+def downgrade():
+    op.drop_column('job_input', 'is_file')
@@ -0,0 +1,36 @@
+"""add version and updated_at to job, measurement and analysis
+
+Revision ID: a52c9e0d7b41
+Revises: 8f3a6d5e2c17
+Create Date: 2026-10-17 11:40:08.372215
+
+"""
+import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a52c9e0d7b41'
+down_revision = '8f3a6d5e2c17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    now = datetime.datetime.utcnow()
+    for table in ['analysis', 'job', 'measurement']:
+        op.add_column(table, sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=True))
+        op.execute(
+            sa.table(table, sa.column('updated_at', sa.DateTime))
+            .update()
+            .values(updated_at=now)
+        )
+
+
+def downgrade():
+    for table in ['analysis', 'job', 'measurement']:
+        op.drop_column(table, 'updated_at')
+        op.drop_column(table, 'version')
@@ -0,0 +1,4 @@
+"""
+A minimal user package for the tests, with measurement and analysis tables
+without metadata
+"""
@@ -0,0 +1,10 @@
+import os
+import tempfile
+
+
+class UserConfig(object):
+    UPLOAD_FOLDER = os.path.join(tempfile.mkdtemp(prefix="analysisweb-"), "uploads")
+    SQLALCHEMY_DATABASE_URI = "sqlite://"
+    CELERY_BROKER_URL = "memory://"
+    SERVER_URL = "http://localhost/"
+    SYMPATHY_EXEC = "sympathy.sh"
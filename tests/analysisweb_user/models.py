@@ -0,0 +1,24 @@
+from analysisweb.api import db
+from analysisweb.api.base_models import (  # noqa
+    AnalysisInput,
+    AnalysisOutput,
+    Job,
+    JobFigureOutput,
+    JobInput,
+    JobReport,
+    JobTableOutput,
+    MeasurementFile,
+)
+from analysisweb.api.mixin_models import (  # noqa
+    AnalysisMixin,
+    MeasurementMixin,
+    MetaDataException,
+)
+
+
+class Measurement(MeasurementMixin, db.Model):
+    pass
+
+
+class Analysis(AnalysisMixin, db.Model):
+    pass
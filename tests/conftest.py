@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+
+# The user package of the tests, which the app imports its models and config from
+sys.path.insert(0, os.path.dirname(__file__))
+
+from analysisweb.api import create_app, db  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app()
+    app.config["TESTING"] = True
+    # Fresh folders for every test, as the IDs of the rows start over
+    for key in [
+        "MEASUREMENT_FILES_FOLDER",
+        "ANALYSIS_FILES_FOLDER",
+        "JOB_FILES_FOLDER",
+        "BLOB_FOLDER",
+        "UPLOAD_TMP_FOLDER",
+    ]:
+        app.config[key] = str(tmp_path / os.path.basename(app.config[key]))
+        os.makedirs(app.config[key])
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,64 @@
+"""
+Helpers creating the rows that the tests need directly in the database
+"""
+import datetime
+import os
+
+from flask import current_app
+
+from analysisweb.api import db
+from analysisweb_user.models import (
+    Analysis,
+    AnalysisInput,
+    AnalysisOutput,
+    Job,
+    JobInput,
+    JobTableOutput,
+    Measurement,
+    MeasurementFile,
+)
+
+
+def add_analysis(inputs=(("x", "value"),), outputs=(("table", "table"),), **values):
+    analysis = Analysis(label="analysis", syx_file="flow.syx", **values)
+    analysis.input = [AnalysisInput(label=l, type=t) for l, t in inputs]
+    analysis.output = [AnalysisOutput(label=l, type=t) for l, t in outputs]
+    db.session.add(analysis)
+    db.session.commit()
+    return analysis
+
+
+def add_measurement(files=(), start=None, end=None):
+    measurement = Measurement(
+        label="measurement",
+        start_date=start or datetime.datetime(2020, 1, 1),
+        end_date=end or datetime.datetime(2020, 1, 2),
+    )
+    measurement.files = [MeasurementFile(label=l, path=p) for l, p in files]
+    db.session.add(measurement)
+    db.session.commit()
+    return measurement
+
+
+def add_job(analysis, measurement=None, status="QUEUED", inputs=("1",), **values):
+    job = Job(
+        label="job",
+        date=datetime.datetime.now(),
+        queued_at=datetime.datetime.utcnow(),
+        status=status,
+        priority="default",
+        analysis=analysis,
+        measurement=measurement,
+        **values
+    )
+    job.input = [
+        JobInput(label=i.label, value=v) for i, v in zip(analysis.input, inputs)
+    ]
+    job.table_output = [JobTableOutput(label="table", path="table.csv")]
+    db.session.add(job)
+    db.session.commit()
+    for folder in ["input", "output", "reports"]:
+        os.makedirs(
+            os.path.join(current_app.config["JOB_FILES_FOLDER"], str(job.id), folder)
+        )
+    return job
@@ -0,0 +1,32 @@
+import io
+import os
+import zipfile
+
+import pytest
+
+from analysisweb.api.services import job_folder
+from helpers import add_analysis, add_job
+
+
+@pytest.fixture
+def job(app):
+    job = add_job(add_analysis(), status="SUCCEEDED", task_id="task")
+    with open(os.path.join(job_folder(job.id), "output", "table.csv"), "w") as f:
+        f.write("a,b\n1,2\n")
+    return job
+
+
+@pytest.mark.parametrize("compress", ["0", "1"])
+def test_archive_of_a_job(client, job, compress):
+    response = client.get("/job/{}/archive?compress={}".format(job.id, compress))
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/zip"
+    archive = zipfile.ZipFile(io.BytesIO(response.data))
+    name = "job-{}/output/table.csv".format(job.id)
+    assert archive.namelist() == [name]
+    assert archive.read(name) == b"a,b\n1,2\n"
+
+
+def test_archive_of_a_missing_job(client):
+    assert client.get("/job/1/archive").status_code == 404
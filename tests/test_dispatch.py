@@ -0,0 +1,40 @@
+import pytest
+
+from analysisweb.api import celery
+from analysisweb.api.services import dispatch_held_jobs, dispatch_jobs
+from analysisweb_user.models import Job
+from helpers import add_analysis, add_job
+
+
+@pytest.fixture
+def job(app):
+    return add_job(add_analysis())
+
+
+def test_job_that_cannot_be_sent_is_held_again(job, monkeypatch):
+    def producer_or_acquire():
+        raise ConnectionError("broker unreachable")
+
+    monkeypatch.setattr(celery, "producer_or_acquire", producer_or_acquire)
+
+    assert dispatch_jobs(job) == 0
+    assert job.status == "QUEUED"
+    assert job.task_id is None
+
+
+def test_dispatch_held_jobs(job):
+    other = add_job(add_analysis())
+
+    assert dispatch_held_jobs() == 2
+    assert job.task_id is not None
+    assert other.task_id is not None
+    assert dispatch_held_jobs() == 0
+
+
+def test_dispatch_jobs_command(app, job):
+    job_id = job.id
+
+    result = app.test_cli_runner().invoke(args=["dispatch-jobs"])
+
+    assert result.output == "Sent 1 held jobs\n"
+    assert Job.query.get(job_id).task_id is not None
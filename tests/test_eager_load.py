@@ -0,0 +1,47 @@
+import pytest
+from sqlalchemy import event
+
+from analysisweb.api import db
+from helpers import add_analysis, add_job, add_measurement
+
+
+class QueryCounter(object):
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._count)
+        return self
+
+    def __exit__(self, *args):
+        event.remove(self.engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def count_queries(client, url):
+    # Loaded again by the request, as they would be in a new session
+    db.session.expire_all()
+    with QueryCounter(db.engine) as counter:
+        response = client.get(url)
+    assert response.status_code == 200
+    return counter.count, response.get_json()
+
+
+@pytest.mark.parametrize("url", ["/jobs", "/measurements", "/analyses"])
+def test_list_query_count_does_not_grow_with_the_items(client, url):
+    analysis = add_analysis()
+    measurement = add_measurement(files=[("data", "data.csv")])
+    add_job(analysis, measurement)
+    one, items = count_queries(client, url)
+    assert len(items) == 1
+
+    for _ in range(4):
+        analysis = add_analysis()
+        measurement = add_measurement(files=[("data", "data.csv")])
+        add_job(analysis, measurement)
+    many, items = count_queries(client, url)
+    assert len(items) == 5
+    assert many == one
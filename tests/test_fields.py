@@ -0,0 +1,19 @@
+import pytest
+
+from helpers import add_analysis, add_job
+
+
+@pytest.mark.parametrize("fields", ["", ",", " "])
+def test_empty_fields_are_invalid(client, fields):
+    add_job(add_analysis())
+
+    response = client.get("/jobs?fields=" + fields)
+    assert response.status_code == 400
+
+
+def test_fields_select_the_returned_fields(client):
+    job = add_job(add_analysis())
+
+    response = client.get("/jobs?fields=id,status")
+    assert response.status_code == 200
+    assert response.get_json() == [{"id": job.id, "status": "QUEUED"}]
@@ -0,0 +1,93 @@
+import gzip
+import os
+
+import pytest
+from werkzeug.exceptions import NotFound
+
+from analysisweb.api.files import resolve_path
+
+
+@pytest.fixture
+def job_files(app):
+    folder = app.config["JOB_FILES_FOLDER"]
+    for job_id in ["1", "2"]:
+        os.makedirs(os.path.join(folder, job_id, "output"))
+        for name in ["inp.json", "log.html", os.path.join("output", "table.csv")]:
+            with open(os.path.join(folder, job_id, name), "w") as f:
+                f.write(name)
+    return folder
+
+
+@pytest.mark.parametrize(
+    "filename, expected",
+    [
+        ("1/output/table.csv", "1/output/table.csv"),
+        ("1/output/./table.csv", "1/output/table.csv"),
+        ("1/log.html", "1/log.html"),
+        ("1/output/../../2/output/table.csv", "2/output/table.csv"),
+    ],
+)
+def test_resolve_path_of_job_files(app, job_files, filename, expected):
+    with app.test_request_context():
+        folder, filename, path = resolve_path("job", filename)
+    assert folder == job_files
+    assert filename == expected
+    assert path == os.path.join(job_files, *expected.split("/"))
+
+
+@pytest.mark.parametrize(
+    "kind, filename",
+    [
+        ("job", "1/inp.json"),
+        ("job", "1/output/../inp.json"),
+        ("job", "1/output/../../2/inp.json"),
+        ("job", "1/output/../../../job/2/inp.json"),
+        ("job", "1/output"),
+        ("job", "1/output/missing.csv"),
+        ("measurement", "../job/1/inp.json"),
+        ("measurement", "/etc/passwd"),
+        ("measurement", "."),
+        ("unknown", "1/output/table.csv"),
+    ],
+)
+def test_resolve_path_rejects_paths_outside_of_the_allowed_files(
+    app, job_files, kind, filename
+):
+    with app.test_request_context(), pytest.raises(NotFound):
+        resolve_path(kind, filename)
+
+
+def test_download_of_a_job_file(client, job_files):
+    response = client.get("/files/job/1/output/table.csv")
+    assert response.status_code == 200
+    assert response.data == b"output/table.csv"
+    response.close()
+
+    response = client.get("/files/job/1/output/../inp.json")
+    assert response.status_code == 404
+
+
+@pytest.fixture
+def compressed_output(job_files):
+    path = os.path.join(job_files, "1", "output", "table.csv")
+    with open(path, "rb") as f, gzip.open(path + ".gz", "wb") as dst:
+        dst.write(f.read())
+    os.remove(path)
+
+
+def test_accel_redirect_to_a_compressed_file(app, client, compressed_output):
+    app.config["FILES_ACCEL_REDIRECT_PREFIX"] = "/protected/"
+
+    response = client.get(
+        "/files/job/1/output/table.csv", headers={"Accept-Encoding": "gzip"}
+    )
+    assert (
+        response.headers["X-Accel-Redirect"] == "/protected/job/1/output/table.csv.gz"
+    )
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Content-Type"] == "text/csv"
+
+    response = client.get("/files/job/1/output/table.csv")
+    assert "X-Accel-Redirect" not in response.headers
+    assert "Content-Encoding" not in response.headers
+    assert response.data == b"output/table.csv"
@@ -0,0 +1,114 @@
+import datetime
+
+import pytest
+
+from analysisweb.api import db
+from analysisweb.api.base_models import Campaign
+from helpers import add_analysis, add_job, add_measurement
+
+
+@pytest.mark.parametrize("analysis_id", [None, [1], {"id": 1}, "one"])
+def test_campaign_with_invalid_analysis_id(client, analysis_id):
+    response = client.post(
+        "/campaigns",
+        json={
+            "label": "campaign",
+            "analysis": analysis_id,
+            "measurements": {},
+            "input": ["1"],
+        },
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("label", [None, {"x": 1}, 1])
+def test_campaign_with_invalid_label(client, label):
+    analysis = add_analysis()
+    response = client.post(
+        "/campaigns",
+        json={
+            "label": label,
+            "analysis": analysis.id,
+            "measurements": {},
+            "input": ["1"],
+        },
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("analysis_id", [None, [1], {"id": 1}, "one"])
+def test_pipeline_with_invalid_analysis_id(client, analysis_id):
+    response = client.post(
+        "/pipelines",
+        json={
+            "label": "pipeline",
+            "stages": [{"label": "a", "analysis": analysis_id, "input": ["1"]}],
+        },
+    )
+    assert response.status_code == 400
+
+
+def test_campaign_runs_analysis_over_selected_measurements(app, client):
+    app.config["JOB_MAX_CONCURRENT_PER_ANALYSIS"] = 0
+    analysis = add_analysis()
+    ids = [add_measurement().id for _ in range(3)]
+
+    response = client.post(
+        "/campaigns",
+        json={
+            "label": "campaign",
+            "analysis": analysis.id,
+            "measurements": {"ids": ids[:2]},
+            "input": ["{measurement_id}"],
+        },
+    )
+    assert response.status_code == 202
+    assert response.get_json()["total"] == 2
+
+    response = client.get("/campaign/{}".format(response.get_json()["id"]))
+    assert response.status_code == 200
+    campaign = response.get_json()
+    assert campaign["status"] == "RUNNING"
+    assert campaign["total"] == 2
+    assert len(campaign["jobs"]) == 2
+
+
+@pytest.mark.parametrize("ids", ["12", 12, {"id": 12}])
+def test_campaign_measurement_ids_must_be_a_list(client, ids):
+    analysis = add_analysis()
+    add_measurement()
+
+    response = client.post(
+        "/campaigns",
+        json={
+            "label": "campaign",
+            "analysis": analysis.id,
+            "measurements": {"ids": ids},
+            "input": ["1"],
+        },
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize(
+    "status, code", [("QUEUED", 405), ("RUNNING", 405), ("CANCELLED", 200)]
+)
+def test_delete_job_of_campaign(client, status, code):
+    analysis = add_analysis()
+    campaign = Campaign(
+        label="campaign",
+        date=datetime.datetime.now(),
+        status="RUNNING",
+        total=1,
+        succeeded=0,
+        failed=0,
+        cancelled=0,
+        analysis_id=analysis.id,
+    )
+    db.session.add(campaign)
+    db.session.commit()
+    job = add_job(analysis, status=status, task_id="task", campaign_id=campaign.id)
+
+    response = client.delete("/job/{}".format(job.id))
+
+    assert response.status_code == code
@@ -0,0 +1,52 @@
+import io
+import os
+
+import pytest
+
+from analysisweb.api import db
+from analysisweb.api.services import job_folder
+from analysisweb_user.models import Job, JobTableOutput
+from helpers import add_analysis, add_job, add_measurement
+
+
+@pytest.fixture
+def job(app):
+    return add_job(add_analysis(), add_measurement(), status="SUCCEEDED")
+
+
+@pytest.mark.parametrize(
+    "url, attribute",
+    [
+        ("/job/{}", "id"),
+        ("/measurement/{}", "measurement_id"),
+        ("/analysis/{}", "analysis_id"),
+    ],
+)
+def test_get_an_item(client, job, url, attribute):
+    item_id = getattr(job, attribute)
+
+    response = client.get(url.format(item_id))
+
+    assert response.status_code == 200
+    assert response.get_json()["id"] == item_id
+    assert client.get(url.format(item_id + 1)).status_code == 404
+
+
+def test_delete_a_job(client, job):
+    job_id = job.id
+
+    assert client.delete("/job/{}".format(job_id)).status_code == 200
+    assert Job.query.get(job_id) is None
+
+
+def test_add_the_output_of_a_job(app, client, job):
+    app.config["COMPRESS_OUTPUTS"] = False
+    JobTableOutput.query.delete()
+    db.session.commit()
+
+    data = {"table": (io.BytesIO(b"a,b\n"), "result.csv")}
+    response = client.post("/job/{}/output".format(job.id), data=data)
+
+    assert response.status_code == 200
+    with open(os.path.join(job_folder(job.id), "output", "result.csv"), "rb") as f:
+        assert f.read() == b"a,b\n"
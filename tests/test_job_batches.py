@@ -0,0 +1,29 @@
+import pytest
+
+from analysisweb_user.models import Job
+from helpers import add_analysis
+
+
+@pytest.fixture
+def analysis(app):
+    return add_analysis(inputs=[("x", "value")])
+
+
+def test_add_jobs_in_a_batch(client, analysis):
+    jobs = [{"label": "job {}".format(i), "input": [i]} for i in range(3)]
+    response = client.post("/jobs/batch", json={"analysis": analysis.id, "jobs": jobs})
+
+    assert response.status_code == 202
+    ids = response.get_json()["ids"]
+    added = [Job.query.get(job_id) for job_id in ids]
+    assert [job.label for job in added] == ["job 0", "job 1", "job 2"]
+    assert [[i.value for i in job.input] for job in added] == [["0"], ["1"], ["2"]]
+
+
+@pytest.mark.parametrize("label", [None, {"x": 1}, ["label"], 1])
+def test_label_of_a_job_in_a_batch_must_be_a_string(client, analysis, label):
+    jobs = [{"label": label, "input": ["1"]}]
+    response = client.post("/jobs/batch", json={"analysis": analysis.id, "jobs": jobs})
+
+    assert response.status_code == 400
+    assert Job.query.count() == 0
@@ -0,0 +1,49 @@
+import os
+
+import pytest
+
+from analysisweb.api import utils
+from analysisweb.api.services import job_folder
+from helpers import add_analysis, add_job
+
+LOG = b"".join(b"line %d\n" % i for i in range(10))
+
+
+@pytest.fixture
+def job(app):
+    job = add_job(add_analysis(), status="SUCCEEDED", task_id="task")
+    with open(os.path.join(job_folder(job.id), utils.LOG_FILENAME), "wb") as f:
+        f.write(LOG)
+    return job
+
+
+def test_log_of_a_job(client, job):
+    response = client.get("/job/{}/log".format(job.id))
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    assert response.data == LOG
+
+
+def test_tail_of_the_log_of_a_job(client, job):
+    response = client.get("/job/{}/log?tail=2".format(job.id))
+
+    assert response.status_code == 200
+    assert response.data == b"line 8\nline 9\n"
+
+
+def test_follow_the_log_of_a_finished_job(client, job):
+    response = client.get("/job/{}/log?follow=1&tail=1".format(job.id))
+
+    assert response.status_code == 200
+    assert response.data == b"line 9\n"
+
+
+def test_log_of_a_job_without_a_log(client, job):
+    os.remove(os.path.join(job_folder(job.id), utils.LOG_FILENAME))
+
+    assert client.get("/job/{}/log".format(job.id)).status_code == 404
+
+
+def test_log_of_a_missing_job(client, job):
+    assert client.get("/job/{}/log".format(job.id + 1)).status_code == 404
@@ -0,0 +1,179 @@
+import io
+import os
+import stat
+
+import pytest
+
+from analysisweb.api import db, utils
+from analysisweb.api.base_models import JOB_TRANSITIONS
+from analysisweb.api.resources import ResourceConflictException
+from analysisweb.api.resources.jobs import JobLogResource
+from analysisweb.api.services import (
+    cancel_job,
+    finish_job,
+    job_folder,
+    transition_job,
+)
+from analysisweb.api.uploads import UMASK
+from helpers import add_analysis, add_job
+
+TRANSITIONS = [
+    (source, target, target in targets)
+    for source, targets in JOB_TRANSITIONS.items()
+    for target in JOB_TRANSITIONS
+]
+
+
+@pytest.fixture
+def analysis(app):
+    return add_analysis()
+
+
+@pytest.mark.parametrize("source, target, allowed", TRANSITIONS)
+def test_transition_job(analysis, source, target, allowed):
+    job = add_job(analysis, status=source, task_id="task")
+    version = job.version
+
+    if allowed:
+        transition_job(job, target)
+        assert job.status == target
+        assert job.version == version + 1
+    else:
+        with pytest.raises(ResourceConflictException):
+            transition_job(job, target)
+        assert job.status == source
+        assert job.version == version
+
+
+@pytest.mark.parametrize("exit_code, status", [(0, "SUCCEEDED"), (1, "FAILED")])
+def test_finish_queued_job(analysis, exit_code, status):
+    job = add_job(analysis, status="QUEUED", task_id="task")
+
+    finish_job(job, exit_code)
+
+    assert job.status == status
+    assert job.exit_code == exit_code
+    assert job.started_at is not None
+    assert job.finished_at is not None
+
+
+def test_finish_job_with_status(analysis):
+    job = add_job(analysis, status="RUNNING", task_id="task")
+
+    finish_job(job, -9, status="TIMED_OUT")
+
+    assert job.status == "TIMED_OUT"
+
+
+def test_finish_cancelled_job_keeps_it_cancelled(analysis, tmp_path):
+    job = add_job(analysis, status="CANCELLED", task_id="task")
+    log_path = str(tmp_path / "log.html")
+    open(log_path, "w").close()
+
+    finish_job(job, 1, log_path=log_path)
+
+    assert job.status == "CANCELLED"
+    assert job.exit_code == 1
+    assert job.log == "log.html"
+    assert os.path.isfile(os.path.join(job_folder(job.id), "log.html"))
+
+
+def test_finish_finished_job_is_a_conflict(analysis):
+    job = add_job(analysis, status="SUCCEEDED", task_id="task")
+
+    with pytest.raises(ResourceConflictException):
+        finish_job(job, 1)
+    assert job.status == "SUCCEEDED"
+
+
+def test_finish_job_is_rolled_back_if_the_log_cannot_be_moved(analysis, tmp_path):
+    job = add_job(analysis, status="RUNNING", task_id="task")
+
+    with pytest.raises(FileNotFoundError):
+        finish_job(job, 0, log_path=str(tmp_path / "missing.html"))
+
+    db.session.refresh(job)
+    assert job.status == "RUNNING"
+    assert job.log is None
+
+
+def test_finish_job_puts_the_log_back_if_the_commit_fails(
+    analysis, tmp_path, monkeypatch
+):
+    job = add_job(analysis, status="RUNNING", task_id="task")
+    log_path = str(tmp_path / "log.html")
+    open(log_path, "w").close()
+
+    def commit():
+        raise RuntimeError("commit failed")
+
+    with monkeypatch.context() as m:
+        m.setattr(db.session, "commit", commit)
+        with pytest.raises(RuntimeError):
+            finish_job(job, 0, log_path=log_path)
+
+    db.session.refresh(job)
+    assert job.status == "RUNNING"
+    assert os.path.isfile(log_path)
+    assert not os.path.exists(os.path.join(job_folder(job.id), "log.html"))
+
+
+@pytest.mark.parametrize("status", ["WAITING", "QUEUED", "RUNNING"])
+def test_cancel_active_job(analysis, status):
+    job = add_job(analysis, status=status)
+
+    cancel_job(job)
+
+    assert job.status == "CANCELLED"
+    assert job.finished_at is not None
+    assert os.path.isfile(os.path.join(job_folder(job.id), utils.CANCEL_FILENAME))
+
+
+@pytest.mark.parametrize("status", ["SUCCEEDED", "FAILED", "TIMED_OUT", "CANCELLED"])
+def test_cancel_finished_job_is_a_conflict(analysis, status):
+    job = add_job(analysis, status=status)
+
+    with pytest.raises(ResourceConflictException):
+        cancel_job(job)
+    assert job.status == status
+    assert not os.path.exists(os.path.join(job_folder(job.id), utils.CANCEL_FILENAME))
+
+
+def test_posted_log_has_the_mode_of_files_created_by_open(app, analysis):
+    job = add_job(analysis, status="RUNNING", task_id="task")
+
+    data = {"exit_code": "0", "log": (io.BytesIO(b"<html></html>"), "log.html")}
+    with app.test_request_context(method="POST", data=data):
+        JobLogResource()._add_job(job)
+
+    assert job.status == "SUCCEEDED"
+    path = os.path.join(job_folder(job.id), "log.html")
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o666 & ~UMASK
+
+
+def test_post_the_log_of_a_job(client, analysis):
+    job = add_job(analysis, status="RUNNING", task_id="task")
+
+    data = {"exit_code": "1", "log": (io.BytesIO(b"<html></html>"), "log.html")}
+    response = client.post("/job/{}/log".format(job.id), data=data)
+
+    assert response.status_code == 200
+    assert response.get_json()["status"] == "FAILED"
+    with open(os.path.join(job_folder(job.id), "log.html"), "rb") as f:
+        assert f.read() == b"<html></html>"
+
+
+def test_cancel_a_job(client, analysis):
+    job = add_job(analysis, status="QUEUED")
+
+    response = client.post("/job/{}/cancel".format(job.id))
+
+    assert response.status_code == 200
+    assert response.get_json()["status"] == "CANCELLED"
+    assert os.path.isfile(os.path.join(job_folder(job.id), utils.CANCEL_FILENAME))
+
+
+def test_cancel_a_finished_job_is_a_conflict(client, analysis):
+    job = add_job(analysis, status="SUCCEEDED")
+
+    assert client.post("/job/{}/cancel".format(job.id)).status_code == 409
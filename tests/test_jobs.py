@@ -0,0 +1,27 @@
+import datetime
+
+import pytest
+
+from helpers import add_analysis, add_job
+
+
+@pytest.mark.parametrize(
+    "name", ["date_from", "date_to", "finished_from", "finished_to"]
+)
+@pytest.mark.parametrize("value", ["99999999999999999999", "not a date"])
+def test_invalid_date_filter(client, name, value):
+    response = client.get("/jobs?{}={}".format(name, value))
+    assert response.status_code == 400
+
+
+def test_date_filter_with_time_zone_is_compared_in_utc(client):
+    add_job(
+        add_analysis(),
+        status="SUCCEEDED",
+        finished_at=datetime.datetime(2020, 1, 1, 10),
+    )
+
+    response = client.get("/jobs?finished_from=2020-01-01T11:00:00%2B02:00")
+    assert len(response.get_json()) == 1
+    response = client.get("/jobs?finished_from=2020-01-01T11:00:00")
+    assert response.get_json() == []
@@ -0,0 +1,30 @@
+import datetime
+
+from helpers import add_measurement
+
+
+def test_time_window_mixing_time_zones_is_compared_in_utc(client):
+    add_measurement(
+        start=datetime.datetime(2020, 1, 1, 10), end=datetime.datetime(2020, 1, 1, 12)
+    )
+    response = client.get(
+        "/measurements?within=2020-01-01T10:00:00%2B02:00,2020-01-01T12:00:00"
+    )
+    assert response.status_code == 200
+    assert len(response.get_json()) == 1
+
+    response = client.get(
+        "/measurements?within=2020-01-01T10:00:00-02:00,2020-01-01T13:00:00"
+    )
+    assert response.status_code == 200
+    assert response.get_json() == []
+
+
+def test_time_window_with_end_before_start_is_invalid(client):
+    response = client.get("/measurements?overlaps=2020-01-02,2020-01-01")
+    assert response.status_code == 400
+
+
+def test_time_window_with_overflowing_date_is_invalid(client):
+    response = client.get("/measurements?overlaps=99999999999999999999,2020-01-01")
+    assert response.status_code == 400
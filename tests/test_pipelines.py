@@ -0,0 +1,124 @@
+import io
+import os
+import stat
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from analysisweb.api import db
+from analysisweb.api.services import finish_job, job_folder
+from analysisweb.api.uploads import UMASK, save_compressed, save_upload
+from analysisweb_user.models import Job, JobTableOutput
+from helpers import add_analysis
+
+
+@pytest.fixture
+def pipeline(app, client):
+    app.config["JOB_MAX_CONCURRENT_PER_ANALYSIS"] = 0
+    app.config["COMPRESS_OUTPUTS"] = False
+    upstream = add_analysis(inputs=[("x", "value")])
+    downstream = add_analysis(inputs=[("data", "file")])
+    response = client.post(
+        "/pipelines",
+        json={
+            "label": "pipeline",
+            "stages": [
+                {"label": "a", "analysis": upstream.id, "input": ["1"]},
+                {"label": "b", "analysis": downstream.id, "input": ["$job:a:table"]},
+            ],
+        },
+    )
+    assert response.status_code == 202
+    jobs = response.get_json()["jobs"]
+    return Job.query.get(jobs["a"]), Job.query.get(jobs["b"])
+
+
+def test_downstream_input_is_not_changed_with_the_upstream_output(pipeline):
+    upstream, downstream = pipeline
+    output = os.path.join(job_folder(upstream.id), "output", "table.csv")
+    save_upload(FileStorage(io.BytesIO(b"table")), output)
+    db.session.add(JobTableOutput(label="table", path="table.csv", job=upstream))
+    db.session.commit()
+    finish_job(upstream, 0)
+    assert downstream.status == "QUEUED"
+
+    save_upload(FileStorage(io.BytesIO(b"changed")), output)
+
+    path = os.path.join(job_folder(downstream.id), "input", downstream.input[0].value)
+    with open(path) as f:
+        assert f.read() == "table"
+
+
+def test_waiting_job_of_a_pipeline_cannot_be_deleted(client, pipeline):
+    _, downstream = pipeline
+    assert downstream.status == "WAITING"
+
+    response = client.delete("/job/{}".format(downstream.id))
+
+    assert response.status_code == 405
+
+
+def test_get_a_pipeline(client, pipeline):
+    upstream, downstream = pipeline
+
+    response = client.get("/pipeline/{}".format(upstream.pipeline_id))
+
+    assert response.status_code == 200
+    assert response.get_json()["status"] == "RUNNING"
+    assert response.get_json()["total"] == 2
+    assert (
+        client.get("/pipeline/{}".format(upstream.pipeline_id + 1)).status_code == 404
+    )
+
+
+def test_failed_job_cancels_a_long_pipeline(app, client):
+    app.config["JOB_MAX_CONCURRENT_PER_ANALYSIS"] = 0
+    analysis = add_analysis()
+    stages = [{"label": "0", "analysis": analysis.id, "input": ["1"]}]
+    for i in range(1, 500):
+        stages.append(
+            {
+                "label": str(i),
+                "analysis": analysis.id,
+                "input": ["1"],
+                "after": [str(i - 1)],
+            }
+        )
+    response = client.post("/pipelines", json={"label": "pipeline", "stages": stages})
+    assert response.status_code == 202
+    pipeline_id = response.get_json()["id"]
+
+    finish_job(Job.query.get(response.get_json()["jobs"]["0"]), 1)
+
+    statuses = db.session.query(Job.status).filter(Job.pipeline_id == pipeline_id)
+    assert sorted(status for status, in statuses) == ["CANCELLED"] * 499 + ["FAILED"]
+    pipeline = client.get("/pipeline/{}".format(pipeline_id)).get_json()
+    assert pipeline["status"] == "COMPLETED"
+    assert (pipeline["failed"], pipeline["cancelled"]) == (1, 499)
+
+
+@pytest.mark.parametrize("label", [None, {"x": 1}, 1])
+def test_pipeline_with_invalid_label(client, label):
+    analysis = add_analysis()
+    response = client.post(
+        "/pipelines",
+        json={
+            "label": label,
+            "stages": [{"label": "a", "analysis": analysis.id, "input": ["1"]}],
+        },
+    )
+    assert response.status_code == 400
+
+
+def test_decompressed_input_has_the_mode_of_files_created_by_open(pipeline):
+    upstream, downstream = pipeline
+    output = os.path.join(job_folder(upstream.id), "output", "table.csv")
+    save_compressed(FileStorage(io.BytesIO(b"table")), output)
+    db.session.add(JobTableOutput(label="table", path="table.csv", job=upstream))
+    db.session.commit()
+    finish_job(upstream, 0)
+
+    path = os.path.join(job_folder(downstream.id), "input", downstream.input[0].value)
+    with open(path) as f:
+        assert f.read() == "table"
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o666 & ~UMASK
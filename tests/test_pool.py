@@ -0,0 +1,50 @@
+import os
+import sys
+import textwrap
+
+import pytest
+
+from analysisweb.api.pool import WarmProcess
+
+# Stands in for Sympathy, printing other output around its answers
+SERVER = textwrap.dedent("""
+    import json
+    import sys
+
+    for line in sys.stdin:
+        request = json.loads(line)
+        print("Loading", request["analysis"])
+        print(json.dumps({"progress": 1}))
+        with open(request["log"], "a") as log:
+            log.write("ran\\n")
+        print(json.dumps({"exit_code": int(request["analysis"])}), flush=True)
+    """)
+
+
+@pytest.fixture
+def wrapped_process(tmp_path):
+    script = tmp_path / "server.py"
+    script.write_text(SERVER)
+    wrapper = tmp_path / "server.sh"
+    # Not exec'ed, so the wrapper is the leader of the process group
+    wrapper.write_text('"{}" "{}"\n'.format(sys.executable, script))
+    process = WarmProcess(["bash", str(wrapper)])
+    yield process
+    process.stop()
+
+
+def test_run_skips_other_output(wrapped_process, tmp_path):
+    log_path = str(tmp_path / "log.txt")
+    assert wrapped_process.run("3", "inp.json", log_path) == (3, None)
+    assert wrapped_process.run("0", "inp.json", log_path) == (0, None)
+    with open(log_path) as f:
+        assert f.read() == "ran\n"
+
+
+def test_rss_includes_the_processes_started_by_a_wrapper(wrapped_process, tmp_path):
+    wrapped_process.run("0", "inp.json", str(tmp_path / "log.txt"))
+    with open("/proc/{}/statm".format(wrapped_process.process.pid)) as f:
+        wrapper_rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+    # The Python process uses more memory than the shell
+    assert wrapped_process.rss() > wrapper_rss * 2
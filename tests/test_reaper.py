@@ -0,0 +1,78 @@
+import datetime
+import os
+import socket
+import stat
+import subprocess
+import sys
+
+import pytest
+
+from analysisweb.api.services import job_folder, reap_lost_jobs
+from analysisweb.api.uploads import UMASK
+from helpers import add_analysis, add_job
+
+
+@pytest.fixture
+def lost_pid():
+    process = subprocess.Popen([sys.executable, "-c", ""])
+    process.wait()
+    return process.pid
+
+
+@pytest.fixture
+def analysis_process():
+    process = subprocess.Popen(
+        [sys.executable, "-c", "import time; time.sleep(30)"], start_new_session=True
+    )
+    yield process
+    if process.poll() is None:
+        process.kill()
+        process.wait()
+
+
+def add_running_job(analysis, worker_pid, pgid=None, started_at=None):
+    return add_job(
+        analysis,
+        status="RUNNING",
+        task_id="task",
+        started_at=started_at or datetime.datetime.utcnow(),
+        worker_host=socket.gethostname(),
+        worker_pid=worker_pid,
+        pgid=pgid,
+    )
+
+
+def test_reap_job_of_lost_worker(app, lost_pid, analysis_process):
+    job = add_running_job(add_analysis(), lost_pid, analysis_process.pid)
+
+    reap_lost_jobs()
+
+    assert analysis_process.wait(5) == -9
+    assert job.status == "FAILED"
+    assert job.finished_at is not None
+    assert job.log == "log.html"
+    path = os.path.join(job_folder(job.id), "log.html")
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o666 & ~UMASK
+
+
+def test_reap_job_of_worker_killed_at_the_time_limit(app, lost_pid):
+    app.config["JOB_TIMEOUT"] = 10
+    started_at = datetime.datetime.utcnow() - datetime.timedelta(hours=1)
+    job = add_running_job(add_analysis(), lost_pid, started_at=started_at)
+
+    reap_lost_jobs()
+
+    assert job.status == "TIMED_OUT"
+    with open(
+        os.path.join(app.config["JOB_FILES_FOLDER"], str(job.id), "log.txt")
+    ) as f:
+        assert "time limit" in f.read()
+
+
+def test_job_of_live_worker_is_not_reaped(app, analysis_process):
+    job = add_running_job(add_analysis(), os.getpid(), analysis_process.pid)
+
+    reap_lost_jobs()
+
+    assert job.status == "RUNNING"
+    assert analysis_process.poll() is None
@@ -0,0 +1,55 @@
+import io
+import os
+
+import pytest
+
+from analysisweb.api.services import dispatch_jobs, job_folder
+from analysisweb_user.models import JobReport
+from helpers import add_analysis, add_job
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+@pytest.fixture
+def reused(app):
+    app.config["JOB_RESULT_CACHE"] = True
+    analysis = add_analysis()
+    source = add_job(
+        analysis,
+        status="SUCCEEDED",
+        task_id="task",
+        fingerprint="f",
+        reports=[JobReport(path="report")],
+    )
+    for name, content in [("output/table.csv", "table"), ("reports/report", "old")]:
+        with open(os.path.join(job_folder(source.id), name), "w") as f:
+            f.write(content)
+    jobs = [add_job(analysis, fingerprint="f") for _ in range(2)]
+    dispatch_jobs(jobs[0])
+    return source, jobs
+
+
+def test_held_jobs_reuse_the_result_of_an_identical_job(reused):
+    source, jobs = reused
+    for job in jobs:
+        assert job.status == "SUCCEEDED"
+        path = os.path.join(job_folder(job.id), "output", "table.csv")
+        assert read(path) == "table"
+        assert os.path.samefile(
+            path, os.path.join(job_folder(source.id), "output", "table.csv")
+        )
+
+
+def test_report_of_a_reusing_job_does_not_change_the_shared_file(client, reused):
+    source, (job, _) = reused
+
+    data = {"report": (io.BytesIO(b"new"), "report")}
+    response = client.post("/job/{}/report".format(job.id), data=data)
+
+    assert response.status_code == 200
+
+    assert read(os.path.join(job_folder(job.id), "reports", "report")) == "new"
+    assert read(os.path.join(job_folder(source.id), "reports", "report")) == "old"
@@ -0,0 +1,49 @@
+import io
+import os
+import stat
+
+from werkzeug.datastructures import FileStorage
+
+from analysisweb.api.storage import add_blob, blob_path, release_blobs, store_file
+from analysisweb.api.uploads import UMASK
+
+
+def write(path, content):
+    with open(path, "w") as f:
+        f.write(content)
+
+
+def test_adding_a_blob_replaces_an_existing_file(app, tmp_path):
+    path = str(tmp_path / "data.csv")
+    write(path, "old")
+    src = str(tmp_path / "upload")
+    write(src, "new")
+
+    add_blob(src, "ab" * 32, path)
+
+    with open(path) as f:
+        assert f.read() == "new"
+    assert not os.path.exists(src)
+    assert os.stat(blob_path("ab" * 32)).st_nlink == 2
+    assert not [name for name in os.listdir(str(tmp_path)) if name.endswith(".link")]
+
+
+def test_replaced_link_releases_its_blob(app, tmp_path):
+    path = str(tmp_path / "data.csv")
+    for sha256, content in [("ab" * 32, "old"), ("cd" * 32, "new")]:
+        src = str(tmp_path / "upload")
+        write(src, content)
+        add_blob(src, sha256, path)
+
+    release_blobs(["ab" * 32, "cd" * 32])
+
+    assert not os.path.exists(blob_path("ab" * 32))
+    assert os.path.exists(blob_path("cd" * 32))
+
+
+def test_stored_file_has_the_mode_of_files_created_by_open(app, tmp_path):
+    path = str(tmp_path / "data.csv")
+
+    store_file(FileStorage(io.BytesIO(b"data")), path)
+
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o666 & ~UMASK
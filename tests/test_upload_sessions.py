@@ -0,0 +1,79 @@
+import hashlib
+import os
+
+from analysisweb_user.models import Measurement
+
+DATA = b"time,value\n0,1\n1,2\n"
+
+
+def start_session(client, **form):
+    form = dict(
+        filename="data.csv",
+        size=str(len(DATA)),
+        sha256=hashlib.sha256(DATA).hexdigest(),
+        **form
+    )
+    response = client.post("/uploads", data=form)
+    assert response.status_code == 201
+    return response.get_json()["id"]
+
+
+def put_chunk(client, session_id, offset, data):
+    return client.put(
+        "/upload/{}?offset={}".format(session_id, offset),
+        data=data,
+        content_type="application/octet-stream",
+    )
+
+
+def test_upload_chunks_and_finalize(app, client):
+    session_id = start_session(client)
+
+    # Received in any order
+    response = put_chunk(client, session_id, 10, DATA[10:])
+    assert response.status_code == 200
+    assert response.get_json()["complete"] is False
+    assert put_chunk(client, session_id, 0, DATA[:10]).status_code == 200
+
+    response = client.get("/upload/{}".format(session_id))
+    assert response.status_code == 200
+    assert response.get_json()["received"] == [[0, len(DATA)]]
+    assert response.get_json()["complete"] is True
+
+    response = client.post(
+        "/upload/{}/finalize".format(session_id),
+        data={
+            "file_label": "data",
+            "label": "measurement",
+            "start_date": "2020-01-01",
+            "end_date": "2020-01-02",
+        },
+    )
+    assert response.status_code == 201
+    measurement = Measurement.query.get(response.get_json()["id"])
+    (f,) = measurement.files
+    assert (f.label, f.path, f.size) == ("data", "data.csv", len(DATA))
+    path = os.path.join(
+        app.config["MEASUREMENT_FILES_FOLDER"], str(measurement.id), "data.csv"
+    )
+    with open(path, "rb") as stored:
+        assert stored.read() == DATA
+
+    assert client.get("/upload/{}".format(session_id)).status_code == 404
+
+
+def test_finalize_incomplete_upload(client):
+    session_id = start_session(client)
+    put_chunk(client, session_id, 0, DATA[:10])
+
+    response = client.post(
+        "/upload/{}/finalize".format(session_id), data={"file_label": "data"}
+    )
+    assert response.status_code == 400
+
+
+def test_abort_upload(app, client):
+    session_id = start_session(client)
+
+    assert client.delete("/upload/{}".format(session_id)).status_code == 200
+    assert client.get("/upload/{}".format(session_id)).status_code == 404
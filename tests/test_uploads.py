@@ -0,0 +1,20 @@
+import os
+import stat
+
+from analysisweb.api.uploads import UMASK, UploadFileStream
+
+
+def mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_uploaded_file_has_the_mode_of_files_created_by_open(tmp_path):
+    stream = UploadFileStream(str(tmp_path))
+    stream.write(b"data")
+    stream.move(str(tmp_path / "data.csv"))
+    stream.close()
+
+    with open(str(tmp_path / "opened"), "w"):
+        pass
+    assert mode(str(tmp_path / "data.csv")) == mode(str(tmp_path / "opened"))
+    assert mode(str(tmp_path / "data.csv")) == 0o666 & ~UMASK
@@ -0,0 +1,49 @@
+import sys
+import threading
+import time
+
+from analysisweb.api.utils import STOP_POLL_INTERVAL, run_logged
+
+
+def python(code):
+    return [sys.executable, "-u", "-c", code]
+
+
+def test_run_logged_flushes_the_log_while_the_process_is_quiet(tmp_path):
+    log_path = str(tmp_path / "log.txt")
+    seen = []
+
+    def read_log():
+        time.sleep(2.5 * STOP_POLL_INTERVAL)
+        with open(log_path) as f:
+            seen.append(f.read())
+
+    reader = threading.Thread(target=read_log)
+    reader.start()
+    exit_code, reason = run_logged(
+        python("import time; print('started'); time.sleep(4)"), log_path
+    )
+    reader.join()
+
+    assert (exit_code, reason) == (0, None)
+    assert seen == ["started\n"]
+
+
+def test_run_logged_stops_the_process_after_the_timeout(tmp_path):
+    log_path = str(tmp_path / "log.txt")
+    exit_code, reason = run_logged(
+        python("import time; print('started'); time.sleep(30)"), log_path, timeout=1
+    )
+
+    assert exit_code != 0
+    assert reason == "timeout"
+    with open(log_path) as f:
+        assert f.read() == "started\nStopped after the timeout of 1 seconds\n"
+
+
+def test_run_logged_calls_on_start_with_the_process(tmp_path):
+    started = []
+    run_logged(python("pass"), str(tmp_path / "log.txt"), on_start=started.append)
+
+    assert len(started) == 1
+    assert started[0].args[0] == sys.executable